@@ -0,0 +1,6 @@
+import sys
+
+from benchmarks.ejecutor import main
+
+# python -m benchmarks [motor ...] [--rapida] [--guardar] [--umbral 0.25]
+sys.exit(main())
@@ -0,0 +1,137 @@
+import inspect
+import itertools
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from benchmarks import datos
+from modulos.logica_cbs import calculate_aggregate_costs
+from modulos.Montecarlo import SimuladorBetaDesapalancadaMejorado, SimuladorReversionMediaOriginal
+from modulos.MODULO_SP500 import simular_proyeccion_sp500
+
+# Mismos parámetros que envían las páginas de Beta y Deuda Largo Plazo
+PARAMS_BETA = {'velocidad_base': 0.08, 'velocidad_positivo': 0.06, 'velocidad_negativo': 0.10,
+               'meta_base': 0.70, 'meta_positivo': 0.60, 'meta_negativo': 0.85}
+CONFIG_BETA = {'peso_sectorial': 0.3, 'sensibilidad_distancia': 0.3, 'aceleracion_temporal': 0.1,
+               'volatilidad_mercado': 0.25, 'threshold_volatilidad': 0.25, 'factor_crisis': 1.5,
+               'confianza_sectorial': 0.3, 'confianza_modelo': 0.7, 'incluir_ciclo_economico': True,
+               'periodo_ciclo_anos': 6, 'amplitud_ciclo': 0.5, 'usar_bayesiano': True}
+PARAMS_APALANCAMIENTO = {'velocidad_base': 0.08, 'velocidad_positiva': 0.06, 'velocidad_negativa': 0.10,
+                         'meta_base': 40.0, 'meta_positiva': 55.0, 'meta_negativa': 30.0}
+
+# Configuración de la página de inflación de EE. UU.
+CONFIG_ECONOMETRICO = {
+    "series_ids": {"cpi_fred": "CPIAUCSL", "tiie_28": "EFFR", "usd_mxn_fix": "DTWEXAFEGS"},
+    "processing_config": {
+        "inflacion": {"type": "yoy_pct_change_calculated", "source_col": "cpi_fred"},
+        "tasa_interes": {"type": "level", "source_col": "tiie_28"},
+        "tipo_cambio": {"type": "log", "source_col": "usd_mxn_fix"},
+    },
+    "variables_modelo": ['tasa_interes', 'tipo_cambio'],
+    "variable_objetivo": 'inflacion',
+    "params_escenarios": {'anos_modelo': 5, 'meta_central': 3.0, 'meta_baja': 2.5, 'meta_alta': 4.0,
+                          'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015},
+}
+
+
+# Cada preparador recibe los parámetros de una combinación de la malla y devuelve
+# (cálculo a medir, unidades procesadas por ejecución). Los datos se generan fuera del cálculo.
+
+def _preparar_sp500(anos_proyeccion: int, num_simulaciones: int) -> Tuple[Callable[[], Any], int]:
+    precios = datos.precios_sinteticos()
+    # Sin las cachés de Streamlit ni de disco: se mide la simulación real
+    simular = inspect.unwrap(simular_proyeccion_sp500)
+    return lambda: simular(precios, anos_proyeccion, num_simulaciones), num_simulaciones
+
+
+def _preparar_beta(anos_proyeccion: int, num_simulaciones: int) -> Tuple[Callable[[], Any], int]:
+    historico = datos.historico_anual_sintetico('Beta')
+
+    def calcular():
+        return SimuladorBetaDesapalancadaMejorado(
+            historico, 'Beta', anos_proyeccion, num_simulaciones, PARAMS_BETA,
+            configuracion_avanzada=CONFIG_BETA).ejecutar_simulacion()
+
+    # Tres escenarios por simulación
+    return calcular, 3 * num_simulaciones
+
+
+def _preparar_reversion(anos_proyeccion: int, num_simulaciones: int) -> Tuple[Callable[[], Any], int]:
+    historico = datos.historico_anual_sintetico('Apalancamiento', media=40.0, volatilidad=3.0)
+
+    def calcular():
+        return SimuladorReversionMediaOriginal(
+            historico, 'Apalancamiento', anos_proyeccion, num_simulaciones, PARAMS_APALANCAMIENTO).ejecutar_simulacion()
+
+    return calcular, 3 * num_simulaciones
+
+
+def _preparar_econometrico(anos_historia: int, anos_proyeccion: int) -> Tuple[Callable[[], Any], int]:
+    series = datos.series_fred_sinteticas(anos_historia)
+
+    def calcular():
+        modelo = datos.ModelosEconometricosSinteticos(
+            series, start_date="2000-01-01", anos_proyeccion=anos_proyeccion, **CONFIG_ECONOMETRICO)
+        resultados = modelo.ejecutar_proyeccion()
+        if resultados is None:
+            raise RuntimeError("El modelo econométrico no produjo resultados con los datos sintéticos.")
+        return resultados
+
+    # Observaciones mensuales que llegan al modelo
+    return calcular, anos_historia * 12
+
+
+def _preparar_cbs(factor: int) -> Tuple[Callable[[], Any], int]:
+    df = datos.cbs_escalado(factor)
+    return lambda: calculate_aggregate_costs(df), len(df)
+
+
+def _preparar_cbs_sintetico(num_lineas: int) -> Tuple[Callable[[], Any], int]:
+    df = datos.cbs_sintetico(num_lineas)
+    return lambda: calculate_aggregate_costs(df), len(df)
+
+
+# motor -> preparador, unidad de rendimiento y mallas de parámetros (completa y rápida)
+CASOS: Dict[str, Dict[str, Any]] = {
+    "sp500": {
+        "preparar": _preparar_sp500, "unidad": "trayectorias/s",
+        "malla": {"anos_proyeccion": [1, 5], "num_simulaciones": [200, 1000]},
+        "malla_rapida": {"anos_proyeccion": [1], "num_simulaciones": [100]},
+    },
+    "beta": {
+        "preparar": _preparar_beta, "unidad": "trayectorias/s",
+        "malla": {"anos_proyeccion": [10, 30], "num_simulaciones": [1000, 5000, 10000]},
+        "malla_rapida": {"anos_proyeccion": [10], "num_simulaciones": [1000]},
+    },
+    "reversion": {
+        "preparar": _preparar_reversion, "unidad": "trayectorias/s",
+        "malla": {"anos_proyeccion": [10, 30], "num_simulaciones": [1000, 5000, 10000]},
+        "malla_rapida": {"anos_proyeccion": [10], "num_simulaciones": [1000]},
+    },
+    "econometrico": {
+        "preparar": _preparar_econometrico, "unidad": "observaciones/s",
+        "malla": {"anos_historia": [10, 20], "anos_proyeccion": [10, 30]},
+        "malla_rapida": {"anos_historia": [10], "anos_proyeccion": [10]},
+    },
+    "cbs": {
+        "preparar": _preparar_cbs, "unidad": "nodos/s",
+        "malla": {"factor": [1, 10, 100]},
+        "malla_rapida": {"factor": [1, 10]},
+    },
+    "cbs_sintetico": {
+        "preparar": _preparar_cbs_sintetico, "unidad": "nodos/s",
+        "malla": {"num_lineas": [10_000, 100_000, 1_000_000]},
+        "malla_rapida": {"num_lineas": [10_000]},
+    },
+}
+
+
+def combinaciones(motor: str, rapida: bool = False) -> Iterator[Dict[str, Any]]:
+    """Recorre el producto cartesiano de la malla de parámetros del motor."""
+    malla = CASOS[motor]["malla_rapida" if rapida else "malla"]
+    nombres = list(malla)
+    for valores in itertools.product(*(malla[n] for n in nombres)):
+        yield dict(zip(nombres, valores))
+
+
+def clave_caso(motor: str, parametros: Dict[str, Any]) -> str:
+    """Identificador estable de una combinación, p. ej. 'sp500[anos_proyeccion=1,num_simulaciones=100]'."""
+    return f"{motor}[{','.join(f'{k}={v}' for k, v in sorted(parametros.items()))}]"
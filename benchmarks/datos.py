@@ -0,0 +1,86 @@
+import inspect
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from modulos.datos_sinteticos import generar_cbs, series_sinteticas
+from modulos.logica_cbs import generar_ruta_desde_id, load_and_prepare_data
+from modulos.modelos_econometricos import ModelosEconometricos
+
+RAIZ = Path(__file__).resolve().parent.parent
+CBS_FIXTURE = RAIZ / "cbs_data_3.xlsx"
+
+# Semilla fija: todas las corridas miden exactamente los mismos datos
+SEMILLA = 2024
+
+
+def precios_sinteticos(anos_historia: int = 20, precio_inicial: float = 1500.0,
+                       mu: float = 0.07, sigma: float = 0.18) -> pd.Series:
+    """Precios de cierre diarios (días hábiles) con un movimiento browniano geométrico."""
+    rng = np.random.default_rng(SEMILLA)
+    indice = pd.bdate_range(end="2024-12-31", periods=anos_historia * 252)
+    rendimientos = rng.normal((mu - 0.5 * sigma ** 2) / 252, sigma / np.sqrt(252), len(indice))
+    return pd.Series(precio_inicial * np.exp(np.cumsum(rendimientos)), index=indice, name="Close")
+
+
+def historico_anual_sintetico(columna: str, anos_historia: int = 10, media: float = 0.70,
+                              volatilidad: float = 0.05) -> pd.DataFrame:
+    """Serie anual con el formato de las tablas editables de Beta y Apalancamiento."""
+    rng = np.random.default_rng(SEMILLA)
+    anos = np.arange(2024 - anos_historia, 2024)
+    valores = media + rng.normal(0, volatilidad, anos_historia)
+    return pd.DataFrame({columna: np.round(valores, 2)}, index=pd.Index(anos, name="Año"))
+
+
+def series_fred_sinteticas(anos_historia: int = 20) -> dict:
+    """
+    Series crudas con la forma de las de FRED que usa la página de inflación de EE. UU.:
+    un índice de precios mensual y dos series diarias (tasa y tipo de cambio).
+    """
+    return series_sinteticas({"cpi_fred": "CPIAUCSL", "tiie_28": "EFFR", "usd_mxn_fix": "DTWEXAFEGS"},
+                             anos=anos_historia, fin="2024-12-01", semilla=SEMILLA)
+
+
+class ModelosEconometricosSinteticos(ModelosEconometricos):
+    """ModelosEconometricos que lee series sintéticas en lugar de llamar a FRED."""
+
+    def __init__(self, series_crudas: dict, **kwargs):
+        super().__init__(api_key={"fred": "sintetico"}, **kwargs)
+        self.series_crudas = series_crudas
+
+    def _obtener_serie_fred(self, id_serie):
+        return self.series_crudas[id_serie]
+
+
+def cbs_escalado(factor: int = 1) -> pd.DataFrame:
+    """
+    CBS del archivo de ejemplo replicado 'factor' veces como ramas de primer nivel
+    independientes, ya preparado como lo hace load_and_prepare_data.
+    """
+    # Sin la caché de Streamlit: se mide la preparación real
+    base = inspect.unwrap(load_and_prepare_data)(CBS_FIXTURE)
+    if factor == 1:
+        return base
+
+    raices = base["ID_Jerarquico"].str.partition(".")
+    num_raices = int(raices[0].astype(int).max())
+    copias = []
+    for k in range(factor):
+        copia = base[["ID_Jerarquico", "Descripcion", "Resumen", "Costo"]].copy()
+        nueva_raiz = (raices[0].astype(int) + k * num_raices).astype(str)
+        copia["ID_Jerarquico"] = nueva_raiz + raices[1] + raices[2]
+        copias.append(copia)
+
+    df = pd.concat(copias, ignore_index=True)
+    df["ruta_jerarquica"] = df["ID_Jerarquico"].apply(generar_ruta_desde_id)
+    df["Nivel"] = df["ID_Jerarquico"].str.count("\\.") + 1
+    return df
+
+
+def cbs_sintetico(num_lineas: int) -> pd.DataFrame:
+    """CBS sintético de 'num_lineas' partidas, ya preparado como lo hace load_and_prepare_data."""
+    df = generar_cbs(num_lineas, semilla=SEMILLA)
+    df["ruta_jerarquica"] = df["ID_Jerarquico"].apply(generar_ruta_desde_id)
+    df["Nivel"] = df["ID_Jerarquico"].str.count("\\.") + 1
+    return df
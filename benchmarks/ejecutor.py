@@ -0,0 +1,159 @@
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.casos import CASOS, clave_caso, combinaciones
+
+LINEA_BASE_POR_DEFECTO = Path(__file__).resolve().parent / "linea_base.json"
+UMBRAL_POR_DEFECTO = 0.25
+VERSION_FORMATO = 1
+
+
+@contextlib.contextmanager
+def _motores_en_silencio():
+    """Solo deja pasar los errores de los loggers de los motores ('modulos.*') mientras se mide."""
+    raiz = logging.getLogger("modulos")
+    nivel = raiz.level
+    raiz.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        raiz.setLevel(nivel)
+
+
+def medir(calcular: Callable[[], Any], repeticiones: int = 3) -> Dict[str, float]:
+    """
+    Mide un cálculo: tiempo de pared (el mínimo de 'repeticiones' corridas, el menos
+    afectado por el ruido de la máquina) y pico de memoria asignada, en una corrida
+    adicional con tracemalloc (que solo se activa ahí porque frena el cálculo).
+    Los mensajes informativos y advertencias de los motores se silencian.
+    """
+    tiempos = []
+    with _motores_en_silencio():
+        for _ in range(repeticiones):
+            gc.collect()
+            inicio = time.perf_counter()
+            calcular()
+            tiempos.append(time.perf_counter() - inicio)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            calcular()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {"tiempo_s": min(tiempos), "tiempo_mediana_s": sorted(tiempos)[len(tiempos) // 2],
+            "memoria_pico_mb": pico / 1024 ** 2}
+
+
+def ejecutar(motores: Optional[List[str]] = None, rapida: bool = False, repeticiones: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Corre la malla de cada motor y devuelve {clave del caso: métricas}."""
+    resultados = {}
+    for motor in motores or list(CASOS):
+        caso = CASOS[motor]
+        for parametros in combinaciones(motor, rapida):
+            calcular, unidades = caso["preparar"](**parametros)
+            metricas = medir(calcular, repeticiones)
+            metricas["rendimiento"] = unidades / metricas["tiempo_s"] if metricas["tiempo_s"] > 0 else float("inf")
+            metricas["unidad"] = caso["unidad"]
+            metricas["parametros"] = parametros
+
+            clave = clave_caso(motor, parametros)
+            resultados[clave] = metricas
+            print(f"{clave:<60} {metricas['tiempo_s']:>9.3f} s {metricas['memoria_pico_mb']:>9.1f} MB "
+                  f"{metricas['rendimiento']:>14,.0f} {caso['unidad']}")
+    return resultados
+
+
+def guardar_linea_base(resultados: Dict[str, Dict[str, Any]], ruta: Path = LINEA_BASE_POR_DEFECTO):
+    """Agrega los resultados a la línea base (los casos existentes se reemplazan)."""
+    base = cargar_linea_base(ruta)
+    base.update(resultados)
+    contenido = {
+        "formato": VERSION_FORMATO,
+        "maquina": {"python": platform.python_version(), "sistema": platform.platform(), "procesador": platform.machine()},
+        "casos": base,
+    }
+    ruta.write_text(json.dumps(contenido, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def cargar_linea_base(ruta: Path = LINEA_BASE_POR_DEFECTO) -> Dict[str, Dict[str, Any]]:
+    if not ruta.exists():
+        return {}
+    contenido = json.loads(ruta.read_text(encoding="utf-8"))
+    if contenido.get("formato") != VERSION_FORMATO:
+        print(f"Warning: línea base con formato desconocido ({ruta}), se ignora.")
+        return {}
+    return contenido["casos"]
+
+
+def detectar_regresiones(resultados: Dict[str, Dict[str, Any]], base: Dict[str, Dict[str, Any]],
+                         umbral: float = UMBRAL_POR_DEFECTO) -> List[str]:
+    """
+    Compara contra la línea base y describe cada caso cuyo tiempo o pico de memoria
+    empeoró más que 'umbral' (fracción, 0.25 = 25 %). Los casos sin base se omiten.
+    """
+    regresiones = []
+    for clave, actual in resultados.items():
+        anterior = base.get(clave)
+        if anterior is None:
+            continue
+        for metrica, nombre in (("tiempo_s", "tiempo"), ("memoria_pico_mb", "memoria")):
+            if anterior[metrica] > 0 and actual[metrica] > anterior[metrica] * (1 + umbral):
+                cambio = actual[metrica] / anterior[metrica] - 1
+                regresiones.append(f"{clave}: {nombre} {anterior[metrica]:.3f} -> {actual[metrica]:.3f} (+{cambio:.0%})")
+    return regresiones
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Mide los motores de cálculo con datos sintéticos y de ejemplo, sin interfaz ni red.")
+    parser.add_argument("motores", nargs="*", metavar="motor",
+                        help=f"Motores a medir (por defecto todos): {', '.join(CASOS)}")
+    parser.add_argument("--rapida", action="store_true", help="Usar la malla reducida de parámetros")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Corridas cronometradas por caso (se toma el mínimo)")
+    parser.add_argument("--linea-base", type=Path, default=LINEA_BASE_POR_DEFECTO, help="Archivo JSON de la línea base")
+    parser.add_argument("--guardar", action="store_true", help="Guardar los resultados como nueva línea base")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_POR_DEFECTO,
+                        help="Empeoramiento tolerado antes de reportar una regresión (0.25 = 25 %%)")
+    parser.add_argument("--salida", type=Path, help="Escribir también los resultados de esta corrida en un JSON")
+    args = parser.parse_args(argumentos)
+    desconocidos = sorted(set(args.motores) - set(CASOS))
+    if desconocidos:
+        parser.error(f"motor desconocido: {', '.join(desconocidos)}")
+
+    resultados = ejecutar(args.motores, args.rapida, args.repeticiones)
+
+    if args.salida:
+        args.salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.guardar:
+        guardar_linea_base(resultados, args.linea_base)
+        print(f"Línea base actualizada: {args.linea_base}")
+        return 0
+
+    base = cargar_linea_base(args.linea_base)
+    if not base:
+        print("Sin línea base para comparar; use --guardar para crearla.")
+        return 0
+
+    regresiones = detectar_regresiones(resultados, base, args.umbral)
+    for regresion in regresiones:
+        print(f"REGRESIÓN {regresion}")
+    print(f"{len(regresiones)} regresión(es) sobre el umbral de {args.umbral:.0%}.")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
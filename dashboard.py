@@ -1,8 +1,14 @@
+import os
 import streamlit as st
 from streamlit_option_menu import option_menu
 from theme import theme
-from paginas import pagina_bienvenida, pagina_inflacion_mex, pagina_inflacion_usa, pagina_sp500, pagina_embi, pagina_beta, pagina_apalancamiento, pagina_resumen_ve, pagina_bonos_20, pagina_cbs_central
-from paginas import components
+# Las páginas se importan bajo demanda desde el registro (solo la opción seleccionada)
+from paginas.registro import obtener_pagina, RESULTADOS_POR_PAGINA
+from paginas.panel_memoria import contabilizar_sesion, render_panel as render_panel_memoria
+from modulos import instrumentacion, memoria
+from modulos.entorno import configurar_log
+from modulos.lote import RUTA_PREDETERMINADAS, leer_paquete
+from modulos.sesiones import ErrorSesion, restaurar_pendientes
 
 st.markdown("""
 <style>
@@ -65,6 +71,26 @@ st.markdown("""
 
 st.set_page_config(page_title="Dashboard de Proyecciones", layout="wide")
 
+# Mensajes de los motores en la consola del servidor
+configurar_log()
+
+
+@st.cache_data
+def _proyecciones_predeterminadas(ruta, modificado):
+    """Paquete precalculado por 'python -m modulos.lote'; se relee cuando cambia el archivo."""
+    return leer_paquete(ruta)
+
+
+# Las proyecciones predeterminadas se cargan una vez por sesión, sin sustituir resultados propios
+if 'predeterminadas_cargadas' not in st.session_state:
+    st.session_state['predeterminadas_cargadas'] = True
+    if os.path.exists(RUTA_PREDETERMINADAS):
+        for clave, resultado in _proyecciones_predeterminadas(RUTA_PREDETERMINADAS, os.path.getmtime(RUTA_PREDETERMINADAS)).items():
+            st.session_state.setdefault(clave, resultado)
+
+# Perfil por rerun (solo desarrollo: LCOE_INSTRUMENTACION=1; si no, es None)
+registro_rerun = instrumentacion.iniciar_registro("Rerun")
+
 # Barra lateral con la navegación principal
 with st.sidebar:
     theme.render_main_title("Menú", align="center")
@@ -118,7 +144,8 @@ with st.sidebar:
 # --- PÁGINA DE BIENVENIDA ---
 if pagina_seleccionada == "Pagina principal":
     # Llama a la función render de la página de bienvenida
-    pagina_bienvenida.render()
+    with instrumentacion.tramo("Página: Pagina principal", "render"):
+        obtener_pagina("Pagina principal").render()
 
 
 # --- PÁGINA DE VARIABLES ECONÓMICAS ---
@@ -140,29 +167,16 @@ if pagina_seleccionada == "Variables Económicas":
         }
     ) 
     
-    if analisis_seleccionado == "Inflación México":
-        pagina_inflacion_mex.render()
-        
-    elif analisis_seleccionado == "Inflación Estados Unidos":
-        pagina_inflacion_usa.render() 
-        
-    elif analisis_seleccionado == "S&P 500":
-        pagina_sp500.render()
-
-    elif analisis_seleccionado == "EMBI":
-        pagina_embi.render()
-
-    elif analisis_seleccionado == "Beta Desapalancada":
-        pagina_beta.render()
-
-    elif analisis_seleccionado == "Deuda Largo Plazo":
-        pagina_apalancamiento.render()
-
-    elif analisis_seleccionado == "Bonos 20 años":
-        pagina_bonos_20.render()
-
-    elif analisis_seleccionado == "Resumen":
-        pagina_resumen_ve.render()
+    # Cada opción del menú tiene su página en el registro; los resultados de una sesión
+    # cargada se decodifican al abrir la primera página que los usa
+    try:
+        restaurar_pendientes(st.session_state, RESULTADOS_POR_PAGINA.get(analisis_seleccionado, []))
+    except ErrorSesion as e:
+        st.error(str(e))
+    except Exception as e:
+        st.error(f"Error al restaurar la sesión: {e}")
+    with instrumentacion.tramo(f"Página: {analisis_seleccionado}", "render"):
+        obtener_pagina(analisis_seleccionado).render()
 
 
 
@@ -184,6 +198,20 @@ if pagina_seleccionada == "CBS":
     theme.render_main_title(f"Estructura de Desglose de Costos ({segmento_seleccionado})", align="center")
 
     # Llamamos a nuestra función central reutilizable
-    pagina_cbs_central.render_cbs_segment(segment_key)
+    with instrumentacion.tramo(f"Página: CBS ({segmento_seleccionado})", "render"):
+        obtener_pagina("CBS").render_cbs_segment(segment_key)
 
-    
+
+# --- PANEL DE PERFIL (DESARROLLO) ---
+if registro_rerun is not None:
+    instrumentacion.terminar_registro()
+    from paginas.panel_instrumentacion import render_panel
+    with st.sidebar:
+        render_panel(registro_rerun)
+
+
+# --- MEMORIA DE LA SESIÓN ---
+tamanos_sesion = contabilizar_sesion()
+if memoria.PANEL_ACTIVO:
+    with st.sidebar:
+        render_panel_memoria(tamanos_sesion)
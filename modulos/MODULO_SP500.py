@@ -1,42 +1,87 @@
 # analisis_sp500.py
 
-import streamlit as st
+import logging
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
+from modulos.histogramas import calcular_histograma, BINS_POR_DEFECTO
+from modulos.cache_disco import cache_en_disco
+from modulos.entorno import cache_data, reportar_error
+from modulos.trabajos import reportar_progreso
+from modulos.instrumentacion import contar, fase, instrumentado
 
-@st.cache_data
-def generar_proyeccion_sp500(ticker, start_date, anos_proyeccion, num_simulaciones):
+logger = logging.getLogger(__name__)
+
+# Versión de la simulación: incrementarla al cambiar la metodología invalida la caché en disco
+VERSION_SIMULACION = 1
+
+
+def estimar_memoria_mb(num_simulaciones, anos_proyeccion):
     """
-    Ejecuta la simulación de Monte Carlo para un ticker y devuelve un diccionario con los resultados.
+    Memoria estimada de la simulación para el control de admisión: la matriz diaria
+    (252 días × años × simulaciones, float64), su DataFrame y los temporales de los cuantiles.
     """
-    print(f"--- EJECUTANDO CÁLCULO PESADO: SIMULACIÓN MONTE CARLO ---")
-    
-    # --- 1. Carga de Datos y Cálculo de Parámetros ---
+    return 10 + 4 * anos_proyeccion * 252 * num_simulaciones * 8 / 1024 ** 2
+
+
+@cache_data(ttl=3600)
+@instrumentado("fetch")
+def descargar_precios(ticker, start_date):
+    """Descarga los precios de cierre ajustados del ticker (None si falla la descarga)."""
     try:
         sp500_data = yf.download(ticker, start=start_date, auto_adjust=True)
         if sp500_data.empty:
-            st.error("No se pudieron descargar los datos.")
+            reportar_error("No se pudieron descargar los datos.")
             return None
         precios = sp500_data['Close'].dropna()
         if isinstance(precios, pd.DataFrame):
             precios = precios.iloc[:, 0]
-        rendimientos_log = np.log(precios / precios.shift(1)).dropna()
-        mu = rendimientos_log.mean()
-        sigma = rendimientos_log.std()
+        return precios
     except Exception as e:
-        st.error(f"Error en la carga de datos: {e}")
+        reportar_error(f"Error en la carga de datos: {e}")
         return None
 
+
+def generar_proyeccion_sp500(ticker, start_date, anos_proyeccion, num_simulaciones, bins_histograma=BINS_POR_DEFECTO):
+    """
+    Ejecuta la simulación de Monte Carlo para un ticker y devuelve un diccionario con los resultados.
+    La descarga y la simulación se cachean por separado: la simulación se identifica por el
+    contenido de los precios, así que datos nuevos generan una proyección nueva.
+    """
+    reportar_progreso(0.0, "Descargando precios")
+    precios = descargar_precios(ticker, start_date)
+    if precios is None:
+        return None
+    return simular_proyeccion_sp500(precios, anos_proyeccion, num_simulaciones, bins_histograma)
+
+
+@cache_data
+@cache_en_disco("sp500", version=VERSION_SIMULACION)
+@instrumentado("simulate")
+def simular_proyeccion_sp500(precios, anos_proyeccion, num_simulaciones, bins_histograma=BINS_POR_DEFECTO):
+    """
+    Simulación de Monte Carlo sobre una serie de precios.
+    Las distribuciones (precios finales y rendimientos diarios) se entregan ya agrupadas en
+    'bins_histograma' bins en lugar de las muestras completas.
+    """
+    logger.info("--- EJECUTANDO CÁLCULO PESADO: SIMULACIÓN MONTE CARLO ---")
+    
+    # --- 1. Cálculo de Parámetros ---
+    fase("parámetros", "fit")
+    rendimientos_log = np.log(precios / precios.shift(1)).dropna()
+    mu = rendimientos_log.mean()
+    sigma = rendimientos_log.std()
+
     # --- 2. Simulación de Monte Carlo ---
+    fase("trayectorias", "simulate")
+    contar("sp500.trayectorias", num_simulaciones)
     np.random.seed(42)
     dias_proyeccion = anos_proyeccion * 252
     ultimo_precio = float(precios.iloc[-1])
     simulaciones = np.zeros((dias_proyeccion, num_simulaciones))
 
     for i in range(num_simulaciones):
+        reportar_progreso(i / num_simulaciones, f"Trayectoria {i + 1} de {num_simulaciones}")
         precio_actual = ultimo_precio
         for d in range(dias_proyeccion):
             shock = np.random.normal(0, 1)
@@ -47,6 +92,7 @@ def generar_proyeccion_sp500(ticker, start_date, anos_proyeccion, num_simulacion
     df_simulaciones = pd.DataFrame(simulaciones, index=idx_futuro)
 
     # --- 3. Cálculo de Rendimientos Anuales y Promedios ---
+    fase("cuantiles e histogramas", "reduce")
     rendimiento_hist_anual = precios.resample('YE').last().pct_change().dropna() * 100
 
     escenario_base_precios = df_simulaciones.quantile(0.50, axis=1)
@@ -72,6 +118,10 @@ def generar_proyeccion_sp500(ticker, start_date, anos_proyeccion, num_simulacion
     precios_finales = df_simulaciones.iloc[-1]
     percentiles_finales = precios_finales.quantile([0.10, 0.25, 0.50, 0.75, 0.90])
 
+    # Histogramas calculados aquí: las páginas y la sesión guardan O(bins) en lugar de las muestras
+    histograma_precios_finales = calcular_histograma(precios_finales, bins=bins_histograma)
+    histograma_rendimientos = calcular_histograma(rendimientos_log, bins=bins_histograma, escala=100)
+
 
     promedios = { "Historico": rendimiento_hist_anual.mean(),
                 "Base": rendimiento_proy_base.mean(), 
@@ -86,10 +136,10 @@ def generar_proyeccion_sp500(ticker, start_date, anos_proyeccion, num_simulacion
         "base_anual": rendimiento_proy_base,
         "positivo_anual": rendimiento_proy_pos,
         "negativo_anual": rendimiento_proy_neg,
-        "rendimientos_log_diarios": rendimientos_log,
+        "histograma_rendimientos_diarios": histograma_rendimientos,
         "mu_anualizado": mu_anualizado,
         "sigma_anualizado": sigma_anualizado,
-        "precios_finales": precios_finales,
+        "histograma_precios_finales": histograma_precios_finales,
         "percentiles": percentiles_finales,
         "promedios": promedios
     }
@@ -1,11 +1,29 @@
-import streamlit as st
+import logging
 import pandas as pd
 import numpy as np
 from statsmodels.tsa.stattools import adfuller
 from scipy import stats
 import warnings
+from modulos.histogramas import calcular_histograma, BINS_POR_DEFECTO
+from modulos.cache_disco import cache_en_disco
+from modulos.entorno import cache_data
+from modulos.trabajos import reportar_progreso
+from modulos.instrumentacion import contar, fase, instrumentado
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Versión de los simuladores: incrementarla al cambiar la metodología invalida la caché en disco
+VERSION_SIMULADOR = 1
+
+
+def estimar_memoria_mb(num_simulaciones, anos_proyeccion):
+    """
+    Memoria estimada de una simulación para el control de admisión: tres matrices de
+    escenarios (años × simulaciones, float64) más los temporales de cada paso.
+    """
+    return 10 + 2 * 3 * anos_proyeccion * num_simulaciones * 8 / 1024 ** 2
+
 class SimuladorBetaDesapalancadaMejorado:
     """
     Simulador avanzado para proyección de beta desapalancada usando Monte Carlo
@@ -13,7 +31,8 @@ class SimuladorBetaDesapalancadaMejorado:
     """
 
     def __init__(self, df_historico, col_name, anos_proyeccion, num_simulaciones, 
-                 params_convergencia, beta_sectorial=None, configuracion_avanzada=None):
+                 params_convergencia, beta_sectorial=None, configuracion_avanzada=None,
+                 bins_histograma=BINS_POR_DEFECTO):
         self.df_historico = df_historico
         self.col_name = col_name
         self.anos_proyeccion = anos_proyeccion
@@ -21,11 +40,13 @@ class SimuladorBetaDesapalancadaMejorado:
         self.params = params_convergencia
         self.beta_sectorial = beta_sectorial  # MEJORA 1: Beta sectorial como referencia
         self.config_avanzada = configuracion_avanzada or {}
+        self.bins_histograma = bins_histograma
         np.random.seed(42)
         
         # MEJORA 4: Validación con datos históricos
         self.validacion_resultados = {}
 
+    @instrumentado("fit")
     def _calcular_parametros_historicos(self):
         """Calcula parámetros históricos con análisis de estacionariedad."""
         serie = self.df_historico[self.col_name]
@@ -37,15 +58,15 @@ class SimuladorBetaDesapalancadaMejorado:
         self.media_historica = serie.mean()
         
         # MEJORA 4: Test de estacionariedad
-        print("\n--- VALIDACIÓN ESTADÍSTICA ---")
+        logger.info("--- VALIDACIÓN ESTADÍSTICA ---")
         try:
             adf_result = adfuller(serie.dropna())
             self.validacion_resultados['adf_pvalue'] = adf_result[1]
             self.validacion_resultados['es_estacionaria'] = adf_result[1] < 0.05
-            print(f"Test ADF p-value: {adf_result[1]:.4f}")
-            print(f"Serie {'ES' if self.validacion_resultados['es_estacionaria'] else 'NO ES'} estacionaria")
+            logger.info(f"Test ADF p-value: {adf_result[1]:.4f}")
+            logger.info(f"Serie {'ES' if self.validacion_resultados['es_estacionaria'] else 'NO ES'} estacionaria")
         except Exception as e:
-            print(f"Warning: No se pudo realizar test ADF: {e}")
+            logger.warning(f"No se pudo realizar test ADF: {e}")
             self.validacion_resultados['es_estacionaria'] = None
         
         # MEJORA 4: Calcular velocidad de reversión empírica (half-life)
@@ -77,14 +98,14 @@ class SimuladorBetaDesapalancadaMejorado:
                     self.validacion_resultados['half_life_meses'] = half_life_meses
                     self.validacion_resultados['r_squared'] = r_value**2
                     
-                    print(f"Velocidad de reversión empírica: {velocidad_empirica:.4f}")
-                    print(f"Half-life empírico: {half_life_meses:.1f} períodos")
-                    print(f"R-squared del modelo AR(1): {r_value**2:.4f}")
+                    logger.info(f"Velocidad de reversión empírica: {velocidad_empirica:.4f}")
+                    logger.info(f"Half-life empírico: {half_life_meses:.1f} períodos")
+                    logger.info(f"R-squared del modelo AR(1): {r_value**2:.4f}")
                 else:
-                    print("Warning: No se detectó reversión a la media clara")
+                    logger.warning("No se detectó reversión a la media clara")
                     self.validacion_resultados['velocidad_empirica'] = None
         except Exception as e:
-            print(f"Warning: No se pudo calcular half-life empírico: {e}")
+            logger.warning(f"No se pudo calcular half-life empírico: {e}")
 
     def _calcular_meta_reversion(self, escenario):
         """
@@ -109,7 +130,7 @@ class SimuladorBetaDesapalancadaMejorado:
             else:
                 meta_final = meta_sectorial
                 
-            print(f"Meta {escenario}: {meta_final:.3f} (sectorial: {self.beta_sectorial:.3f}, peso: {peso_sectorial:.1f})")
+            logger.info(f"Meta {escenario}: {meta_final:.3f} (sectorial: {self.beta_sectorial:.3f}, peso: {peso_sectorial:.1f})")
             return meta_final
         else:
             return meta_base
@@ -189,9 +210,10 @@ class SimuladorBetaDesapalancadaMejorado:
         
         return np.clip(factor_ciclico, 0.7, 1.3)  # Limitar el rango
 
+    @instrumentado("simulate")
     def ejecutar_simulacion(self):
         """Ejecuta la simulación mejorada con todas las mejoras implementadas."""
-        print("\n=== INICIANDO SIMULACIÓN BETA DESAPALANCADA MEJORADA ===")
+        logger.info("=== INICIANDO SIMULACIÓN BETA DESAPALANCADA MEJORADA ===")
         
         self._calcular_parametros_historicos()
         
@@ -204,9 +226,12 @@ class SimuladorBetaDesapalancadaMejorado:
             "negativo": np.zeros((self.anos_proyeccion, self.num_simulaciones))
         }
         
-        print(f"\n--- EJECUTANDO {self.num_simulaciones} SIMULACIONES ---")
+        logger.info(f"--- EJECUTANDO {self.num_simulaciones} SIMULACIONES ---")
+        fase("trayectorias", "simulate")
+        contar("beta.trayectorias", 3 * self.num_simulaciones)
         
         for i in range(self.anos_proyeccion):
+            reportar_progreso(i / self.anos_proyeccion, f"Año {i + 1} de {self.anos_proyeccion}")
             for escenario in ["base", "positivo", "negativo"]:
                 # Valores del período anterior
                 if i > 0:
@@ -249,6 +274,7 @@ class SimuladorBetaDesapalancadaMejorado:
                 simulaciones[escenario][i, :] = betas_finales
 
         # Generar años futuros
+        fase("medianas y percentiles", "reduce")
         anos_futuros = range(self.ultimo_ano_hist + 1, self.ultimo_ano_hist + 1 + self.anos_proyeccion)
         
         # Procesar resultados
@@ -273,31 +299,34 @@ class SimuladorBetaDesapalancadaMejorado:
         resultados["validacion_estadistica"] = self.validacion_resultados
         
         # Estadísticas de simulación final
-        valores_finales_base = simulaciones["base"][-1, :]
-        resultados["valores_finales"] = pd.Series(valores_finales_base)
-        resultados["percentiles"] = resultados["valores_finales"].quantile([0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95])
+        valores_finales_base = pd.Series(simulaciones["base"][-1, :])
+        resultados["percentiles"] = valores_finales_base.quantile([0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95])
+        resultados["histograma_valores_finales"] = calcular_histograma(valores_finales_base, bins=self.bins_histograma)
         
         # Información de configuración
         resultados["beta_sectorial_usada"] = self.beta_sectorial
         resultados["configuracion_avanzada"] = self.config_avanzada
         
-        print(f"\n✅ SIMULACIÓN COMPLETADA")
-        print(f"Beta final promedio (escenario base): {resultados['base'].iloc[-1]:.3f}")
+        logger.info("✅ SIMULACIÓN COMPLETADA")
+        logger.info(f"Beta final promedio (escenario base): {resultados['base'].iloc[-1]:.3f}")
         if self.beta_sectorial:
-            print(f"Beta sectorial de referencia: {self.beta_sectorial:.3f}")
+            logger.info(f"Beta sectorial de referencia: {self.beta_sectorial:.3f}")
         
         return resultados
 
 
-@st.cache_data
+@cache_data
+@cache_en_disco("beta_mejorada", version=VERSION_SIMULADOR)
 def ejecutar_simulacion_beta_mejorada(df_historico, col_name, anos_proyeccion, num_simulaciones, 
-                                    params_convergencia, beta_sectorial=None, configuracion_avanzada=None):
+                                    params_convergencia, beta_sectorial=None, configuracion_avanzada=None,
+                                    bins_histograma=BINS_POR_DEFECTO):
     """
     Función wrapper cacheada para la simulación mejorada de beta desapalancada.
     
     Parámetros adicionales:
     - beta_sectorial: Beta sectorial de Damodaran como referencia (opcional)
     - configuracion_avanzada: Diccionario con configuraciones adicionales
+    - bins_histograma: Número de bins (o regla de numpy) del histograma de valores finales
     
     Configuración avanzada puede incluir:
     {
@@ -315,7 +344,7 @@ def ejecutar_simulacion_beta_mejorada(df_historico, col_name, anos_proyeccion, n
         'usar_bayesiano': True  # Aplicar ajuste Bayesiano
     }
     """
-    print("--- EJECUTANDO SIMULACIÓN BETA MEJORADA ---")
+    logger.info("--- EJECUTANDO SIMULACIÓN BETA MEJORADA ---")
     
     # Crear instancia del simulador mejorado
     simulador = SimuladorBetaDesapalancadaMejorado(
@@ -325,7 +354,8 @@ def ejecutar_simulacion_beta_mejorada(df_historico, col_name, anos_proyeccion, n
         num_simulaciones=num_simulaciones,
         params_convergencia=params_convergencia,
         beta_sectorial=beta_sectorial,
-        configuracion_avanzada=configuracion_avanzada or {}
+        configuracion_avanzada=configuracion_avanzada or {},
+        bins_histograma=bins_histograma
     )
     
     # Ejecutar simulación
@@ -333,9 +363,11 @@ def ejecutar_simulacion_beta_mejorada(df_historico, col_name, anos_proyeccion, n
 
 
 # FUNCIÓN DE RETROCOMPATIBILIDAD
-@st.cache_data
+@cache_data
+@cache_en_disco("reversion_media", version=VERSION_SIMULADOR)
 def ejecutar_simulacion_reversion_media_compatible(df_historico, col_name, anos_proyeccion, 
-                                                  num_simulaciones, params_convergencia):
+                                                  num_simulaciones, params_convergencia,
+                                                  bins_histograma=BINS_POR_DEFECTO):
     """
     Función compatible con la interfaz original para transición gradual.
     Usa la clase original sin las mejoras avanzadas.
@@ -346,7 +378,8 @@ def ejecutar_simulacion_reversion_media_compatible(df_historico, col_name, anos_
         col_name=col_name,
         anos_proyeccion=anos_proyeccion,
         num_simulaciones=num_simulaciones,
-        params_convergencia=params_convergencia
+        params_convergencia=params_convergencia,
+        bins_histograma=bins_histograma
     )
     return simulador.ejecutar_simulacion()
 
@@ -354,19 +387,23 @@ def ejecutar_simulacion_reversion_media_compatible(df_historico, col_name, anos_
 class SimuladorReversionMediaOriginal:
     """Clase original sin mejoras para retrocompatibilidad."""
     
-    def __init__(self, df_historico, col_name, anos_proyeccion, num_simulaciones, params_convergencia):
+    def __init__(self, df_historico, col_name, anos_proyeccion, num_simulaciones, params_convergencia,
+                 bins_histograma=BINS_POR_DEFECTO):
         self.df_historico = df_historico
         self.col_name = col_name
         self.anos_proyeccion = anos_proyeccion
         self.num_simulaciones = num_simulaciones
         self.params = params_convergencia
+        self.bins_histograma = bins_histograma
         np.random.seed(42)
 
+    @instrumentado("fit")
     def _calcular_parametros_historicos(self):
         self.volatilidad_hist = self.df_historico[self.col_name].diff().std()
         self.ultimo_valor_hist = self.df_historico[self.col_name].iloc[-1]
         self.ultimo_ano_hist = int(self.df_historico.index[-1])
 
+    @instrumentado("simulate")
     def ejecutar_simulacion(self):
         self._calcular_parametros_historicos()
         
@@ -388,13 +425,17 @@ class SimuladorReversionMediaOriginal:
             "negativo": self.params['velocidad_negativa']
         }
 
+        fase("trayectorias", "simulate")
+        contar("reversion.trayectorias", 3 * self.num_simulaciones)
         for i in range(self.anos_proyeccion):
+            reportar_progreso(i / self.anos_proyeccion, f"Año {i + 1} de {self.anos_proyeccion}")
             for escenario in ["base", "positivo", "negativo"]:
                 valor_anterior = simulaciones[escenario][i-1, :] if i > 0 else self.ultimo_valor_hist
                 shock = np.random.normal(0, self.volatilidad_hist, self.num_simulaciones)
                 
                 simulaciones[escenario][i, :] = valor_anterior + velocidad[escenario] * (metas[escenario] - valor_anterior) + shock
 
+        fase("medianas y percentiles", "reduce")
         anos_futuros = range(self.ultimo_ano_hist + 1, self.ultimo_ano_hist + 1 + self.anos_proyeccion)
         
         resultados = {"historico": self.df_historico[self.col_name]}
@@ -411,8 +452,9 @@ class SimuladorReversionMediaOriginal:
         resultados['anos_proyectados'] = self.anos_proyeccion
         resultados["ultimo_valor_hist"] = self.ultimo_valor_hist
         resultados["volatilidad_hist"] = self.volatilidad_hist
-        resultados["valores_finales"] = pd.Series(simulaciones["base"][-1, :])
-        resultados["percentiles"] = resultados["valores_finales"].quantile([0.10, 0.25, 0.50, 0.75, 0.90])
+        valores_finales = pd.Series(simulaciones["base"][-1, :])
+        resultados["percentiles"] = valores_finales.quantile([0.10, 0.25, 0.50, 0.75, 0.90])
+        resultados["histograma_valores_finales"] = calcular_histograma(valores_finales, bins=self.bins_histograma)
 
         return resultados
 
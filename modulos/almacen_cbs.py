@@ -0,0 +1,253 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Columnas persistidas; 'ruta_jerarquica' y 'Nivel' se derivan del ID al cargar
+COLUMNAS_BASE = ['ID_Jerarquico', 'Descripcion', 'Resumen', 'Costo']
+COLUMNAS_OPCIONALES = ['Avance']
+
+DIRECTORIO_POR_DEFECTO = os.environ.get("LCOE_ALMACEN_CBS", ".almacen_cbs")
+
+
+def separar_clave_sesion(session_key: str) -> Tuple[str, str]:
+    """Convierte una clave de sesión como 'df_nivel_1_3_capex' en ('nivel_1_3', 'capex')."""
+    segmento, _, pestana = session_key.removeprefix('df_').rpartition('_')
+    return segmento, pestana
+
+
+def _prefijo_subarbol(ids: pd.Series) -> pd.Series:
+    """Agrupa cada fila en el subárbol de Nivel 2 al que pertenece ('1.2.3.4' -> '1.2')."""
+    return ids.str.split('.', n=2).str[:2].str.join('.')
+
+
+def _fragmento_a_columnas(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Convierte un fragmento del CBS a arreglos columnares sin objetos (cargables sin pickle)."""
+    columnas = {}
+    for col in COLUMNAS_BASE + [c for c in COLUMNAS_OPCIONALES if c in df.columns]:
+        serie = df[col]
+        if col in ('Costo', 'Avance'):
+            columnas[col] = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=np.float64)
+        else:
+            nulos = serie.isna().to_numpy()
+            columnas[col] = serie.fillna('').astype(str).to_numpy(dtype=str)
+            if nulos.any():
+                columnas[f"{col}__nulo"] = nulos
+    return columnas
+
+
+def _hash_columnas(columnas: Dict[str, np.ndarray]) -> str:
+    """Hash de contenido (sha256) de un fragmento columnar, independiente del formato en disco."""
+    h = hashlib.sha256()
+    for nombre in sorted(columnas):
+        arreglo = np.ascontiguousarray(columnas[nombre])
+        h.update(nombre.encode('utf-8'))
+        h.update(arreglo.dtype.str.encode('ascii'))
+        h.update(arreglo.tobytes())
+    return h.hexdigest()
+
+
+class AlmacenCbs:
+    """
+    Almacén versionado de CBS procesados, direccionado por contenido.
+
+    Cada versión se divide en fragmentos columnares (uno por subárbol de Nivel 2) que se
+    guardan una sola vez bajo su hash; una versión nueva solo escribe los subárboles que
+    cambiaron. Los manifiestos JSON de cada versión son pequeños, por lo que listar es barato.
+
+    Estructura en disco:
+        objetos/<hh>/<hash>.npz                        fragmentos inmutables
+        versiones/<segmento>/<pestana>/<version>.json  manifiestos
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_POR_DEFECTO):
+        self.directorio = Path(directorio)
+        (self.directorio / "objetos").mkdir(parents=True, exist_ok=True)
+        (self.directorio / "versiones").mkdir(parents=True, exist_ok=True)
+        # Los fragmentos son inmutables, así que su caché en memoria nunca queda obsoleta
+        self._leer_fragmento = lru_cache(maxsize=512)(self._leer_fragmento_disco)
+        # Los manifiestos tampoco cambian: el listado solo se relee si cambia el directorio,
+        # y la comparación de dos versiones siempre da lo mismo
+        self._listar_firmado = lru_cache(maxsize=64)(self._listar_disco)
+        self._diferencias = lru_cache(maxsize=16)(self._diferencias_disco)
+
+    # --- MÉTODOS PRIVADOS DE AYUDA ---
+
+    def _ruta_objeto(self, hash_fragmento: str) -> Path:
+        return self.directorio / "objetos" / hash_fragmento[:2] / f"{hash_fragmento}.npz"
+
+    def _ruta_manifiesto(self, segmento: str, pestana: str, version_id: str) -> Path:
+        return self.directorio / "versiones" / segmento / pestana / f"{version_id}.json"
+
+    def _escribir_fragmento(self, hash_fragmento: str, columnas: Dict[str, np.ndarray]) -> bool:
+        """Escribe el fragmento si no existe. Devuelve True si se escribió uno nuevo."""
+        ruta = self._ruta_objeto(hash_fragmento)
+        if ruta.exists():
+            return False
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        # Las sesiones de Streamlit son hilos del mismo proceso: el nombre incluye ambos
+        temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporal, 'wb') as f:
+            np.savez_compressed(f, **columnas)
+        os.replace(temporal, ruta)
+        return True
+
+    def _leer_fragmento_disco(self, hash_fragmento: str) -> pd.DataFrame:
+        with np.load(self._ruta_objeto(hash_fragmento), allow_pickle=False) as datos:
+            arreglos = {nombre: datos[nombre] for nombre in datos.files}
+
+        df = pd.DataFrame({nombre: valores for nombre, valores in arreglos.items() if not nombre.endswith('__nulo')})
+        for nombre, nulos in arreglos.items():
+            if nombre.endswith('__nulo'):
+                col = nombre.removesuffix('__nulo')
+                df[col] = df[col].astype(object).mask(nulos)
+        return df
+
+    def _firma_versiones(self, segmento: Optional[str], pestana: Optional[str]) -> Tuple:
+        """
+        Fecha de modificación de los directorios de manifiestos que abarca el listado.
+        Guardar una versión crea un archivo en uno de ellos y cambia su fecha.
+        """
+        raiz = self.directorio / "versiones"
+        if segmento and pestana:
+            directorios = [raiz / segmento / pestana]
+        else:
+            directorios = sorted(raiz.glob(f"{segmento or '*'}/{pestana or '*'}"))
+        return tuple((str(d), d.stat().st_mtime_ns if d.exists() else None) for d in directorios)
+
+    def _listar_disco(self, segmento: Optional[str], pestana: Optional[str], firma: Tuple) -> pd.DataFrame:
+        patron = f"{segmento or '*'}/{pestana or '*'}/*.json"
+        registros = []
+        for ruta in (self.directorio / "versiones").glob(patron):
+            manifiesto = json.loads(ruta.read_text(encoding='utf-8'))
+            manifiesto['num_fragmentos'] = len(manifiesto.pop('fragmentos'))
+            registros.append(manifiesto)
+        if not registros:
+            return pd.DataFrame(columns=['version', 'segmento', 'pestana', 'etiqueta', 'creado', 'filas'])
+        return pd.DataFrame(registros).sort_values('creado', ascending=False, ignore_index=True)
+
+    def _leer_manifiesto(self, version_id: str, segmento: Optional[str] = None, pestana: Optional[str] = None) -> dict:
+        """
+        Manifiesto de una versión. El mismo contenido guardado en otro segmento o pestaña
+        tiene el mismo identificador, así que se busca en los indicados (sin ellos, en el
+        primero en orden alfabético).
+        """
+        rutas = sorted((self.directorio / "versiones").glob(f"{segmento or '*'}/{pestana or '*'}/{version_id}.json"))
+        if not rutas:
+            raise KeyError(f"No existe la versión '{version_id}' en el almacén.")
+        return json.loads(rutas[0].read_text(encoding='utf-8'))
+
+    # --- MÉTODOS PÚBLICOS ---
+
+    def guardar(self, df: pd.DataFrame, segmento: str, pestana: str, etiqueta: Optional[str] = None) -> str:
+        """
+        Guarda una versión del CBS y devuelve su identificador. Subir dos veces el mismo
+        contenido devuelve la misma versión sin escribir nada nuevo.
+        """
+        ids = df['ID_Jerarquico'].astype(str)
+        prefijos = _prefijo_subarbol(ids)
+
+        fragmentos, nuevos = {}, 0
+        for prefijo, df_fragmento in df.groupby(prefijos, sort=False):
+            columnas = _fragmento_a_columnas(df_fragmento)
+            hash_fragmento = _hash_columnas(columnas)
+            nuevos += self._escribir_fragmento(hash_fragmento, columnas)
+            fragmentos[prefijo] = hash_fragmento
+
+        version_id = hashlib.sha256(json.dumps(fragmentos, sort_keys=False).encode('utf-8')).hexdigest()[:16]
+        ruta = self._ruta_manifiesto(segmento, pestana, version_id)
+        if not ruta.exists():
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            manifiesto = {
+                "version": version_id,
+                "segmento": segmento,
+                "pestana": pestana,
+                "etiqueta": etiqueta or version_id,
+                "creado": pd.Timestamp.now().isoformat(timespec='seconds'),
+                "filas": int(len(df)),
+                "costo_hojas": float(pd.to_numeric(df['Costo'], errors='coerce').fillna(0).sum()),
+                "fragmentos": fragmentos,
+                "fragmentos_nuevos": int(nuevos),
+            }
+            ruta.write_text(json.dumps(manifiesto, ensure_ascii=False, indent=2), encoding='utf-8')
+        return version_id
+
+    def listar(self, segmento: Optional[str] = None, pestana: Optional[str] = None) -> pd.DataFrame:
+        """
+        Lista las versiones guardadas de la más reciente a la más antigua. Los manifiestos
+        solo se releen cuando cambia la fecha de modificación de su directorio.
+        """
+        return self._listar_firmado(segmento, pestana, self._firma_versiones(segmento, pestana)).copy()
+
+    def cargar(self, version_id: str, segmento: Optional[str] = None, pestana: Optional[str] = None) -> pd.DataFrame:
+        """Reconstruye el CBS de una versión con el mismo esquema que load_and_prepare_data."""
+        from modulos.logica_cbs import generar_ruta_desde_id
+
+        manifiesto = self._leer_manifiesto(version_id, segmento, pestana)
+        df = pd.concat(
+            [self._leer_fragmento(h) for h in manifiesto['fragmentos'].values()],
+            ignore_index=True
+        )
+        df['ruta_jerarquica'] = df['ID_Jerarquico'].apply(generar_ruta_desde_id)
+        df['Nivel'] = df['ID_Jerarquico'].str.count('\\.') + 1
+        return df
+
+    def diferencias(self, version_a: str, version_b: str,
+                    segmento: Optional[str] = None, pestana: Optional[str] = None) -> pd.DataFrame:
+        """
+        Compara dos versiones. Solo se leen los subárboles cuyo hash difiere; los idénticos
+        se descartan sin tocar el disco. Las versiones son inmutables, así que cada par se
+        compara una sola vez.
+
+        Returns:
+            DataFrame con ID_Jerarquico, Descripcion, Costo_A, Costo_B, Diferencia y Cambio
+            ('Agregado', 'Eliminado' o 'Modificado').
+        """
+        return self._diferencias(version_a, version_b, segmento, pestana).copy()
+
+    def _diferencias_disco(self, version_a: str, version_b: str,
+                           segmento: Optional[str], pestana: Optional[str]) -> pd.DataFrame:
+        fragmentos_a = self._leer_manifiesto(version_a, segmento, pestana)['fragmentos']
+        fragmentos_b = self._leer_manifiesto(version_b, segmento, pestana)['fragmentos']
+        prefijos = [p for p in dict.fromkeys(list(fragmentos_a) + list(fragmentos_b))
+                    if fragmentos_a.get(p) != fragmentos_b.get(p)]
+
+        columnas = ['ID_Jerarquico', 'Descripcion', 'Costo']
+        vacio = pd.DataFrame(columns=columnas)
+        df_a = pd.concat([self._leer_fragmento(fragmentos_a[p])[columnas] for p in prefijos if p in fragmentos_a] or [vacio], ignore_index=True)
+        df_b = pd.concat([self._leer_fragmento(fragmentos_b[p])[columnas] for p in prefijos if p in fragmentos_b] or [vacio], ignore_index=True)
+
+        df_diff = df_a.merge(df_b, on='ID_Jerarquico', how='outer', suffixes=('_A', '_B'), indicator=True)
+        df_diff['Descripcion'] = df_diff['Descripcion_B'].fillna(df_diff['Descripcion_A'])
+        cambio_texto = df_diff['Descripcion_A'].fillna('') != df_diff['Descripcion_B'].fillna('')
+        cambio_costo = ~np.isclose(df_diff['Costo_A'].astype(float).fillna(0), df_diff['Costo_B'].astype(float).fillna(0))
+        df_diff['Cambio'] = np.select(
+            [df_diff['_merge'] == 'right_only', df_diff['_merge'] == 'left_only'],
+            ['Agregado', 'Eliminado'],
+            default='Modificado'
+        )
+        df_diff = df_diff[(df_diff['_merge'] != 'both') | cambio_texto | cambio_costo]
+        df_diff['Diferencia'] = df_diff['Costo_B'].astype(float).fillna(0) - df_diff['Costo_A'].astype(float).fillna(0)
+
+        return df_diff[['ID_Jerarquico', 'Descripcion', 'Costo_A', 'Costo_B', 'Diferencia', 'Cambio']].reset_index(drop=True)
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Devuelve el número de versiones, fragmentos únicos y el tamaño en disco (MB)."""
+        objetos = list((self.directorio / "objetos").glob("*/*.npz"))
+        return {
+            "versiones": len(list((self.directorio / "versiones").glob("*/*/*.json"))),
+            "fragmentos": len(objetos),
+            "tamano_mb": sum(o.stat().st_size for o in objetos) / 1024 ** 2,
+        }
+
+
+@st.cache_resource
+def obtener_almacen() -> AlmacenCbs:
+    """Instancia compartida del almacén de versiones del CBS."""
+    return AlmacenCbs()
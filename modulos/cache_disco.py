@@ -0,0 +1,289 @@
+import pandas as pd
+import numpy as np
+import functools
+import hashlib
+import inspect
+import io
+import logging
+import os
+import threading
+from concurrent.futures import CancelledError, Future, TimeoutError as TiempoAgotado
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from modulos.entorno import cache_resource
+from modulos.instrumentacion import contar, instrumentado
+from modulos.trabajos import TrabajoCancelado, reportar_progreso, trabajo_actual
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_POR_DEFECTO = os.environ.get("LCOE_CACHE_RESULTADOS", ".cache_resultados")
+MAX_MB_POR_DEFECTO = float(os.environ.get("LCOE_CACHE_RESULTADOS_MB", "512"))
+
+# Nombre con el que cada resultado se guarda dentro de su archivo de sesión
+_CLAVE_RESULTADO = "resultado"
+
+
+# Con muestreo, las tablas y series de al menos FILAS_MUESTREO filas se resumen con una muestra
+# fija de FILAS_MUESTRA filas (más su forma), como hace st.cache_data con los DataFrames grandes
+FILAS_MUESTREO = 50_000
+FILAS_MUESTRA = 10_000
+
+
+def _actualizar_huella(h, valor: Any, muestreo: bool = False):
+    """Agrega 'valor' al hash de forma canónica (independiente del orden de los dicts)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)) and muestreo and len(valor) >= FILAS_MUESTREO:
+        h.update(repr(("muestra", valor.shape)).encode('utf-8'))
+        valor = valor.sample(n=FILAS_MUESTRA, random_state=0)
+
+    if isinstance(valor, pd.DataFrame):
+        h.update(b"tabla")
+        h.update(repr([(str(c), str(t)) for c, t in valor.dtypes.items()]).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(b"serie")
+        h.update(repr((valor.name, str(valor.dtype))).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        h.update(b"arreglo")
+        h.update(repr((valor.dtype.str, valor.shape)).encode('utf-8'))
+        h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, dict):
+        h.update(b"dict")
+        for clave in sorted(valor, key=repr):
+            _actualizar_huella(h, clave, muestreo)
+            _actualizar_huella(h, valor[clave], muestreo)
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"lista")
+        for elemento in valor:
+            _actualizar_huella(h, elemento, muestreo)
+    elif isinstance(valor, io.BytesIO):
+        # Archivos en memoria (p. ej. los subidos con st.file_uploader): por contenido
+        h.update(b"archivo")
+        h.update(valor.getvalue())
+    else:
+        if isinstance(valor, np.generic):
+            valor = valor.item()
+        h.update(repr((type(valor).__name__, valor)).encode('utf-8'))
+    h.update(b";")
+
+
+def huella_entradas(*valores: Any, muestreo: bool = False) -> str:
+    """
+    Huella canónica (sha256) de las entradas de un cálculo: datos (por contenido) y
+    parámetros. Dos llamadas con las mismas entradas producen la misma huella en cualquier
+    proceso o réplica. Con 'muestreo', las tablas grandes se resumen con una muestra fija
+    (más rápido, para cachés en memoria; la caché en disco usa la huella completa).
+    """
+    h = hashlib.sha256()
+    for valor in valores:
+        _actualizar_huella(h, valor, muestreo)
+    return h.hexdigest()
+
+
+class VueloUnico:
+    """
+    Coalescencia de cálculos idénticos en curso ("single-flight"): la primera llamada con
+    una clave calcula y las que llegan mientras tanto esperan ese mismo cálculo y reciben
+    su resultado (o su excepción). La clave se libera al terminar, así que las llamadas
+    posteriores vuelven a pasar por la caché.
+
+    Si el cálculo compartido se cancela (TrabajoCancelado), las llamadas que esperaban no
+    se cancelan: una de ellas toma el relevo y calcula.
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._en_vuelo: Dict[Hashable, tuple] = {}
+        self.coalescidas = 0
+
+    def ejecutar(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        while True:
+            with self._candado:
+                en_vuelo = self._en_vuelo.get(clave)
+                if en_vuelo is None:
+                    futuro: Future = Future()
+                    self._en_vuelo[clave] = (futuro, trabajo_actual())
+                else:
+                    self.coalescidas += 1
+                    contar("cache_disco.coalescidas")
+
+            if en_vuelo is None:
+                return self._calcular(clave, futuro, calcular)
+
+            try:
+                return self._esperar(*en_vuelo)
+            except CancelledError:
+                continue  # Se canceló el cálculo compartido, no el de esta llamada
+
+    def _calcular(self, clave: Hashable, futuro: Future, calcular: Callable[[], Any]) -> Any:
+        try:
+            resultado = calcular()
+        except TrabajoCancelado:
+            futuro.cancel()
+            raise
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._candado:
+                del self._en_vuelo[clave]
+
+    @staticmethod
+    def _esperar(futuro: Future, lider) -> Any:
+        """Espera el cálculo compartido reflejando su avance y atendiendo la cancelación propia."""
+        while True:
+            try:
+                return futuro.result(timeout=0.25)
+            except TiempoAgotado:
+                progreso = lider.progreso if lider is not None else 0.0
+                reportar_progreso(progreso, "Esperando un cálculo idéntico en curso")
+
+    def en_vuelo(self) -> int:
+        with self._candado:
+            return len(self._en_vuelo)
+
+
+class CacheDisco:
+    """
+    Caché persistente de resultados de proyección en disco local, compartida entre
+    sesiones, reinicios y réplicas que monten el mismo directorio.
+
+    Cada resultado se guarda con el formato de sesión (manifiesto JSON + npz, sin pickle)
+    en <directorio>/<motor>/v<version>/<huella>.session. Cambiar la versión de un motor
+    invalida sus resultados anteriores. Al superar 'max_bytes' se eliminan primero los
+    archivos usados hace más tiempo (la lectura actualiza su fecha de modificación).
+    Las llamadas concurrentes con la misma huella comparten un solo cálculo (VueloUnico).
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_POR_DEFECTO, max_bytes: int = int(MAX_MB_POR_DEFECTO * 1024 * 1024)):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._candado = threading.Lock()
+        self._vuelos = VueloUnico()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _ruta(self, motor: str, version: int, huella: str) -> Path:
+        return self.directorio / motor / f"v{version}" / f"{huella}.session"
+
+    @instrumentado("fetch", "caché en disco: leer")
+    def obtener(self, motor: str, version: int, huella: str) -> Optional[Any]:
+        """Devuelve el resultado guardado o None si no existe (o no se puede leer)."""
+        # Importación diferida: sesiones depende de los módulos de modelos que usan esta caché
+        from modulos.sesiones import LectorSesion
+
+        ruta = self._ruta(motor, version, huella)
+        try:
+            resultado = LectorSesion(ruta.read_bytes()).cargar(_CLAVE_RESULTADO)
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"entrada de caché ilegible, se descarta ({ruta.name}): {e}")
+            ruta.unlink(missing_ok=True)
+            return None
+        return resultado
+
+    def guardar(self, motor: str, version: int, huella: str, resultado: Any):
+        from modulos.sesiones import exportar_sesion
+
+        ruta = self._ruta(motor, version, huella)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        temporal.write_bytes(exportar_sesion({_CLAVE_RESULTADO: resultado}))
+        os.replace(temporal, ruta)
+        self._desalojar()
+
+    def _desalojar(self):
+        """Elimina las entradas menos usadas hasta quedar por debajo de 'max_bytes'."""
+        with self._candado:
+            entradas = []
+            for ruta in self.directorio.glob("*/v*/*.session"):
+                try:
+                    info = ruta.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((info.st_mtime, info.st_size, ruta))
+
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, ruta in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                ruta.unlink(missing_ok=True)
+                total -= tamano
+
+    def obtener_o_calcular(self, motor: str, version: int, huella: str, calcular: Callable[[], Any]) -> Any:
+        """
+        Devuelve el resultado de 'huella' desde disco o lo calcula y lo guarda. Los
+        resultados None (cálculos fallidos) no se guardan. Si ya hay un cálculo en curso
+        con la misma huella (otra sesión), se espera ese cálculo en lugar de repetirlo.
+        """
+        return self._vuelos.ejecutar((motor, version, huella),
+                                     lambda: self._obtener_o_calcular(motor, version, huella, calcular))
+
+    @property
+    def coalescidas(self) -> int:
+        return self._vuelos.coalescidas
+
+    def _obtener_o_calcular(self, motor: str, version: int, huella: str, calcular: Callable[[], Any]) -> Any:
+        resultado = self.obtener(motor, version, huella)
+        if resultado is not None:
+            self.aciertos += 1
+            contar("cache_disco.aciertos")
+            logger.info(f"--- RESULTADO DE '{motor}' SERVIDO DESDE CACHÉ EN DISCO ---")
+            return resultado
+
+        self.fallos += 1
+        contar("cache_disco.fallos")
+        resultado = calcular()
+        if resultado is not None:
+            try:
+                self.guardar(motor, version, huella, resultado)
+            except Exception as e:
+                logger.warning(f"no se pudo guardar '{motor}' en la caché en disco: {e}")
+        return resultado
+
+    def limpiar(self):
+        with self._candado:
+            for ruta in self.directorio.glob("*/v*/*.session"):
+                ruta.unlink(missing_ok=True)
+
+
+@cache_resource
+def obtener_cache_disco() -> CacheDisco:
+    """Instancia compartida de la caché de resultados en disco."""
+    return CacheDisco()
+
+
+def cache_en_disco(motor: str, version: int, ignorar: Iterable[str] = ()):
+    """
+    Decorador: guarda en la caché de disco el resultado de la función, con la huella de
+    todos sus argumentos (normalizados con sus valores por defecto) salvo los de 'ignorar'.
+    Se combina con @cache_data (modulos.entorno), que sigue sirviendo los aciertos en memoria:
+
+        @cache_data
+        @cache_en_disco("beta", version=1)
+        def simular(...): ...
+    """
+    ignorar = set(ignorar)
+
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            entradas = {k: v for k, v in argumentos.arguments.items() if k not in ignorar}
+            huella = huella_entradas(funcion.__qualname__, entradas)
+            return obtener_cache_disco().obtener_o_calcular(
+                motor, version, huella, lambda: funcion(*args, **kwargs))
+
+        return envoltura
+
+    return decorador
@@ -0,0 +1,86 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+# Columnas del CBS de las que dependen las gráficas (el Resumen, texto largo, no se usa)
+COLUMNAS_HUELLA = ['ID_Jerarquico', 'Descripcion', 'Costo', 'Nivel']
+
+
+def huella_dataframe(df: pd.DataFrame, columnas: Optional[List[str]] = None) -> str:
+    """Huella de contenido de un DataFrame (columnas + valores), estable entre reruns."""
+    if columnas is not None:
+        df = df[[c for c in columnas if c in df.columns]]
+    h = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def huella_cbs_sesion(session_key: str) -> str:
+    """
+    Huella del CBS guardado en st.session_state[session_key], calculada una sola vez por
+    CBS cargado: se memoriza junto a él y se reutiliza mientras la sesión conserve el
+    mismo DataFrame (cargar o restaurar otro lo reemplaza).
+    """
+    df = st.session_state[session_key]
+    clave = f"huella_{session_key}"
+    guardada = st.session_state.get(clave)
+    if guardada is None or guardada[0]() is not df:
+        # Referencia débil: la huella no retiene en memoria un CBS ya reemplazado
+        guardada = (weakref.ref(df), huella_dataframe(df, COLUMNAS_HUELLA))
+        st.session_state[clave] = guardada
+    return guardada[1]
+
+
+class CacheFiguras:
+    """
+    Caché LRU acotada de figuras de Plotly serializadas a JSON.
+
+    Las figuras se guardan como texto JSON (inmutable), de modo que cada lectura entrega
+    una figura nueva que el llamador puede modificar sin alterar la copia en caché.
+    """
+
+    def __init__(self, max_entradas: int = 64):
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[Hashable, Optional[str]]" = OrderedDict()
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: Hashable, constructor: Callable[[], Optional[go.Figure]]) -> Optional[go.Figure]:
+        """
+        Devuelve la figura de 'clave' o la construye con 'constructor' si no está en caché.
+        Un constructor que devuelve None (sin datos) también se memoriza.
+        """
+        with self._candado:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                figura_json = self._entradas[clave]
+                return None if figura_json is None else pio.from_json(figura_json, skip_invalid=True)
+
+        fig = constructor()
+        figura_json = None if fig is None else fig.to_json()
+
+        with self._candado:
+            self.fallos += 1
+            self._entradas[clave] = figura_json
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return fig
+
+    def limpiar(self):
+        with self._candado:
+            self._entradas.clear()
+
+
+@st.cache_resource
+def obtener_cache_figuras() -> CacheFiguras:
+    """Instancia compartida de la caché de figuras (las claves incluyen la huella de los datos)."""
+    return CacheFiguras()
@@ -0,0 +1,142 @@
+import functools
+import inspect
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from modulos.cache_disco import huella_entradas
+from modulos.instrumentacion import contar
+
+logger = logging.getLogger(__name__)
+
+# Techo de memoria compartido por todas las funciones cacheadas del proceso
+MAX_MB_POR_DEFECTO = float(os.environ.get("LCOE_CACHE_MEMORIA_MB", "256"))
+
+_CONTADORES = ("aciertos", "fallos", "desalojos")
+
+
+class CacheMemoria:
+    """
+    Caché en memoria del proceso, compartida por todas las funciones decoradas con
+    cache_data (modulos.entorno) y acotada por un techo global de bytes.
+
+    Como st.cache_data, cada resultado se guarda serializado (pickle) y cada acierto
+    devuelve una copia nueva, así que quien lo recibe puede modificarlo. El tamaño de una
+    entrada es el de su serialización; al superar 'max_bytes' se desalojan las entradas
+    usadas hace más tiempo (LRU), sin importar de qué función sean.
+    """
+
+    def __init__(self, max_bytes: float):
+        self.max_bytes = int(max_bytes)
+        self.bytes_total = 0
+        self._candado = threading.Lock()
+        # clave -> (resultado serializado, instante de caducidad o None, función)
+        self._entradas: "OrderedDict[Tuple[str, str], Tuple[bytes, Optional[float], str]]" = OrderedDict()
+        self._contadores: Dict[str, Dict[str, int]] = {}
+
+    def _contar(self, funcion: str, contador: str):
+        self._contadores.setdefault(funcion, dict.fromkeys(_CONTADORES, 0))[contador] += 1
+        contar(f"cache_memoria.{contador}")
+
+    def _quitar(self, clave: Tuple[str, str]):
+        datos, _, _ = self._entradas.pop(clave)
+        self.bytes_total -= len(datos)
+
+    def obtener(self, clave: Tuple[str, str]) -> Tuple[bool, Any]:
+        """(True, copia del resultado) si 'clave' está en la caché y no ha caducado; si no, (False, None)."""
+        funcion = clave[0]
+        with self._candado:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] is not None and entrada[1] < time.monotonic():
+                self._quitar(clave)
+                entrada = None
+            if entrada is None:
+                self._contar(funcion, "fallos")
+                return False, None
+            self._entradas.move_to_end(clave)
+            self._contar(funcion, "aciertos")
+        return True, pickle.loads(entrada[0])
+
+    def guardar(self, clave: Tuple[str, str], resultado: Any, ttl: Optional[float] = None):
+        """Guarda el resultado y desaloja las entradas menos usadas hasta respetar el techo."""
+        try:
+            datos = pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"no se pudo guardar '{clave[0]}' en la caché en memoria: {e}")
+            return
+        if len(datos) > self.max_bytes:
+            logger.info(f"'{clave[0]}' ({len(datos) / 1024 ** 2:,.1f} MB) excede el techo de la caché en memoria; no se guarda.")
+            return
+
+        caducidad = time.monotonic() + ttl if ttl else None
+        with self._candado:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (datos, caducidad, clave[0])
+            self.bytes_total += len(datos)
+            while self.bytes_total > self.max_bytes:
+                antigua = next(iter(self._entradas))
+                self._quitar(antigua)
+                self._contar(antigua[0], "desalojos")
+
+    def limpiar(self, funcion: Optional[str] = None):
+        """Vacía la caché (o solo las entradas de 'funcion')."""
+        with self._candado:
+            for clave in [c for c in self._entradas if funcion is None or c[0] == funcion]:
+                self._quitar(clave)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Entradas, bytes y contadores de aciertos, fallos y desalojos, en total y por función."""
+        with self._candado:
+            por_funcion = {funcion: {**contadores, "entradas": 0, "bytes": 0}
+                           for funcion, contadores in self._contadores.items()}
+            for datos, _, funcion in self._entradas.values():
+                entrada = por_funcion.setdefault(funcion, {**dict.fromkeys(_CONTADORES, 0), "entradas": 0, "bytes": 0})
+                entrada["entradas"] += 1
+                entrada["bytes"] += len(datos)
+            totales = {contador: sum(f[contador] for f in por_funcion.values()) for contador in _CONTADORES}
+            return {"entradas": len(self._entradas), "bytes": self.bytes_total, "max_bytes": self.max_bytes,
+                    **totales, "por_funcion": por_funcion}
+
+
+# Una caché por proceso, compartida por todas las sesiones y funciones
+cache_compartida = CacheMemoria(MAX_MB_POR_DEFECTO * 1024 ** 2)
+
+
+def memorizar(funcion: Optional[Callable] = None, *, ttl=None):
+    """
+    Decorador: sirve los resultados de la función desde la caché compartida. La clave es
+    la huella de sus argumentos (normalizados con sus valores por defecto); como en
+    st.cache_data, los parámetros que empiezan con '_' no forman parte de ella. 'ttl'
+    (segundos o timedelta) limita la vigencia de cada resultado. Los resultados None
+    (cálculos fallidos) no se guardan.
+    """
+    if funcion is None:
+        return lambda f: memorizar(f, ttl=ttl)
+
+    segundos = ttl.total_seconds() if isinstance(ttl, timedelta) else ttl
+    firma = inspect.signature(funcion)
+    nombre = f"{funcion.__module__}.{funcion.__qualname__}"
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        argumentos = firma.bind(*args, **kwargs)
+        argumentos.apply_defaults()
+        entradas = {k: v for k, v in argumentos.arguments.items() if not k.startswith("_")}
+        clave = (nombre, huella_entradas(entradas, muestreo=True))
+
+        encontrado, resultado = cache_compartida.obtener(clave)
+        if encontrado:
+            return resultado
+        resultado = funcion(*args, **kwargs)
+        if resultado is not None:
+            cache_compartida.guardar(clave, resultado, segundos)
+        return resultado
+
+    envoltura.clear = lambda: cache_compartida.limpiar(nombre)
+    return envoltura
@@ -0,0 +1,114 @@
+import pandas as pd
+import numpy as np
+from typing import Dict
+from modulos.entorno import cache_data
+from modulos.logica_cbs import construir_matriz_agregacion
+
+
+def _costos_propios(df: pd.DataFrame, universo: pd.Index, columna: str = 'Costo') -> np.ndarray:
+    """
+    Devuelve el costo propio de cada nodo de una versión (0 en los nodos con desglose),
+    alineado al universo de IDs mediante un join por hash (Index.get_indexer).
+    """
+    ids = df['ID_Jerarquico'].astype(str)
+    es_padre = ids.isin(ids.str.rpartition('.')[0])
+    valores = pd.to_numeric(df[columna], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    valores = np.where(es_padre.to_numpy(), 0.0, valores)
+
+    posiciones = universo.get_indexer(ids)
+    return np.bincount(posiciones, weights=valores, minlength=len(universo))
+
+
+@cache_data
+def calcular_control_presupuestal(df_base: pd.DataFrame, versiones: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Compara un CBS base (presupuesto) contra una o más versiones de costos reales o
+    pronosticados y calcula variaciones e indicadores tipo valor ganado en todos los niveles.
+
+    Las versiones se alinean por 'ID_Jerarquico' con un join por hash sobre el universo de
+    IDs de todas las versiones, y los totales de todos los niveles y versiones se obtienen
+    en una sola pasada: matriz_agregacion @ matriz_de_costos_propios.
+
+    Si una versión incluye la columna opcional 'Avance' (% de avance por partida), el valor
+    ganado es Presupuesto x Avance; de lo contrario se asume avance completo (100%) en las
+    partidas que la versión reporta. Las partidas ausentes de una versión no tienen avance.
+
+    EAC = Presupuesto / CPI; si el CPI no está definido (sin costo real) o no es positivo,
+    EAC = Costo_Real + (Presupuesto - Valor_Ganado), de modo que una partida sin iniciar
+    se pronostica en su presupuesto.
+
+    Args:
+        df_base: CBS base tal como lo devuelve load_and_prepare_data.
+        versiones: Diccionario ordenado {nombre_version: DataFrame del CBS de esa versión}.
+
+    Returns:
+        DataFrame largo con una fila por (Version, ID_Jerarquico) y las columnas
+        Presupuesto, Valor_Ganado, Costo_Real, Variacion, Variacion (%), CPI, EAC y VAC.
+        Se indexa y ordena por (Version, ID_Padre) para que el desglose de un nodo sea
+        una búsqueda binaria con .loc en lugar de un filtrado completo en cada interacción.
+    """
+    if df_base.empty or not versiones:
+        return pd.DataFrame()
+
+    # 1. Universo de IDs (base + todas las versiones) y sus atributos descriptivos
+    df_universo = pd.concat(
+        [df_base[['ID_Jerarquico', 'Descripcion']]] +
+        [df[['ID_Jerarquico', 'Descripcion']] for df in versiones.values()],
+        ignore_index=True
+    )
+    df_universo['ID_Jerarquico'] = df_universo['ID_Jerarquico'].astype(str)
+    df_universo = df_universo.drop_duplicates(subset=['ID_Jerarquico'], keep='first').reset_index(drop=True)
+    df_universo['Nivel'] = df_universo['ID_Jerarquico'].str.count('\\.') + 1
+    df_universo['ID_Padre'] = df_universo['ID_Jerarquico'].str.rpartition('.')[0]
+    universo = pd.Index(df_universo['ID_Jerarquico'])
+
+    # 2. Matriz de costos propios: [presupuesto | real_v1, ganado_v1 | real_v2, ganado_v2 | ...]
+    presupuesto_propio = _costos_propios(df_base, universo)
+    columnas = [presupuesto_propio]
+    for df_version in versiones.values():
+        columnas.append(_costos_propios(df_version, universo))
+        if 'Avance' in df_version.columns:
+            avance = pd.Series(
+                pd.to_numeric(df_version['Avance'], errors='coerce').fillna(0).clip(0, 100).to_numpy() / 100.0,
+                index=df_version['ID_Jerarquico'].astype(str).to_numpy()
+            )
+            avance = avance[~avance.index.duplicated(keep='first')]
+            fraccion = avance.reindex(universo).fillna(0.0).to_numpy()
+        else:
+            fraccion = universo.isin(df_version['ID_Jerarquico'].astype(str)).astype(np.float64)
+        columnas.append(presupuesto_propio * fraccion)
+
+    # 3. Agregación de todos los niveles y versiones en un solo producto matricial
+    matriz, _ = construir_matriz_agregacion(df_universo, solo_hojas=False)
+    totales = np.asarray(matriz @ np.column_stack(columnas))
+
+    presupuesto = totales[:, 0]
+    reales = totales[:, 1::2]
+    ganados = totales[:, 2::2]
+
+    # 4. Indicadores vectorizados (nodos x versiones) y tabla larga
+    num_nodos, num_versiones = reales.shape
+    variacion = reales - presupuesto[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variacion_pct = np.where(presupuesto[:, None] != 0, variacion / presupuesto[:, None] * 100, np.nan)
+        cpi = np.where(reales != 0, ganados / reales, np.nan)
+        eac = np.where(cpi > 0, presupuesto[:, None] / cpi, reales + (presupuesto[:, None] - ganados))
+
+    df_control = pd.DataFrame({
+        'Version': np.repeat(list(versiones.keys()), num_nodos),
+        'ID_Jerarquico': np.tile(df_universo['ID_Jerarquico'].to_numpy(), num_versiones),
+        'Descripcion': np.tile(df_universo['Descripcion'].to_numpy(), num_versiones),
+        'Nivel': np.tile(df_universo['Nivel'].to_numpy(), num_versiones),
+        'ID_Padre': np.tile(df_universo['ID_Padre'].to_numpy(), num_versiones),
+        'Presupuesto': np.tile(presupuesto, num_versiones),
+        'Valor_Ganado': ganados.T.ravel(),
+        'Costo_Real': reales.T.ravel(),
+        'Variacion': variacion.T.ravel(),
+        'Variacion (%)': variacion_pct.T.ravel(),
+        'CPI': cpi.T.ravel(),
+        'EAC': eac.T.ravel(),
+    })
+    df_control['VAC'] = df_control['Presupuesto'] - df_control['EAC']
+    df_control['Version'] = pd.Categorical(df_control['Version'], categories=list(versiones.keys()), ordered=True)
+
+    return df_control.set_index(['Version', 'ID_Padre']).sort_index()
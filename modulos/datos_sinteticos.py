@@ -0,0 +1,251 @@
+# Datos sintéticos para pruebas de carga: CBS con el esquema de cbs_data_3.xlsx y series con
+# la forma de las que devuelven FRED y Banxico. Todo es reproducible (semilla fija) y no
+# depende de Streamlit ni de la red.
+import argparse
+import sys
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+SEMILLA = 2024
+
+# Fecha final de las series (las mensuales terminan en el primer día de ese mes)
+FIN_POR_DEFECTO = "2024-12-31"
+
+# Observaciones por año de cada frecuencia
+OBSERVACIONES_POR_ANO = {"MS": 12, "B": 261, "D": 365}
+
+# Perfil de cada serie que consultan las páginas econométricas. 'indice' es un paseo
+# log-normal con deriva (precios, tipos de cambio); 'tasa' revierte a 'nivel' con la
+# persistencia indicada (tasas, spreads, VIX). 'faltantes' imita los días sin dato.
+PERFILES_SERIES: Dict[str, Dict[str, Any]] = {
+    # FRED
+    "CPIAUCSL": dict(frecuencia="MS", tipo="indice", nivel=200.0, deriva=0.0022, volatilidad=0.002),
+    "EFFR": dict(frecuencia="B", tipo="tasa", nivel=2.5, volatilidad=0.02, persistencia=0.999, minimo=0.05, faltantes=0.04),
+    "DTWEXAFEGS": dict(frecuencia="B", tipo="indice", nivel=100.0, volatilidad=0.004, faltantes=0.04),
+    "DTWEXBGS": dict(frecuencia="B", tipo="indice", nivel=110.0, volatilidad=0.003, faltantes=0.04),
+    "GS20": dict(frecuencia="MS", tipo="tasa", nivel=4.0, volatilidad=0.15, persistencia=0.97, minimo=0.5),
+    "GS10": dict(frecuencia="MS", tipo="tasa", nivel=3.5, volatilidad=0.15, persistencia=0.97, minimo=0.5),
+    "DTB3": dict(frecuencia="B", tipo="tasa", nivel=2.0, volatilidad=0.02, persistencia=0.999, minimo=0.0, faltantes=0.04),
+    "BAMLEM2BRRBBBCRPIEY": dict(frecuencia="B", tipo="tasa", nivel=5.0, volatilidad=0.03, persistencia=0.998, minimo=1.0, faltantes=0.04),
+    "VIXCLS": dict(frecuencia="B", tipo="tasa", nivel=18.0, volatilidad=1.2, persistencia=0.97, minimo=9.0, faltantes=0.04),
+    # Banxico
+    "SP30578": dict(frecuencia="MS", tipo="indice", nivel=100.0, deriva=0.0035, volatilidad=0.002),
+    "SF43783": dict(frecuencia="B", tipo="tasa", nivel=7.0, volatilidad=0.02, persistencia=0.999, minimo=3.0),
+    "SF43718": dict(frecuencia="B", tipo="indice", nivel=19.0, volatilidad=0.006),
+}
+
+# Vocabulario de las partidas del CBS (mismo registro que el archivo de ejemplo)
+CALIFICATIVOS = ["Primary", "Secondary", "Auxiliary", "Main", "Backup", "Floating", "Fixed",
+                 "Dynamic", "Static", "Modular", "Onshore", "Offshore"]
+COMPONENTES = ["Structural Assembly", "Mooring System", "Power Take-Off", "Electrical Infrastructure",
+               "Control System", "Foundation", "Cable Assembly", "Subsea Connector", "Ballast System",
+               "Navigation Lighting", "Corrosion Protection", "Hydraulic Circuit", "Generator",
+               "Power Converter", "Transformer", "Installation Vessel", "Site Survey", "Commissioning",
+               "Maintenance Program", "Insurance"]
+
+# Proporción de partidas sin Resumen por nivel, medida en cbs_data_3.xlsx (2 de 3 en el
+# nivel 2, ~3-4 % en los niveles 5 y 6); los niveles más profundos usan la del nivel 6
+PROPORCION_SIN_RESUMEN = {1: 0.0, 2: 0.667, 3: 0.0, 4: 0.0, 5: 0.033, 6: 0.042}
+
+
+def _generador(semilla: int, nombre: str = "") -> np.random.Generator:
+    """Generador independiente por nombre: cada serie es reproducible por sí sola."""
+    return np.random.default_rng([semilla, zlib.crc32(nombre.encode())])
+
+
+def serie_sintetica(periodos: int, frecuencia: str = "MS", tipo: str = "indice", nivel: float = 100.0,
+                    deriva: float = 0.0, volatilidad: float = 0.01, persistencia: float = 0.99,
+                    minimo: Optional[float] = None, faltantes: float = 0.0, fin=FIN_POR_DEFECTO,
+                    semilla: int = SEMILLA, nombre: str = "") -> pd.Series:
+    """
+    Serie de 'periodos' observaciones que terminan en 'fin', con frecuencia mensual ('MS'),
+    de días hábiles ('B') o diaria ('D'). Devuelve float64 con un DatetimeIndex, como
+    fredapi.Fred.get_series; 'faltantes' es la fracción de observaciones en NaN.
+    """
+    if frecuencia not in OBSERVACIONES_POR_ANO:
+        raise ValueError(f"Frecuencia '{frecuencia}' no soportada ({', '.join(OBSERVACIONES_POR_ANO)}).")
+    if tipo not in ("indice", "tasa"):
+        raise ValueError(f"Tipo de serie '{tipo}' no soportado (indice, tasa).")
+
+    rng = _generador(semilla, nombre)
+    indice = pd.date_range(end=pd.Timestamp(fin), periods=periodos, freq=frecuencia)
+    choques = rng.normal(0.0, volatilidad, periodos)
+    if tipo == "indice":
+        valores = nivel * np.exp(np.cumsum(choques + deriva))
+    else:
+        # AR(1) alrededor de 'nivel': x_t - nivel = persistencia * (x_{t-1} - nivel) + e_t
+        valores = nivel + deriva * np.arange(periodos) + lfilter([1.0], [1.0, -persistencia], choques)
+    if minimo is not None:
+        valores = np.maximum(valores, minimo)
+
+    if faltantes > 0:
+        valores[rng.random(periodos) < faltantes] = np.nan
+    return pd.Series(valores, index=indice)
+
+
+def _periodos(id_serie: str, periodos: Optional[int], anos: int) -> int:
+    return periodos if periodos is not None else anos * OBSERVACIONES_POR_ANO[PERFILES_SERIES[id_serie]["frecuencia"]]
+
+
+def serie_fred(id_serie: str, periodos: Optional[int] = None, anos: int = 20, fin=FIN_POR_DEFECTO,
+               semilla: int = SEMILLA) -> pd.Series:
+    """Serie con el perfil de 'id_serie' y la forma de fredapi.Fred.get_series."""
+    if id_serie not in PERFILES_SERIES:
+        raise KeyError(f"Serie sin perfil sintético: {id_serie}")
+    return serie_sintetica(_periodos(id_serie, periodos, anos), fin=fin, semilla=semilla, nombre=id_serie,
+                           **PERFILES_SERIES[id_serie])
+
+
+def serie_banxico(id_serie: str, periodos: Optional[int] = None, anos: int = 20, fin=FIN_POR_DEFECTO,
+                  semilla: int = SEMILLA) -> pd.Series:
+    """Serie con la forma que devuelve ModelosEconometricos._obtener_serie_banxico (índice 'fecha', nombre 'dato')."""
+    serie = serie_fred(id_serie, periodos, anos, fin, semilla)
+    serie.index.name = "fecha"
+    return serie.rename("dato")
+
+
+def respuesta_banxico(serie: pd.Series, id_serie: str) -> Dict[str, Any]:
+    """
+    Cuerpo JSON de la API SIE de Banxico para 'serie': fechas dd/mm/aaaa, datos como texto
+    con separador de miles y 'N/E' en las observaciones sin dato.
+    """
+    datos = [{"fecha": f"{fecha:%d/%m/%Y}", "dato": "N/E" if pd.isna(valor) else f"{valor:,.4f}"}
+             for fecha, valor in serie.items()]
+    return {"bmx": {"series": [{"idSerie": id_serie, "titulo": f"Serie sintética {id_serie}", "datos": datos}]}}
+
+
+def series_sinteticas(series_ids: Dict[str, str], periodos: Optional[int] = None, anos: int = 20,
+                      fin=FIN_POR_DEFECTO, semilla: int = SEMILLA) -> Dict[str, pd.Series]:
+    """Series crudas, por identificador, para un 'series_ids' de las páginas econométricas."""
+    return {id_serie: serie_fred(id_serie, periodos, anos, fin, semilla) for id_serie in series_ids.values()}
+
+
+def _tamanos_por_nivel(num_lineas: int, profundidad: int, raices: int) -> np.ndarray:
+    """Partidas por nivel con crecimiento geométrico desde 'raices' y suma exacta 'num_lineas'."""
+    if profundidad == 1:
+        return np.array([num_lineas])
+    if num_lineas < raices * profundidad:
+        # No alcanza para crecer: los niveles inferiores se reparten lo que queda (al menos 1 cada uno)
+        resto, num_inferiores = num_lineas - raices, profundidad - 1
+        inferiores = np.full(num_inferiores, resto // num_inferiores)
+        inferiores[num_inferiores - resto % num_inferiores:] += 1
+        return np.r_[raices, inferiores]
+    niveles = np.arange(profundidad)
+    bajo, alto = 1.0, float(num_lineas)
+    for _ in range(100):
+        factor = (bajo + alto) / 2
+        if raices * np.sum(factor ** niveles) > num_lineas:
+            alto = factor
+        else:
+            bajo = factor
+    acumulado = np.round(np.cumsum(raices * bajo ** niveles)).astype(np.int64)
+    acumulado[0], acumulado[-1] = raices, num_lineas
+    return np.diff(acumulado, prepend=0)
+
+
+def generar_cbs(num_lineas: int, profundidad: int = 6, raices: int = 3, semilla: int = SEMILLA) -> pd.DataFrame:
+    """
+    CBS de 'num_lineas' partidas con las columnas de cbs_data_3.xlsx (ID_Jerarquico,
+    Descripcion, Resumen, Costo) y en el mismo orden (cada padre antes de sus hijos).
+
+    Cada nivel tiene más partidas que el anterior y cada partida elige a su padre al azar
+    entre las del nivel superior, así que hay hojas en todos los niveles y el número de
+    hijos varía entre padres, como en un CBS real.
+    """
+    if not 1 <= profundidad <= 9:
+        raise ValueError("La profundidad del CBS debe estar entre 1 y 9 niveles.")
+    if num_lineas < raices + profundidad - 1:
+        raise ValueError(f"Se necesitan al menos {raices + profundidad - 1} partidas para {profundidad} niveles.")
+
+    rng = np.random.default_rng(semilla)
+    tamanos = _tamanos_por_nivel(num_lineas, profundidad, raices)
+
+    # Posición de cada partida entre sus hermanos, nivel por nivel (0 = sin ese nivel)
+    ordinales = np.zeros((num_lineas, profundidad), dtype=np.int32)
+    niveles = np.empty(num_lineas, dtype=np.int8)
+    ids: List[np.ndarray] = []
+    inicio = 0
+    for nivel, tamano in enumerate(tamanos):
+        fin = inicio + tamano
+        if nivel == 0:
+            ordinal = np.arange(1, tamano + 1)
+            ids_nivel = ordinal.astype(str).astype(object)
+        else:
+            padres = np.sort(rng.integers(0, tamanos[nivel - 1], tamano))
+            primero = np.r_[True, padres[1:] != padres[:-1]]
+            posicion = np.arange(tamano)
+            ordinal = posicion - np.maximum.accumulate(np.where(primero, posicion, 0)) + 1
+            inicio_padres = inicio - tamanos[nivel - 1]
+            ordinales[inicio:fin] = ordinales[inicio_padres + padres]
+            ids_nivel = ids[-1][padres] + "." + ordinal.astype(str).astype(object)
+        ordinales[inicio:fin, nivel] = ordinal
+        niveles[inicio:fin] = nivel + 1
+        ids.append(ids_nivel)
+        inicio = fin
+
+    # Recorrido en preorden: orden lexicográfico de los ordinales (el 0 del padre va primero)
+    orden = np.lexsort(ordinales.T[::-1])
+    niveles = niveles[orden]
+
+    # Textos armados una vez por combinación y repartidos por índice
+    componente = rng.integers(0, len(COMPONENTES), num_lineas)
+    calificativo = rng.integers(0, len(CALIFICATIVOS), num_lineas)
+    descripciones = np.array([f"{c} {p}" for c in CALIFICATIVOS for p in COMPONENTES], dtype=object)
+    resumenes = np.array([f"Costs associated with the {p.lower()} and its supporting equipment." for p in COMPONENTES]
+                         + [np.nan], dtype=object)
+    costos = rng.integers(10, 101, num_lineas)
+    proporciones = np.array([PROPORCION_SIN_RESUMEN.get(n, PROPORCION_SIN_RESUMEN[6]) for n in range(1, profundidad + 1)])
+    sin_resumen = rng.random(num_lineas) < proporciones[niveles - 1]
+
+    return pd.DataFrame({
+        "ID_Jerarquico": np.concatenate(ids)[orden],
+        "Descripcion": descripciones[calificativo * len(COMPONENTES) + componente],
+        "Resumen": resumenes[np.where(sin_resumen, len(COMPONENTES), componente)],
+        "Costo": costos,
+    })
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m modulos.datos_sinteticos",
+        description="Genera archivos sintéticos para probar el dashboard con datos a escala de producción.")
+    subcomandos = parser.add_subparsers(dest="tipo", required=True)
+
+    cbs = subcomandos.add_parser("cbs", help="CBS en Excel, listo para cargarse en las páginas de CBS")
+    cbs.add_argument("lineas", type=int, help="Número de partidas")
+    cbs.add_argument("salida", type=Path, help="Archivo .xlsx o .csv de salida")
+    cbs.add_argument("--profundidad", type=int, default=6, help="Niveles de la jerarquía (1 a 9)")
+    cbs.add_argument("--raices", type=int, default=3, help="Partidas de primer nivel")
+
+    serie = subcomandos.add_parser("serie", help="Serie con el perfil de un identificador de FRED o Banxico")
+    serie.add_argument("id_serie", choices=sorted(PERFILES_SERIES), metavar="id_serie",
+                       help=f"Uno de: {', '.join(sorted(PERFILES_SERIES))}")
+    serie.add_argument("salida", type=Path, help="Archivo .csv de salida")
+    serie.add_argument("--anos", type=int, default=20, help="Años de historia")
+
+    parser.add_argument("--semilla", type=int, default=SEMILLA, help="Semilla del generador")
+    args = parser.parse_args(argumentos)
+
+    if args.tipo == "cbs":
+        try:
+            df = generar_cbs(args.lineas, args.profundidad, args.raices, args.semilla)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.salida.suffix.lower() == ".csv":
+            df.to_csv(args.salida, index=False)
+        else:
+            df.to_excel(args.salida, index=False)
+    else:
+        serie_fred(args.id_serie, anos=args.anos, semilla=args.semilla).rename(args.id_serie).to_csv(
+            args.salida, index_label="fecha")
+    print(f"Archivo escrito: {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
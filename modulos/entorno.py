@@ -0,0 +1,65 @@
+# Integración opcional con Streamlit para los motores de 'modulos'.
+# Los motores usan estas funciones en lugar de llamar a Streamlit directamente. Dentro del
+# dashboard (Streamlit ya importado) delegan en st.cache_resource y st.error; en procesos
+# sin Streamlit (p. ej. el ejecutor por lotes, modulos.lote) los errores solo se registran,
+# sin importar Streamlit. Los resultados se cachean en ambos casos con la caché en memoria
+# acotada del proceso (modulos.cache_memoria).
+import functools
+import logging
+import sys
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def con_streamlit() -> bool:
+    """True si el proceso ya cargó Streamlit (servidor del dashboard, AppTest...)."""
+    return "streamlit" in sys.modules
+
+
+def configurar_log(nivel: int = logging.INFO):
+    """Muestra en la consola los mensajes de los motores (loggers 'modulos.*')."""
+    raiz = logging.getLogger("modulos")
+    raiz.setLevel(nivel)
+    if not raiz.handlers:
+        manejador = logging.StreamHandler()
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        raiz.addHandler(manejador)
+
+
+def cache_data(funcion: Optional[Callable] = None, **opciones):
+    """
+    Sustituye a @st.cache_data / @st.cache_data(ttl=...): mismas copias por acierto, pero
+    con un techo de memoria global y desalojo LRU compartido por todas las funciones.
+    """
+    from modulos.cache_memoria import memorizar
+    return memorizar(funcion, **opciones)
+
+
+def cache_resource(funcion: Callable) -> Callable:
+    """Equivale a @st.cache_resource con Streamlit; sin él, una instancia por proceso."""
+    if con_streamlit():
+        import streamlit as st
+        return st.cache_resource(funcion)
+    return functools.lru_cache(maxsize=None)(funcion)
+
+
+def reportar_error(mensaje: str):
+    """
+    Error de un motor para el usuario. Siempre se registra en el log; dentro de un
+    trabajo en segundo plano se adjunta al trabajo (la página lo muestra al terminar) y
+    en el hilo del script de Streamlit se muestra con st.error.
+    """
+    logger.error(mensaje)
+
+    from modulos.trabajos import trabajo_actual
+    trabajo = trabajo_actual()
+    if trabajo is not None:
+        trabajo.errores.append(mensaje)
+        return
+
+    if con_streamlit():
+        import streamlit as st
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx(suppress_warning=True) is not None:
+            st.error(mensaje)
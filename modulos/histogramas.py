@@ -0,0 +1,46 @@
+import numpy as np
+from typing import Any, Dict, Union
+
+# Regla de bins por defecto: un entero (número de bins) o una regla de numpy
+# ('auto', 'fd', 'sturges', 'scott', 'sqrt', ...).
+BINS_POR_DEFECTO = 100
+
+
+def calcular_histograma(datos, bins: Union[int, str] = BINS_POR_DEFECTO, escala: float = 1.0,
+                        densidad: bool = False) -> Dict[str, Any]:
+    """
+    Agrupa una muestra en bins del lado del servidor para que las gráficas reciban
+    O(bins) puntos en lugar de la muestra completa.
+
+    Args:
+        datos: Arreglo, Serie o lista de valores. Se ignoran NaN e infinitos.
+        bins: Número de bins o regla de numpy para calcularlos.
+        escala: Factor aplicado a los datos antes de agrupar (p. ej. 100 para porcentajes).
+        densidad: Si True, 'conteos' se normaliza como densidad de probabilidad.
+
+    Returns:
+        Diccionario con 'conteos', 'bordes' (len(conteos) + 1), 'n' (tamaño de la
+        muestra) y 'densidad'.
+    """
+    valores = np.asarray(datos, dtype=np.float64).ravel() * escala
+    valores = valores[np.isfinite(valores)]
+
+    if valores.size == 0:
+        return {"conteos": np.zeros(0), "bordes": np.zeros(1), "n": 0, "densidad": densidad}
+
+    # Muestra colapsada (p. ej. trayectorias que convergen al mismo valor): si el rango
+    # queda por debajo de la resolución de punto flotante no caben bins de ancho finito,
+    # así que se usa un solo bin centrado en los datos (el rango que numpy da a una muestra constante)
+    minimo, maximo = valores.min(), valores.max()
+    max_bins = bins if isinstance(bins, int) else valores.size
+    if maximo - minimo <= np.spacing(max(abs(minimo), abs(maximo))) * max_bins:
+        centro = (minimo + maximo) / 2
+        conteos, bordes = np.histogram(valores, bins=1, range=(centro - 0.5, centro + 0.5), density=densidad)
+    else:
+        conteos, bordes = np.histogram(valores, bins=bins, density=densidad)
+    return {"conteos": conteos, "bordes": bordes, "n": int(valores.size), "densidad": densidad}
+
+
+def es_histograma(obj: Any) -> bool:
+    """Indica si 'obj' es un histograma precalculado por calcular_histograma."""
+    return isinstance(obj, dict) and "conteos" in obj and "bordes" in obj
@@ -0,0 +1,224 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Se activa al arrancar el servidor (LCOE_INSTRUMENTACION=1). Desactivada, los decoradores
+# devuelven la función original y tramo()/fase()/contar() regresan de inmediato.
+ACTIVA = os.environ.get("LCOE_INSTRUMENTACION", "0") == "1"
+
+# Etapas con las que se clasifica cada tramo
+ETAPAS = ("fetch", "transform", "fit", "simulate", "reduce", "render")
+
+# Límite de tramos por registro (protege la memoria si un tramo queda dentro de un bucle)
+MAX_TRAMOS = 5000
+
+_NULO = contextlib.nullcontext()
+
+# Registro y pila de tramos abiertos del hilo actual
+_contexto = threading.local()
+
+
+class Registro:
+    """
+    Tramos y contadores de una ejecución del script (un rerun) o de un trabajo en segundo
+    plano. Los tiempos se guardan en milisegundos desde el inicio del registro.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.creado = time.time()
+        self._inicio = time.perf_counter()
+        self.duracion_ms: Optional[float] = None
+        self.tramos: List[Dict[str, Any]] = []
+        self.contadores: Dict[str, float] = {}
+        self._candado = threading.Lock()
+
+    def _ms(self, instante: float) -> float:
+        return (instante - self._inicio) * 1000
+
+    def _agregar(self, tramo: Dict[str, Any]):
+        with self._candado:
+            if len(self.tramos) < MAX_TRAMOS:
+                self.tramos.append(tramo)
+
+    def contar(self, nombre: str, cantidad: float = 1):
+        with self._candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def cerrar(self):
+        self.duracion_ms = self._ms(time.perf_counter())
+
+    def a_dict(self) -> Dict[str, Any]:
+        with self._candado:
+            tramos = sorted(self.tramos, key=lambda t: t["inicio_ms"])
+            contadores = dict(self.contadores)
+        duracion = self.duracion_ms if self.duracion_ms is not None else self._ms(time.perf_counter())
+        return {"nombre": self.nombre, "creado": self.creado, "duracion_ms": duracion,
+                "tramos": tramos, "contadores": contadores}
+
+    def a_json(self) -> str:
+        return json.dumps(self.a_dict(), indent=2, ensure_ascii=False)
+
+    def tiempo_por_etapa(self) -> Dict[str, float]:
+        """
+        Milisegundos propios por etapa: a cada tramo se le descuenta el tiempo de los tramos
+        anidados en él, así que un cálculo 'simulate' que descarga datos no cuenta dos veces.
+        """
+        with self._candado:
+            tramos = sorted(self.tramos, key=lambda t: (t["hilo"], t["inicio_ms"], t["profundidad"]))
+        propios = [t["duracion_ms"] for t in tramos]
+        abiertos: List[int] = []
+        for i, t in enumerate(tramos):
+            while abiertos:
+                padre = tramos[abiertos[-1]]
+                if padre["hilo"] == t["hilo"] and t["inicio_ms"] < padre["inicio_ms"] + padre["duracion_ms"]:
+                    break
+                abiertos.pop()
+            if abiertos:
+                propios[abiertos[-1]] -= t["duracion_ms"]
+            abiertos.append(i)
+
+        totales: Dict[str, float] = {}
+        for t, propio in zip(tramos, propios):
+            totales[t["etapa"]] = totales.get(t["etapa"], 0.0) + max(propio, 0.0)
+        return totales
+
+
+class _Tramo:
+    __slots__ = ("registro", "nombre", "etapa", "profundidad", "inicio", "fase")
+
+    def __init__(self, registro: Registro, nombre: str, etapa: str):
+        self.registro = registro
+        self.nombre = nombre
+        self.etapa = etapa
+        self.fase: Optional["_Tramo"] = None
+
+    def abrir(self, pila: List["_Tramo"]):
+        padre = pila[-1] if pila else None
+        self.profundidad = (padre.profundidad + 1 + (padre.fase is not None)) if padre else 0
+        self.inicio = time.perf_counter()
+
+    def cerrar(self, fin: float):
+        if self.fase is not None:
+            self.fase.cerrar(fin)
+            self.fase = None
+        self.registro._agregar({
+            "nombre": self.nombre,
+            "etapa": self.etapa,
+            "inicio_ms": self.registro._ms(self.inicio),
+            "duracion_ms": (fin - self.inicio) * 1000,
+            "profundidad": self.profundidad,
+            "hilo": threading.current_thread().name,
+        })
+
+    def __enter__(self):
+        pila = _contexto.pila
+        self.abrir(pila)
+        pila.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _contexto.pila.pop()
+        self.cerrar(time.perf_counter())
+        return False
+
+
+def iniciar_registro(nombre: str) -> Optional[Registro]:
+    """Inicia el registro del hilo actual (un rerun o un trabajo). None si está desactivada."""
+    if not ACTIVA:
+        return None
+    registro = Registro(nombre)
+    _contexto.registro = registro
+    _contexto.pila = []
+    return registro
+
+
+def terminar_registro() -> Optional[Registro]:
+    """Cierra el registro del hilo actual y lo devuelve."""
+    registro = getattr(_contexto, "registro", None)
+    if registro is not None:
+        fin = time.perf_counter()
+        while _contexto.pila:
+            _contexto.pila.pop().cerrar(fin)
+        registro.cerrar()
+        _contexto.registro = None
+    return registro
+
+
+def registro_actual() -> Optional[Registro]:
+    return getattr(_contexto, "registro", None)
+
+
+def tramo(nombre: str, etapa: str):
+    """
+    Context manager que mide un bloque:
+
+        with tramo("descargar series", "fetch"):
+            ...
+    """
+    if not ACTIVA:
+        return _NULO
+    registro = getattr(_contexto, "registro", None)
+    if registro is None:
+        return _NULO
+    return _Tramo(registro, nombre, etapa)
+
+
+def fase(nombre: str, etapa: str):
+    """
+    Abre un subtramo secuencial dentro del tramo en curso, sin reindentar el código: cada
+    llamada cierra la fase anterior y el tramo padre cierra la última.
+
+        @instrumentado("simulate")
+        def simular(...):
+            fase("trayectorias", "simulate")
+            ...
+            fase("cuantiles", "reduce")
+            ...
+    """
+    if not ACTIVA:
+        return
+    pila = getattr(_contexto, "pila", None)
+    if not pila:
+        return
+    padre = pila[-1]
+    ahora = time.perf_counter()
+    if padre.fase is not None:
+        padre.fase.cerrar(ahora)
+    nueva = _Tramo(padre.registro, nombre, etapa)
+    nueva.profundidad = padre.profundidad + 1
+    nueva.inicio = ahora
+    padre.fase = nueva
+
+
+def contar(nombre: str, cantidad: float = 1):
+    """Suma 'cantidad' al contador 'nombre' del registro en curso."""
+    if not ACTIVA:
+        return
+    registro = getattr(_contexto, "registro", None)
+    if registro is not None:
+        registro.contar(nombre, cantidad)
+
+
+def instrumentado(etapa: str, nombre: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorador: mide cada llamada a la función como un tramo de 'etapa'. Con la
+    instrumentación desactivada devuelve la función sin envolver (costo cero).
+    """
+    def decorador(funcion: Callable) -> Callable:
+        if not ACTIVA:
+            return funcion
+        nombre_tramo = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with tramo(nombre_tramo, etapa):
+                return funcion(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
@@ -1,7 +1,9 @@
-import streamlit as st
 import pandas as pd
-from typing import Any
+from typing import Any, Dict, Optional, Tuple
 import numpy as np
+from scipy import sparse
+from modulos.entorno import cache_data, reportar_error
+from modulos.instrumentacion import fase, instrumentado
 
 # --- FUNCIÓN AUXILIAR PARA CREAR LA RUTA CORRECTA ---
 def generar_ruta_desde_id(id_jerarquico: str) -> str:
@@ -15,20 +17,23 @@ def generar_ruta_desde_id(id_jerarquico: str) -> str:
     return '/'.join(rutas_acumuladas)
 
 
-@st.cache_data
+@cache_data
+@instrumentado("transform")
 def load_and_prepare_data(source: Any) -> pd.DataFrame:
     """Carga y prepara los datos desde un archivo local o uno subido por el usuario."""
+    fase("leer Excel", "fetch")
     try:
         df = pd.read_excel(source)
     except Exception as e:
-        st.error(f"❌ Error al leer el archivo: {e}")
+        reportar_error(f"❌ Error al leer el archivo: {e}")
         return pd.DataFrame()
 
     required_cols = ['ID_Jerarquico', 'Descripcion', 'Resumen', 'Costo']
     if not all(col in df.columns for col in required_cols):
-        st.error(f"El archivo debe contener las columnas: {', '.join(required_cols)}")
+        reportar_error(f"El archivo debe contener las columnas: {', '.join(required_cols)}")
         return pd.DataFrame()
 
+    fase("preparar columnas", "transform")
     df['ID_Jerarquico'] = df['ID_Jerarquico'].astype(str)
     df['Costo'] = pd.to_numeric(df['Costo'], errors='coerce').fillna(0)
     
@@ -40,6 +45,7 @@ def load_and_prepare_data(source: Any) -> pd.DataFrame:
 
 ## OPTIMIZACIÓN: PASO 2 - SE REEMPLAZA EL BUCLE .iterrows() POR OPERACIONES VECTORIZADAS.
 ## Esta versión es órdenes de magnitud más rápida en DataFrames grandes.
+@instrumentado("transform")
 def calculate_aggregate_costs(df: pd.DataFrame) -> pd.DataFrame:
     """
     [VERSIÓN CORREGIDA Y DEFINITIVA]
@@ -96,7 +102,7 @@ def calculate_aggregate_costs(df: pd.DataFrame) -> pd.DataFrame:
 
 ## OPTIMIZACIÓN: PASO 1 - NUEVA FUNCIÓN "ORQUESTADORA" CON CACHÉ.
 ## Esta será la única función que llamaremos desde la página para obtener los datos procesados.
-@st.cache_data
+@cache_data
 def get_processed_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Función principal que toma el df crudo, calcula los costos agregados y cachea el resultado.
@@ -108,68 +114,213 @@ def get_processed_data(df: pd.DataFrame) -> pd.DataFrame:
     df_processed = calculate_aggregate_costs(df)
     return df_processed
 
-def debug_cost_aggregation(df_aggregated: pd.DataFrame, num_checks: int = 5):
+
+@cache_data
+@instrumentado("reduce")
+def calcular_rollups_por_nivel(df_procesado: pd.DataFrame) -> Dict[int, pd.DataFrame]:
     """
-    Función de depuración para verificar que los costos de los nodos padre
-    corresponden a la suma de sus hijos directos.
+    Precalcula, en una sola pasada, las tablas de costos por categoría de todos los niveles.
+
+    Para el nivel L la categoría de una partida es el prefijo de L segmentos de su ID y se
+    suman los costos de las partidas con Nivel >= L (la misma regla de la gráfica de dona).
+    Los IDs se dividen una sola vez y todas las categorías de todos los niveles se agregan
+    con un único groupby.
+
+    Returns:
+        Diccionario {nivel: DataFrame con Categoria, Descripcion, Costo y Participacion (%)},
+        cada tabla ordenada de mayor a menor costo.
     """
-    with st.expander("🔬 Verificación de la Suma de Costos Jerárquicos"):
-        st.info(f"Se seleccionarán hasta {num_checks} nodos 'padre' al azar para verificar que su costo sea igual a la suma de sus hijos directos.")
+    if df_procesado.empty:
+        return {}
 
-        # Identificar todos los IDs que son padres
-        parent_ids = set(
-            id_str.rpartition('.')[0] for id_str in df_aggregated['ID_Jerarquico'] if '.' in id_str
-        )
-        
-        # Filtrar el DataFrame para obtener solo los nodos que son padres
-        parent_nodes = df_aggregated[df_aggregated['ID_Jerarquico'].isin(parent_ids)]
-
-        if parent_nodes.empty:
-            st.warning("No se encontraron nodos padre en los datos para verificar.")
-            return
-
-        # Seleccionar una muestra aleatoria de padres para no saturar la pantalla
-        num_to_sample = min(num_checks, len(parent_nodes))
-        parents_to_check = parent_nodes.sample(num_to_sample, random_state=1)
-
-        # Iterar sobre los padres seleccionados para verificarlos
-        for _, parent_row in parents_to_check.iterrows():
-            parent_id = parent_row['ID_Jerarquico']
-            parent_cost_calculated = parent_row['Costo']
-            
-            st.markdown(f"--- \n#### Verificando Padre: `{parent_id}`")
-            
-            # Encontrar los hijos directos de este padre
-            parent_level = parent_row['Nivel']
-            direct_children = df_aggregated[
-                df_aggregated['ID_Jerarquico'].str.startswith(parent_id + '.') &
-                (df_aggregated['Nivel'] == parent_level + 1)
-            ]
-
-            if direct_children.empty:
-                st.write("Este nodo no tiene hijos directos en el DataFrame.")
-                continue
-
-            # Sumar los costos de los hijos directos
-            children_cost_sum = direct_children['Costo'].sum()
-
-            # Mostrar los resultados de la verificación
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric(
-                    label=f"Costo Calculado para '{parent_id}'",
-                    value=f"${parent_cost_calculated:,.2f}"
-                )
-            with col2:
-                st.metric(
-                    label="Suma de Costos de Hijos Directos",
-                    value=f"${children_cost_sum:,.2f}"
-                )
-            
-            # Comparar y mostrar un mensaje de éxito o error
-            if np.isclose(parent_cost_calculated, children_cost_sum):
-                st.success(f"✅ ¡Correcto! El costo del padre coincide con la suma de sus hijos.")
-            else:
-                st.error(f"❌ ¡Error! El costo del padre NO coincide con la suma de sus hijos.")
-                st.write("Hijos directos encontrados:")
-                st.dataframe(direct_children[['ID_Jerarquico', 'Costo']])
\ No newline at end of file
+    ids = df_procesado['ID_Jerarquico'].astype(str)
+    partes = ids.str.split('.', expand=True)
+    niveles = df_procesado['Nivel'].to_numpy()
+    costos = df_procesado['Costo'].to_numpy(dtype=np.float64)
+    descripciones = df_procesado.drop_duplicates(subset=['ID_Jerarquico']).set_index('ID_Jerarquico')['Descripcion']
+
+    # Tabla larga (nivel, categoría, costo) construida con prefijos acumulados
+    bloques = []
+    prefijo = partes[0]
+    for nivel in range(1, partes.shape[1] + 1):
+        if nivel > 1:
+            prefijo = prefijo + '.' + partes[nivel - 1]
+        mascara = niveles >= nivel
+        bloques.append(pd.DataFrame({
+            'Nivel': nivel,
+            'Categoria': prefijo[mascara].to_numpy(),
+            'Costo': costos[mascara],
+        }))
+
+    df_largo = pd.concat(bloques, ignore_index=True)
+    df_rollup = df_largo.groupby(['Nivel', 'Categoria'], sort=False)['Costo'].sum().reset_index()
+    df_rollup['Descripcion'] = df_rollup['Categoria'].map(descripciones).fillna('N/A')
+    total_nivel = df_rollup.groupby('Nivel')['Costo'].transform('sum')
+    df_rollup['Participacion (%)'] = np.where(total_nivel != 0, df_rollup['Costo'] / total_nivel * 100, 0.0)
+
+    return {
+        int(nivel): tabla.drop(columns='Nivel').sort_values('Costo', ascending=False).reset_index(drop=True)
+        for nivel, tabla in df_rollup.groupby('Nivel')
+    }
+
+
+def construir_matriz_agregacion(df: pd.DataFrame, solo_hojas: bool = True) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Construye la matriz dispersa de agregación A (nodos x hojas) del CBS.
+
+    A[i, j] = 1 si la hoja j pertenece al subárbol del nodo i (incluido él mismo),
+    de modo que A @ costos_hoja reproduce 'Costo_Total' para todos los nodos con la
+    misma regla que calculate_aggregate_costs. Como la agregación es lineal, cualquier
+    perturbación de costos se propaga a todos los totales con un solo producto matricial.
+
+    Con solo_hojas=False las columnas son todos los nodos (matriz nodos x nodos), útil
+    cuando un nodo puede tener costo propio en una versión y ser padre en otra.
+
+    Returns:
+        Tupla (matriz, posiciones) donde 'posiciones' son los índices posicionales (iloc)
+        de las columnas en el DataFrame, en el mismo orden que las columnas de la matriz.
+    """
+    ids = df['ID_Jerarquico'].astype(str)
+    n = len(ids)
+
+    # Posición de cada ID (ante duplicados se respeta la primera aparición)
+    posicion = pd.Series(np.arange(n), index=ids.to_numpy())
+    posicion = posicion[~posicion.index.duplicated(keep='first')]
+
+    # Padre directo de cada fila (-1 si no existe en el DataFrame)
+    padre = ids.str.rpartition('.')[0].map(posicion).fillna(-1).astype(np.int64).to_numpy()
+
+    es_padre = np.zeros(n, dtype=bool)
+    es_padre[padre[padre >= 0]] = True
+    hojas = np.flatnonzero(~es_padre) if solo_hojas else np.arange(n)
+
+    # Se sube por la cadena de ancestros de todas las columnas a la vez, un nivel por iteración
+    columnas = np.arange(len(hojas))
+    filas_acumuladas, columnas_acumuladas = [hojas], [columnas]
+    actual = hojas
+    while True:
+        actual = padre[actual]
+        vivos = actual >= 0
+        if not vivos.any():
+            break
+        actual, columnas = actual[vivos], columnas[vivos]
+        filas_acumuladas.append(actual)
+        columnas_acumuladas.append(columnas)
+
+    filas = np.concatenate(filas_acumuladas)
+    cols = np.concatenate(columnas_acumuladas)
+    matriz = sparse.csr_matrix(
+        (np.ones(len(filas), dtype=np.float64), (filas, cols)),
+        shape=(n, len(hojas))
+    )
+    return matriz, hojas
+
+
+@cache_data
+def preparar_arbol_progresivo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepara el CBS (ya filtrado) para la carga progresiva del árbol: agrega 'ID_Padre',
+    el número de hijos de cada nodo ('Num_Hijos') y marca como raíz a los nodos cuyo
+    padre no está presente. Se indexa y ordena por 'ID_Padre' para que obtener los hijos
+    de un nodo sea una búsqueda binaria con .loc.
+    """
+    df_arbol = df.copy()
+    df_arbol['ID_Padre'] = df_arbol['ID_Jerarquico'].astype(str).str.rpartition('.')[0]
+    df_arbol['Num_Hijos'] = df_arbol['ID_Jerarquico'].map(df_arbol['ID_Padre'].value_counts()).fillna(0).astype(int)
+    df_arbol['Es_Raiz'] = ~df_arbol['ID_Padre'].isin(df_arbol['ID_Jerarquico'])
+    df_arbol['Orden'] = np.arange(len(df_arbol))
+    return df_arbol.set_index('ID_Padre', drop=False).sort_index()
+
+
+def obtener_filas_visibles(df_arbol: pd.DataFrame, expandidos: frozenset) -> pd.DataFrame:
+    """
+    Devuelve solo las filas visibles del árbol: las raíces y los hijos de los nodos
+    expandidos cuyos ancestros también están expandidos. El costo es proporcional a las
+    filas visibles, no al tamaño del CBS.
+    """
+    visibles = [df_arbol[df_arbol['Es_Raiz'].to_numpy()]]
+    frontera = visibles[0]['ID_Jerarquico'][visibles[0]['ID_Jerarquico'].isin(expandidos)]
+
+    while not frontera.empty:
+        hijos = df_arbol.loc[df_arbol.index.intersection(frontera)]
+        visibles.append(hijos)
+        frontera = hijos['ID_Jerarquico'][hijos['ID_Jerarquico'].isin(expandidos)]
+
+    return pd.concat(visibles).sort_values('Orden').reset_index(drop=True)
+
+
+@cache_data
+@instrumentado("reduce")
+def podar_arbol_lod(df_procesado: pd.DataFrame, id_raiz: Optional[str] = None, profundidad_max: int = 4,
+                    umbral_pct: float = 0.5, max_nodos: int = 2000) -> pd.DataFrame:
+    """
+    Etapa de nivel de detalle (LOD) para gráficos jerárquicos: conserva los nodos hasta
+    'profundidad_max' niveles por debajo de la raíz cuya participación en el total de la
+    raíz sea al menos 'umbral_pct', y agrupa a los hermanos descartados de cada padre en
+    un nodo sintético "Otros". Los nodos más profundos no se envían: su costo ya está
+    incluido en el 'Costo_Total' de su ancestro.
+
+    Args:
+        df_procesado: DataFrame ya agregado (salida de get_processed_data).
+        id_raiz: Nodo desde el que se explora (drill-down). None usa todo el proyecto.
+        profundidad_max: Niveles a conservar por debajo de la raíz.
+        umbral_pct: Participación mínima (% del total de la raíz) para conservar un nodo.
+        max_nodos: Máximo de nodos reales a conservar (los de mayor costo).
+
+    Returns:
+        DataFrame con ID_Jerarquico, parent_id, Descripcion, Costo_Total, Importancia (%)
+        y Num_Agrupados (partidas contenidas en los nodos "Otros", 0 en los reales).
+    """
+    columnas = ['ID_Jerarquico', 'parent_id', 'Descripcion', 'Costo_Total', 'Importancia (%)', 'Num_Agrupados']
+    if df_procesado.empty:
+        return pd.DataFrame(columns=columnas)
+
+    ids = df_procesado['ID_Jerarquico'].astype(str)
+    if id_raiz is None:
+        en_subarbol = np.ones(len(ids), dtype=bool)
+        nivel_raiz = 0
+    else:
+        en_subarbol = ((ids == id_raiz) | ids.str.startswith(id_raiz + '.')).to_numpy()
+        nivel_raiz = id_raiz.count('.')
+
+    df = df_procesado.loc[en_subarbol, ['ID_Jerarquico', 'Descripcion', 'Costo_Total', 'Importancia (%)', 'Nivel']].copy()
+    df['ID_Jerarquico'] = df['ID_Jerarquico'].astype(str)
+    df['parent_id'] = df['ID_Jerarquico'].str.rpartition('.')[0]
+    profundidad = df['Nivel'].to_numpy() - nivel_raiz
+    es_raiz = (df['ID_Jerarquico'] == id_raiz).to_numpy() if id_raiz is not None else ~df['parent_id'].isin(df['ID_Jerarquico']).to_numpy()
+    if id_raiz is not None:
+        df.loc[es_raiz, 'parent_id'] = ''
+
+    total_raiz = df.loc[es_raiz, 'Costo_Total'].sum()
+    participacion = df['Costo_Total'].to_numpy() / total_raiz * 100 if total_raiz else np.zeros(len(df))
+
+    # 1. Candidatos por profundidad y participación; se acotan a los 'max_nodos' de mayor costo
+    conservar = es_raiz | ((profundidad <= profundidad_max) & (participacion >= umbral_pct))
+    if conservar.sum() > max_nodos:
+        orden = np.argsort(-df['Costo_Total'].to_numpy(), kind='stable')
+        rango = np.empty(len(df), dtype=np.int64)
+        rango[orden] = np.arange(len(df))
+        conservar &= es_raiz | (rango < max_nodos)
+
+    # 2. Cierre hacia arriba: un nodo solo se conserva si su padre también se conserva
+    ids_conservados = pd.Index(df['ID_Jerarquico'][conservar])
+    while True:
+        cerrado = conservar & (es_raiz | df['parent_id'].isin(ids_conservados).to_numpy())
+        if cerrado.sum() == conservar.sum():
+            break
+        conservar = cerrado
+        ids_conservados = pd.Index(df['ID_Jerarquico'][conservar])
+
+    # 3. Hijos directos descartados (por participación o por el tope de nodos) de cada nodo
+    #    conservado -> un nodo "Otros" por padre
+    descartados = df[~conservar & (profundidad <= profundidad_max) & df['parent_id'].isin(ids_conservados).to_numpy()]
+    otros = descartados.groupby('parent_id').agg(
+        Costo_Total=('Costo_Total', 'sum'),
+        Num_Agrupados=('ID_Jerarquico', 'size'),
+        Importancia=('Importancia (%)', 'sum'),
+    ).reset_index().rename(columns={'Importancia': 'Importancia (%)'})
+    otros['ID_Jerarquico'] = otros['parent_id'] + '.otros'
+    otros['Descripcion'] = 'Otros (' + otros['Num_Agrupados'].astype(str) + ' partidas)'
+
+    df_lod = df[conservar].assign(Num_Agrupados=0)
+    return pd.concat([df_lod[columnas], otros[columnas]], ignore_index=True)
@@ -0,0 +1,195 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from modulos.entorno import configurar_log
+from modulos.sesiones import CLAVES_SESION, LectorSesion, exportar_sesion
+
+logger = logging.getLogger(__name__)
+
+# Motor -> (módulo, función). Los módulos se importan en cada proceso trabajador.
+MOTORES = {
+    "econometrico": ("modulos.modelos_econometricos", "generar_proyeccion_econometrica"),
+    "sp500": ("modulos.MODULO_SP500", "generar_proyeccion_sp500"),
+    "beta_mejorada": ("modulos.Montecarlo", "ejecutar_simulacion_beta_mejorada"),
+    "reversion_media": ("modulos.Montecarlo", "ejecutar_simulacion_reversion_media_compatible"),
+}
+
+# Archivos del paquete de resultados
+ARCHIVO_PROYECCIONES = "proyecciones.session"
+ARCHIVO_RESUMEN = "resumen.json"
+
+# Paquete que el dashboard carga al iniciar cada sesión, si existe
+RUTA_PREDETERMINADAS = os.environ.get("LCOE_PROYECCIONES_PREDETERMINADAS", f"proyecciones/{ARCHIVO_PROYECCIONES}")
+
+
+class ErrorConfiguracion(ValueError):
+    """El archivo de configuración del lote no es válido."""
+
+
+def _expandir_variables(valor: Any) -> Any:
+    """Sustituye ${VARIABLE} en los textos de la configuración (p. ej. claves de API)."""
+    if isinstance(valor, str):
+        return os.path.expandvars(valor)
+    if isinstance(valor, dict):
+        return {k: _expandir_variables(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_expandir_variables(v) for v in valor]
+    return valor
+
+
+def cargar_configuracion(ruta) -> Dict[str, Dict[str, Any]]:
+    """
+    Lee la configuración JSON del lote:
+
+        {"proyecciones": {"resultados_usa": {"motor": "econometrico", "parametros": {...}}, ...}}
+
+    Cada clave es la de st.session_state en la que el dashboard muestra el resultado. Los
+    simuladores de Montecarlo reciben 'df_historico' como columnas ({"Año": [...], "Beta": [...]}).
+    """
+    contenido = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    proyecciones = contenido.get("proyecciones")
+    if not isinstance(proyecciones, dict) or not proyecciones:
+        raise ErrorConfiguracion("La configuración debe tener un objeto 'proyecciones' no vacío.")
+
+    for clave, definicion in proyecciones.items():
+        if clave not in CLAVES_SESION:
+            raise ErrorConfiguracion(f"'{clave}' no es un análisis del dashboard ({', '.join(CLAVES_SESION)}).")
+        if definicion.get("motor") not in MOTORES:
+            raise ErrorConfiguracion(f"'{clave}': motor desconocido '{definicion.get('motor')}' ({', '.join(MOTORES)}).")
+    return _expandir_variables(proyecciones)
+
+
+def _preparar_parametros(motor: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    parametros = dict(parametros)
+    if motor in ("beta_mejorada", "reversion_media"):
+        parametros["df_historico"] = pd.DataFrame(parametros["df_historico"]).set_index("Año")
+    return parametros
+
+
+class _ColectorErrores(logging.Handler):
+    """Guarda los errores que reportan los motores durante una proyección."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.mensajes: List[str] = []
+
+    def emit(self, registro: logging.LogRecord):
+        self.mensajes.append(registro.getMessage())
+
+
+def ejecutar_proyeccion(clave: str, motor: str, parametros: Dict[str, Any]) -> Tuple[str, Optional[bytes], Dict[str, Any]]:
+    """
+    Ejecuta una proyección (en el proceso actual) y devuelve su resultado serializado con
+    el formato de sesión, o None si el motor no produjo resultado, más su estado.
+    """
+    colector = _ColectorErrores()
+    logging.getLogger("modulos").addHandler(colector)
+    inicio = time.perf_counter()
+    try:
+        modulo, nombre = MOTORES[motor]
+        funcion = getattr(importlib.import_module(modulo), nombre)
+        resultado = funcion(**_preparar_parametros(motor, parametros))
+        datos = exportar_sesion({clave: resultado}) if resultado is not None else None
+        estado = {"estado": "completado" if datos is not None else "fallido"}
+    except Exception as e:
+        datos = None
+        estado = {"estado": "fallido"}
+        colector.mensajes.append(f"{type(e).__name__}: {e}")
+    finally:
+        logging.getLogger("modulos").removeHandler(colector)
+
+    estado.update(motor=motor, duracion_s=round(time.perf_counter() - inicio, 3), errores=colector.mensajes)
+    return clave, datos, estado
+
+
+def _iniciar_trabajador(nivel_log: int):
+    configurar_log(nivel_log)
+
+
+def ejecutar_lote(proyecciones: Dict[str, Dict[str, Any]], directorio_salida, procesos: Optional[int] = None,
+                  nivel_log: int = logging.WARNING) -> Dict[str, Any]:
+    """
+    Ejecuta las proyecciones en paralelo (un proceso por proyección, hasta 'procesos') y
+    escribe en 'directorio_salida':
+        proyecciones.session  resultados completados (se abre desde la página principal)
+        resumen.json          estado, duración y errores de cada proyección
+    Devuelve el resumen.
+    """
+    directorio = Path(directorio_salida)
+    directorio.mkdir(parents=True, exist_ok=True)
+    procesos = procesos or min(len(proyecciones), os.cpu_count() or 1)
+
+    resultados: Dict[str, Any] = {}
+    estados: Dict[str, Dict[str, Any]] = {}
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=(nivel_log,)) as ejecutor:
+        futuros = [ejecutor.submit(ejecutar_proyeccion, clave, definicion["motor"], definicion.get("parametros", {}))
+                   for clave, definicion in proyecciones.items()]
+        for futuro in as_completed(futuros):
+            clave, datos, estado = futuro.result()
+            estados[clave] = estado
+            if datos is not None:
+                resultados[clave] = LectorSesion(datos).cargar(clave)
+            logger.info(f"{clave}: {estado['estado']} en {estado['duracion_s']:.1f} s")
+
+    # Escritura atómica: el dashboard nunca lee un paquete a medias
+    temporal = directorio / f"{ARCHIVO_PROYECCIONES}.tmp"
+    temporal.write_bytes(exportar_sesion(resultados))
+    os.replace(temporal, directorio / ARCHIVO_PROYECCIONES)
+
+    resumen = {
+        "creado": datetime.now().isoformat(timespec='seconds'),
+        "duracion_s": round(time.perf_counter() - inicio, 3),
+        "proyecciones": {clave: estados[clave] for clave in proyecciones},
+    }
+    (directorio / ARCHIVO_RESUMEN).write_text(json.dumps(resumen, indent=2, ensure_ascii=False), encoding="utf-8")
+    return resumen
+
+
+def leer_paquete(ruta=RUTA_PREDETERMINADAS) -> Dict[str, Any]:
+    """Resultados de un paquete proyecciones.session ({} si no existe)."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return {}
+    return LectorSesion(ruta.read_bytes()).cargar_todo()
+
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m modulos.lote",
+        description="Ejecuta las proyecciones de un archivo de configuración sin la interfaz de Streamlit.")
+    parser.add_argument("configuracion", type=Path, help="Archivo JSON con las proyecciones a ejecutar")
+    parser.add_argument("--salida", type=Path, default=Path(RUTA_PREDETERMINADAS).parent,
+                        help="Directorio del paquete de resultados (por defecto, el que carga el dashboard)")
+    parser.add_argument("--procesos", type=int, help="Proyecciones simultáneas (por defecto, una por núcleo)")
+    parser.add_argument("--detalle", action="store_true", help="Mostrar los mensajes de los motores")
+    args = parser.parse_args(argumentos)
+
+    configurar_log(logging.INFO)
+    try:
+        proyecciones = cargar_configuracion(args.configuracion)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    resumen = ejecutar_lote(proyecciones, args.salida, args.procesos,
+                            nivel_log=logging.INFO if args.detalle else logging.WARNING)
+    fallidas = [clave for clave, estado in resumen["proyecciones"].items() if estado["estado"] != "completado"]
+    for clave in fallidas:
+        logger.error(f"{clave}: {'; '.join(resumen['proyecciones'][clave]['errores']) or 'sin resultado'}")
+    logger.info(f"Paquete escrito en {args.salida} ({len(proyecciones) - len(fallidas)} de {len(proyecciones)} proyecciones).")
+    return 1 if fallidas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
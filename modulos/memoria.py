@@ -0,0 +1,166 @@
+import os
+import sys
+import threading
+import time
+import types
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Panel de memoria en la barra lateral (LCOE_PANEL_MEMORIA=1)
+PANEL_ACTIVO = os.environ.get("LCOE_PANEL_MEMORIA", "0") == "1"
+
+# Con LCOE_LIBERAR_CRUDOS=1 los resultados descartan sus datos crudos en cuanto sus
+# resúmenes están calculados (p. ej. los residuos econométricos tras los diagnósticos)
+LIBERAR_CRUDOS = os.environ.get("LCOE_LIBERAR_CRUDOS", "0") == "1"
+
+# Una sesión que no se contabiliza en este tiempo se considera cerrada
+VIGENCIA_SESION_S = 30 * 60
+
+# Objetos que no pertenecen a ningún resultado aunque estén referenciados desde uno
+_NO_RECORRER = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                types.MethodType, types.CodeType, types.FrameType)
+_ATOMICOS = (str, bytes, bytearray, int, float, complex, bool, type(None), np.generic)
+
+
+def tamano_profundo(obj: Any) -> int:
+    """
+    Bytes que ocupa 'obj' con todo lo que contiene: DataFrames y Series con sus textos
+    (memory_usage(deep=True)), arreglos de numpy (una vez por búfer, aunque haya vistas),
+    contenedores y atributos de objetos (p. ej. un modelo de statsmodels). Cada objeto se
+    cuenta una sola vez.
+    """
+    vistos = set()
+    total = 0
+    pendientes = [obj]
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos or isinstance(actual, _NO_RECORRER):
+            continue
+        vistos.add(id(actual))
+
+        if isinstance(actual, (pd.DataFrame, pd.Series)):
+            total += int(np.sum(actual.memory_usage(index=True, deep=True)))
+        elif isinstance(actual, pd.Index):
+            total += int(actual.memory_usage(deep=True))
+        elif isinstance(actual, np.ndarray):
+            base = actual
+            while isinstance(base.base, np.ndarray):
+                base = base.base
+            if base is actual or id(base) not in vistos:
+                vistos.add(id(base))
+                total += base.nbytes
+            if actual.dtype == object:
+                pendientes.extend(actual.ravel().tolist())
+        else:
+            total += sys.getsizeof(actual)
+            if isinstance(actual, _ATOMICOS):
+                continue
+            if isinstance(actual, dict):
+                pendientes.extend(actual.keys())
+                pendientes.extend(actual.values())
+            elif isinstance(actual, (list, tuple, set, frozenset)):
+                pendientes.extend(actual)
+            # Atributos, también de subclases de contenedores (p. ej. el modelo de ResultadosEconometricos)
+            atributos = getattr(actual, "__dict__", None)
+            if atributos is not None:
+                pendientes.append(atributos)
+            for clase in type(actual).__mro__:
+                for nombre in getattr(clase, "__slots__", ()):
+                    valor = getattr(actual, nombre, None)
+                    if valor is not None:
+                        pendientes.append(valor)
+    return total
+
+
+def memoria_proceso() -> Optional[int]:
+    """Memoria residente (RSS) del proceso en bytes; None si el sistema no la expone."""
+    try:
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Sin /proc (macOS): el pico de memoria residente, que getrusage da en bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _huella(valor: Any) -> Tuple[int, Optional[int]]:
+    """
+    Identidad del valor más su longitud: las páginas reemplazan el resultado al
+    recalcular, y un resultado que gana o pierde claves (resúmenes perezosos, datos
+    crudos liberados) cambia de longitud.
+    """
+    try:
+        longitud = len(valor)
+    except TypeError:
+        longitud = None
+    return id(valor), longitud
+
+
+class ContabilidadMemoria:
+    """
+    Tamaño de lo que guarda cada sesión del dashboard. Cada rerun contabiliza su
+    session_state; las mediciones se memorizan por huella, así que solo se recorren los
+    valores nuevos o modificados. Los totales del proceso suman las sesiones vigentes.
+    """
+
+    def __init__(self, vigencia_s: float = VIGENCIA_SESION_S):
+        self.vigencia_s = vigencia_s
+        self._candado = threading.Lock()
+        self._sesiones: Dict[str, Dict[str, Any]] = {}
+
+    def contabilizar(self, id_sesion: str, estado: Mapping[Hashable, Any]) -> Dict[str, int]:
+        """Bytes por clave de 'estado', de mayor a menor; actualiza el registro de la sesión."""
+        with self._candado:
+            anteriores = self._sesiones.get(id_sesion, {}).get("claves", {})
+
+        claves: Dict[str, Tuple[Tuple[int, Optional[int]], int]] = {}
+        for clave, valor in list(estado.items()):
+            huella = _huella(valor)
+            previo = anteriores.get(str(clave))
+            claves[str(clave)] = previo if previo is not None and previo[0] == huella else (huella, tamano_profundo(valor))
+
+        with self._candado:
+            self._sesiones[id_sesion] = {"claves": claves, "actualizado": time.time()}
+        return dict(sorted(((clave, tamano) for clave, (_, tamano) in claves.items()), key=lambda c: -c[1]))
+
+    def olvidar(self, id_sesion: str):
+        with self._candado:
+            self._sesiones.pop(id_sesion, None)
+
+    def totales(self) -> Dict[str, Any]:
+        """Sesiones vigentes, bytes que suman y memoria residente del proceso."""
+        limite = time.time() - self.vigencia_s
+        with self._candado:
+            for id_sesion in [s for s, datos in self._sesiones.items() if datos["actualizado"] < limite]:
+                del self._sesiones[id_sesion]
+            por_sesion = {id_sesion: sum(tamano for _, tamano in datos["claves"].values())
+                          for id_sesion, datos in self._sesiones.items()}
+        return {"sesiones": len(por_sesion), "bytes_sesiones": sum(por_sesion.values()),
+                "bytes_sesion_maxima": max(por_sesion.values(), default=0), "bytes_proceso": memoria_proceso()}
+
+
+# Una contabilidad por proceso, compartida por todas las sesiones
+contabilidad = ContabilidadMemoria()
+
+
+def liberar_crudos(estado: Mapping[Hashable, Any], forzar: bool = False) -> Dict[str, int]:
+    """
+    Descarta los datos crudos de los resultados guardados en 'estado' que ya tienen sus
+    resúmenes calculados (con forzar=True los calcula antes). Devuelve los bytes
+    liberados por clave.
+    """
+    liberados = {}
+    for clave, valor in list(estado.items()):
+        liberar = getattr(valor, "liberar_crudos", None)
+        if not callable(liberar):
+            continue
+        antes = tamano_profundo(valor)
+        if liberar(forzar=forzar):
+            liberados[str(clave)] = antes - tamano_profundo(valor)
+    return liberados
@@ -1,11 +1,120 @@
-import streamlit as st
+import logging
 import pandas as pd
 import numpy as np
 from fredapi import Fred
 import requests
-from statsmodels.tsa.stattools import adfuller
+from scipy import stats
+from statsmodels.tsa.stattools import adfuller, acf
 from statsmodels.tsa.api import VAR, VECM
 from statsmodels.tsa.vector_ar.vecm import coint_johansen
+from statsmodels.stats.diagnostic import acorr_ljungbox
+from modulos.histogramas import calcular_histograma
+from modulos.cache_disco import huella_entradas, obtener_cache_disco
+from modulos.trabajos import reportar_progreso
+from modulos.instrumentacion import fase, instrumentado
+from modulos.entorno import cache_data, reportar_error
+
+logger = logging.getLogger(__name__)
+
+# Versión del motor econométrico: incrementarla al cambiar la metodología invalida la caché en disco
+VERSION_MOTOR = 1
+
+
+@instrumentado("reduce")
+def calcular_diagnosticos_residuos(residuos, nlags=24, bins=25):
+    """
+    Calcula los diagnósticos de residuos que muestra la pestaña 'Diagnósticos': ACF con
+    bandas de confianza al 95%, ajuste normal con histograma de densidad, Ljung-Box y
+    Jarque-Bera. Devuelve None si no hay residuos suficientes.
+    """
+    residuos = pd.Series(residuos, dtype=float).dropna()
+    nlags = min(nlags, len(residuos) - 1)
+    if nlags < 1:
+        return None
+
+    # ACF: bandas centradas en cero (como las dibuja la gráfica)
+    valores_acf, confint = acf(residuos, nlags=nlags, alpha=0.05)
+    acf_diag = {
+        "rezagos": np.arange(1, nlags + 1),
+        "valores": valores_acf[1:],
+        "banda_superior": confint[1:, 1] - valores_acf[1:],
+        "banda_inferior": confint[1:, 0] - valores_acf[1:],
+    }
+
+    # Ajuste normal: histograma de densidad y curva teórica
+    mu, std = stats.norm.fit(residuos)
+    x_curva = np.linspace(residuos.min(), residuos.max(), 100)
+    normal_diag = {
+        "mu": mu,
+        "std": std,
+        "histograma": calcular_histograma(residuos, bins=bins, densidad=True),
+        "x_curva": x_curva,
+        "y_curva": stats.norm.pdf(x_curva, mu, std),
+    }
+
+    ljung_box = acorr_ljungbox(residuos, lags=[nlags])
+    jb = stats.jarque_bera(residuos)
+
+    return {
+        "acf": acf_diag,
+        "normal": normal_diag,
+        "ljung_box": {
+            "rezagos": nlags,
+            "estadistico": float(ljung_box["lb_stat"].iloc[0]),
+            "p_valor": float(ljung_box["lb_pvalue"].iloc[0]),
+        },
+        "jarque_bera": {
+            "estadistico": float(jb.statistic),
+            "p_valor": float(jb.pvalue),
+            "asimetria": float(stats.skew(residuos)),
+            "curtosis": float(stats.kurtosis(residuos, fisher=False)),
+        },
+    }
+
+
+class ResultadosEconometricos(dict):
+    """
+    Diccionario de resultados de la proyección econométrica.
+
+    'resumen_texto' y 'diagnosticos' no se calculan al entrenar: se generan la primera vez
+    que se consultan y quedan memorizados en el propio diccionario (que la página guarda en
+    session_state), de modo que las visitas siguientes a la pestaña solo dibujan.
+    """
+
+    def __init__(self, datos, modelo=None):
+        super().__init__(datos)
+        self._modelo = modelo
+
+    def __missing__(self, clave):
+        if clave == "resumen_texto":
+            valor = str(self._modelo.summary()) if self._modelo is not None else ""
+        elif clave == "diagnosticos":
+            valor = calcular_diagnosticos_residuos(self.get("residuos", []))
+        else:
+            raise KeyError(clave)
+        self[clave] = valor
+        return valor
+
+    def resumido(self) -> bool:
+        """True si el resumen y los diagnósticos ya están calculados."""
+        return dict.__contains__(self, "resumen_texto") and dict.__contains__(self, "diagnosticos")
+
+    def liberar_crudos(self, forzar: bool = False) -> bool:
+        """
+        Descarta los residuos y el modelo ajustado, que solo se usan para generar el resumen
+        y los diagnósticos. Sin 'forzar' solo lo hace si ambos ya están calculados; con
+        'forzar' los calcula antes. Devuelve True si liberó algo.
+        """
+        if self._modelo is None and "residuos" not in self:
+            return False
+        if not (forzar or self.resumido()):
+            return False
+        # Se calculan antes de descartar los datos de los que dependen
+        self["resumen_texto"]
+        self["diagnosticos"]
+        self.pop("residuos", None)
+        self._modelo = None
+        return True
 
 
 class ModelosEconometricos:
@@ -28,7 +137,7 @@ class ModelosEconometricos:
     def _obtener_serie_banxico(self, id_serie):
         token = self.api_key.get('banxico')
         if not token:
-            st.error("Token de Banxico no proporcionado.")
+            reportar_error("Token de Banxico no proporcionado.")
             return None
 
         fecha_fin = pd.Timestamp.now().strftime('%Y-%m-%d')
@@ -46,35 +155,38 @@ class ModelosEconometricos:
             df_temp['dato'] = pd.to_numeric(df_temp['dato'], errors='coerce')
             return df_temp['dato']
         except Exception as e:
-            st.error(f"Error al obtener la serie {id_serie} de Banxico: {e}")
+            reportar_error(f"Error al obtener la serie {id_serie} de Banxico: {e}")
             return None
 
     def _obtener_serie_fred(self, id_serie):
         api_key = self.api_key.get('fred')
         if not api_key:
-            st.error("Clave de API de FRED no proporcionada.")
+            reportar_error("Clave de API de FRED no proporcionada.")
             return None
 
         try:
             fred = Fred(api_key=api_key)
             return fred.get_series(id_serie, observation_start=self.start_date)
         except Exception as e:
-            st.error(f"Error al obtener la serie '{id_serie}' de FRED: {e}")
+            reportar_error(f"Error al obtener la serie '{id_serie}' de FRED: {e}")
             return None
 
+    @instrumentado("transform")
     def _cargar_y_procesar_datos(self):
+        fase("descargar series", "fetch")
         if 'banxico' in self.api_key and len(self.api_key['banxico']) == 64:
-            print("Detectada API de Banxico. Descargando datos...")
+            logger.info("Detectada API de Banxico. Descargando datos...")
             series_cargadas = {nombre: self._obtener_serie_banxico(id_serie) 
                              for nombre, id_serie in self.series_ids.items()}
         else:
-            print("Detectada API de FRED. Descargando datos...")
+            logger.info("Detectada API de FRED. Descargando datos...")
             series_cargadas = {nombre: self._obtener_serie_fred(id_serie) 
                              for nombre, id_serie in self.series_ids.items()}
 
         if not all(serie is not None for serie in series_cargadas.values()):
             return 
 
+        fase("procesar series", "transform")
         df_raw = pd.concat(series_cargadas.values(), axis=1, keys=series_cargadas.keys())
         df_raw.ffill(inplace=True)
         df_mensual = df_raw.resample('MS').mean()
@@ -107,8 +219,9 @@ class ModelosEconometricos:
         df_final.replace([np.inf, -np.inf], np.nan, inplace=True)
         df_final.dropna(inplace=True)
         self.df = df_final
-        print("✅ Datos históricos obtenidos y procesados.")
+        logger.info("✅ Datos históricos obtenidos y procesados.")
 
+    @instrumentado("fit")
     def _seleccionar_y_entrenar(self):
         """Realiza las pruebas estadísticas y entrena el modelo."""
         try:
@@ -130,14 +243,14 @@ class ModelosEconometricos:
 
             if config_objetivo.get('type') == 'yoy_pct_change_calculated':
                 variables_para_pruebas.remove(self.variable_objetivo)
-                print(f"🎯 Variable objetivo '{self.variable_objetivo}' es YoY calculada - EXCLUIDA de pruebas ADF")
+                logger.info(f"🎯 Variable objetivo '{self.variable_objetivo}' es YoY calculada - EXCLUIDA de pruebas ADF")
 
             for col in variables_para_pruebas:
                 adf_result = adfuller(df_para_analisis[col].dropna())
                 p_value = adf_result[1]
                 if p_value >= 0.05:
                     self.series_no_estacionarias.append(col)
-                print(f"Prueba ADF para {col}: p-value = {p_value:.4f}, {'No estacionaria' if p_value >= 0.05 else 'Estacionaria'}")
+                logger.info(f"Prueba ADF para {col}: p-value = {p_value:.4f}, {'No estacionaria' if p_value >= 0.05 else 'Estacionaria'}")
             
 
             # 3. Lógica de cointegración
@@ -166,11 +279,11 @@ class ModelosEconometricos:
                     
                     # NUNCA diferenciar variables YoY calculadas
                     if config_col and config_col.get('type') == 'yoy_pct_change_calculated':
-                        print(f"⚠️  SALTANDO diferenciación de {col} (es YoY calculada)")
+                        logger.info(f"⚠️  SALTANDO diferenciación de {col} (es YoY calculada)")
                         continue
                     
                     self.df_modelo[col] = self.df_modelo[col].diff()
-                    print(f"Serie {col} diferenciada para modelo VAR")
+                    logger.info(f"Serie {col} diferenciada para modelo VAR")
      
             self.df_modelo.dropna(inplace=True)
             
@@ -186,37 +299,42 @@ class ModelosEconometricos:
                     coint_rank=self.num_relaciones_coint, 
                     deterministic='ci'
                 ).fit()
-                print("✅ Modelo VECM entrenado exitosamente.")
+                logger.info("✅ Modelo VECM entrenado exitosamente.")
                 
             else:
                 var_model = VAR(self.df_modelo)
                 lag_order = var_model.select_order(maxlags=min(12, len(self.df_modelo)//4))
                 p_optimo = lag_order.aic
                 self.resultados_modelo = var_model.fit(maxlags=p_optimo, ic='aic')
-                print(f"✅ Modelo VAR entrenado exitosamente con {p_optimo} rezagos.")
+                logger.info(f"✅ Modelo VAR entrenado exitosamente con {p_optimo} rezagos.")
 
         except Exception as e:
-            print(f"❌ Error durante el entrenamiento del modelo: {e}")
+            logger.error(f"Error durante el entrenamiento del modelo: {e}")
             self.resultados_modelo = None
 
+    @instrumentado("simulate")
     def ejecutar_proyeccion(self):
         """Ejecuta la proyección completa sin decoradores problemáticos."""
         
-        # 1. Cargar y procesar datos
-        self._cargar_y_procesar_datos()
+        # 1. Cargar y procesar datos (si no se cargaron antes)
+        if self.df is None:
+            self._cargar_y_procesar_datos()
         if self.df is None or self.df.empty:
-            st.error("Falló la carga de datos. No se puede continuar.")
+            reportar_error("Falló la carga de datos. No se puede continuar.")
             return None
 
         # 2. Entrenar modelo
+        reportar_progreso(0.4, "Entrenando modelo")
         self._seleccionar_y_entrenar()
         if self.resultados_modelo is None:
-            st.error("Falló el entrenamiento del modelo. No se puede continuar.")
+            reportar_error("Falló el entrenamiento del modelo. No se puede continuar.")
             return None
 
         n_periodos = self.anos_proyeccion * 12
 
         # 3. Generar proyecciones
+        reportar_progreso(0.7, "Generando proyecciones")
+        fase("proyecciones y escenarios", "simulate")
         try:
             if self.usar_vecm:
                 punto_proy, lim_inf, lim_sup = self.resultados_modelo.predict(steps=n_periodos, alpha=0.05)
@@ -242,7 +360,7 @@ class ModelosEconometricos:
                 tipo_objetivo = config_objetivo.get('type')
                 
                 if tipo_objetivo == 'yoy_pct_change_calculated':
-                    print("Reconstruyendo niveles para YoY calculada...")
+                    logger.info("Reconstruyendo niveles para YoY calculada...")
                     
                     # Para YoY calculada, la reconstrucción es más compleja
                     # Las diferencias proyectadas representan cambios en la tasa YoY, no en niveles
@@ -257,7 +375,7 @@ class ModelosEconometricos:
                     df_proy_altas.iloc[:, idx_objetivo] = ultimo_yoy + df_proy_altas.iloc[:, idx_objetivo].cumsum()
                     
                 elif tipo_objetivo == 'yoy_pct_change_official':
-                    print("Reconstruyendo niveles para inflación oficial diferenciada...")
+                    logger.info("Reconstruyendo niveles para inflación oficial diferenciada...")
                     
                     # Similar al caso anterior
                     ultimo_valor = self.df[self.variable_objetivo].iloc[-1]
@@ -285,7 +403,7 @@ class ModelosEconometricos:
             })
 
         except Exception as e:
-            st.error(f"Error en la generación de proyecciones: {e}")
+            reportar_error(f"Error en la generación de proyecciones: {e}")
             return None
 
         # 4. CORRECCIÓN: Crear escenarios de manera más coherente
@@ -314,6 +432,8 @@ class ModelosEconometricos:
                     escenario.iloc[i] = valor_previo + theta * (meta - valor_previo)
 
         # 5. CORRECCIÓN: Análisis de residuos con formato unificado
+        reportar_progreso(0.9, "Preparando resultados")
+        fase("residuos y tablas", "reduce")
         try:
             # Obtener residuos brutos del modelo (independientemente de si es VAR o VECM)
             residuos_brutos = self.resultados_modelo.resid
@@ -329,10 +449,10 @@ class ModelosEconometricos:
             # Extraer residuos finales de la variable objetivo
             residuos_finales = df_residuos[self.variable_objetivo]
             
-            print(f"✅ Residuos extraídos correctamente. Forma: {residuos_finales.shape}")
+            logger.info(f"✅ Residuos extraídos correctamente. Forma: {residuos_finales.shape}")
             
         except Exception as e:
-            print(f"Warning: No se pudieron extraer residuos correctamente: {e}")
+            logger.warning(f"No se pudieron extraer residuos correctamente: {e}")
             # Crear una serie vacía como fallback
             residuos_finales = pd.Series(dtype=float, name=self.variable_objetivo)
 
@@ -350,7 +470,7 @@ class ModelosEconometricos:
             'Mínimo (%)': [escenario_base.min(), escenario_positivo.min(), escenario_negativo.min()]
         }, index=['Base', 'Positivo', 'Negativo'])
         
-        resultados = {
+        resultados = ResultadosEconometricos({
             "df_historico": self.df,
             "escenario_base": escenario_base,
             "escenario_positivo": escenario_positivo,
@@ -361,23 +481,22 @@ class ModelosEconometricos:
             "anos_proyectados": self.anos_proyeccion,
             "series_no_estacionarias": self.series_no_estacionarias,
             "relaciones_coint": self.num_relaciones_coint,
-            "resumen_texto": str(self.resultados_modelo.summary()),
             "residuos": residuos_finales  # Ahora usando el formato correcto
-        }
+        }, modelo=self.resultados_modelo)
 
-        print(f"✅ Proyección completada. Modelo: {'VECM' if self.usar_vecm else 'VAR'}")
+        logger.info(f"✅ Proyección completada. Modelo: {'VECM' if self.usar_vecm else 'VAR'}")
         return resultados
 
 
-@st.cache_data
+@cache_data
 def generar_proyeccion_econometrica(api_key, series_ids, processing_config, start_date, 
                                   anos_proyeccion, variables_modelo, variable_objetivo, 
                                   params_escenarios):
     """
-    Función wrapper para usar con st.cache_data.
+    Función wrapper para usar con cache_data (st.cache_data dentro del dashboard).
     Esta función SÍ se puede cachear correctamente.
     """
-    print("--- EJECUTANDO CÁLCULO ECONOMÉTRICO PESADO ---")
+    logger.info("--- EJECUTANDO CÁLCULO ECONOMÉTRICO PESADO ---")
     
     # Crear instancia del modelo
     modelo = ModelosEconometricos(
@@ -391,5 +510,14 @@ def generar_proyeccion_econometrica(api_key, series_ids, processing_config, star
         params_escenarios=params_escenarios,
     )
     
-    # Ejecutar proyección
-    return modelo.ejecutar_proyeccion()
\ No newline at end of file
+    # Cargar los datos primero: la caché en disco se identifica por su contenido, así que
+    # una nueva publicación de las series genera una proyección nueva
+    reportar_progreso(0.0, "Descargando series")
+    modelo._cargar_y_procesar_datos()
+    if modelo.df is None or modelo.df.empty:
+        reportar_error("Falló la carga de datos. No se puede continuar.")
+        return None
+
+    huella = huella_entradas(modelo.df, series_ids, processing_config, anos_proyeccion,
+                             variables_modelo, variable_objetivo, params_escenarios)
+    return obtener_cache_disco().obtener_o_calcular("econometrico", VERSION_MOTOR, huella, modelo.ejecutar_proyeccion)
\ No newline at end of file
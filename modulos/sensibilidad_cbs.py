@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+from typing import Optional
+from scipy import sparse
+from modulos.entorno import cache_data
+from modulos.logica_cbs import construir_matriz_agregacion
+
+
+def _etiquetas_conductores(df: pd.DataFrame, posiciones: np.ndarray) -> pd.Series:
+    """Genera etiquetas legibles 'ID - Descripción' para los conductores seleccionados."""
+    ids = df['ID_Jerarquico'].iloc[posiciones].astype(str).to_numpy()
+    descripciones = df['Descripcion'].iloc[posiciones].fillna('').astype(str).to_numpy()
+    return pd.Series(ids, dtype=str).str.cat(pd.Series(descripciones, dtype=str), sep=' - ')
+
+
+@cache_data
+def calcular_sensibilidad(df_procesado: pd.DataFrame, nivel_conductor: Optional[int] = None,
+                          variacion_pct: float = 10.0, id_objetivo: Optional[str] = None,
+                          top_n: int = 10, num_pasos: int = 9) -> dict:
+    """
+    Calcula la sensibilidad del costo total ante perturbaciones de ±variacion_pct
+    en las hojas (nivel_conductor=None) o en las categorías de un nivel dado.
+
+    Como la agregación del CBS es lineal, el impacto de perturbar cada conductor se
+    obtiene de la matriz de agregación con un solo producto matricial, en lugar de
+    re-agregar el CBS una vez por perturbación.
+
+    Args:
+        df_procesado: DataFrame ya agregado (salida de get_processed_data).
+        nivel_conductor: Nivel de las categorías a perturbar. None perturba las hojas.
+        variacion_pct: Magnitud de la perturbación en porcentaje (simétrica).
+        id_objetivo: Nodo cuyo total se analiza. None usa el total de los nodos de Nivel 1.
+        top_n: Número de conductores más influyentes a reportar.
+        num_pasos: Número de puntos de la gráfica de araña.
+
+    Returns:
+        Diccionario con el total base, la tabla tornado, la tabla de araña y los
+        totales afectados (todos los nodos x conductores principales).
+    """
+    if df_procesado.empty:
+        return {}
+
+    matriz, hojas = construir_matriz_agregacion(df_procesado)
+    costos_hoja = df_procesado['Costo'].to_numpy(dtype=np.float64)[hojas]
+
+    # 1. Peso de cada hoja en el total objetivo (0/1 según pertenencia al subárbol)
+    if id_objetivo is None:
+        filas_objetivo = np.flatnonzero(df_procesado['Nivel'].to_numpy() == 1)
+    else:
+        filas_objetivo = np.flatnonzero(df_procesado['ID_Jerarquico'].to_numpy() == id_objetivo)[:1]
+    peso_objetivo = np.asarray(matriz[filas_objetivo].sum(axis=0)).ravel()
+    total_base = float(peso_objetivo @ costos_hoja)
+
+    # 2. Matriz de pertenencia conductor x hoja
+    if nivel_conductor is None:
+        posiciones_conductor = hojas
+        pertenencia = sparse.identity(len(hojas), format='csr')
+    else:
+        posiciones_conductor = np.flatnonzero(df_procesado['Nivel'].to_numpy() == nivel_conductor)
+        pertenencia = matriz[posiciones_conductor]
+
+    if len(posiciones_conductor) == 0:
+        return {}
+
+    # 3. Contribución de cada conductor al total objetivo (un solo producto disperso)
+    contribucion = pertenencia @ (costos_hoja * peso_objetivo)
+    delta = contribucion * (variacion_pct / 100.0)
+
+    orden = np.argsort(-np.abs(delta), kind='stable')[:top_n]
+    orden = orden[delta[orden] != 0]
+    etiquetas = _etiquetas_conductores(df_procesado, posiciones_conductor[orden])
+
+    df_tornado = pd.DataFrame({
+        'ID_Jerarquico': df_procesado['ID_Jerarquico'].iloc[posiciones_conductor[orden]].to_numpy(),
+        'Etiqueta': etiquetas.to_numpy(),
+        'Costo_Conductor': contribucion[orden],
+        'Total_Bajo': total_base - delta[orden],
+        'Total_Alto': total_base + delta[orden],
+        'Impacto': 2 * np.abs(delta[orden]),
+    })
+
+    # 4. Gráfica de araña: total objetivo para cada paso de variación (producto externo)
+    pasos = np.linspace(-variacion_pct, variacion_pct, num_pasos)
+    df_arana = pd.DataFrame(
+        total_base + np.outer(pasos / 100.0, contribucion[orden]),
+        index=pd.Index(pasos, name='Variacion (%)'),
+        columns=etiquetas.to_numpy()
+    )
+
+    # 5. Variación de TODOS los totales del CBS al perturbar cada conductor principal
+    impactos = matriz @ (sparse.diags(costos_hoja) @ pertenencia[orden].T) * (variacion_pct / 100.0)
+    df_totales = pd.DataFrame(
+        impactos.toarray() if sparse.issparse(impactos) else np.asarray(impactos),
+        index=df_procesado['ID_Jerarquico'].to_numpy(),
+        columns=etiquetas.to_numpy()
+    )
+
+    return {
+        "total_base": total_base,
+        "variacion_pct": variacion_pct,
+        "tornado": df_tornado,
+        "arana": df_arana,
+        "totales_afectados": df_totales,
+    }
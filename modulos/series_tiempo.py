@@ -0,0 +1,55 @@
+import pandas as pd
+import numpy as np
+
+
+def _a_numerico(x) -> np.ndarray:
+    """Convierte un eje x (fechas, periodos o números) a float64 para calcular áreas."""
+    if isinstance(x, pd.PeriodIndex):
+        x = x.to_timestamp()
+    if isinstance(x, pd.DatetimeIndex) or np.issubdtype(np.asarray(x).dtype, np.datetime64):
+        return pd.DatetimeIndex(x).asi8.astype(np.float64)
+    return np.asarray(x, dtype=np.float64)
+
+
+def indices_lttb(x, y, puntos_salida: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige 'puntos_salida' índices que conservan la forma
+    visual de la serie (picos y valles incluidos). El primer y el último punto siempre se
+    conservan; cada bucket se evalúa con operaciones vectorizadas de numpy.
+    """
+    n = len(y)
+    if puntos_salida >= n or puntos_salida < 3:
+        return np.arange(n)
+
+    x = _a_numerico(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Límites de los puntos_salida - 2 buckets interiores
+    limites = np.linspace(1, n - 1, puntos_salida - 1).astype(np.int64)
+    indices = np.empty(puntos_salida, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    anterior = 0
+    for b in range(puntos_salida - 2):
+        inicio, fin = limites[b], limites[b + 1]
+        # Promedio del bucket siguiente (el último bucket usa el punto final)
+        sig_inicio, sig_fin = fin, (limites[b + 2] if b + 2 < len(limites) else n)
+        x_prom = x[sig_inicio:sig_fin].mean()
+        y_prom = y[sig_inicio:sig_fin].mean()
+
+        areas = np.abs(
+            (x[anterior] - x_prom) * (y[inicio:fin] - y[anterior]) -
+            (x[anterior] - x[inicio:fin]) * (y_prom - y[anterior])
+        )
+        anterior = inicio + int(np.nanargmax(areas)) if np.isfinite(areas).any() else inicio
+        indices[b + 1] = anterior
+
+    return indices
+
+
+def reducir_serie(serie: pd.Series, puntos_max: int) -> pd.Series:
+    """Reduce la serie a 'puntos_max' puntos con LTTB (sin cambios si ya es más corta)."""
+    if len(serie) <= puntos_max:
+        return serie
+    serie = serie.dropna()
+    return serie.iloc[indices_lttb(serie.index, serie.to_numpy(), puntos_max)]
@@ -0,0 +1,345 @@
+import pandas as pd
+import numpy as np
+import io
+import json
+import sys
+import zipfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional
+
+# El módulo econométrico (statsmodels) se importa solo cuando hace falta: las sesiones se
+# gestionan desde la página de bienvenida, que debe cargar rápido
+_MODULO_ECONOMETRICO = "modulos.modelos_econometricos"
+
+# Resultados de análisis que forman parte de una sesión guardada
+CLAVES_SESION = [
+    'resultados_mex', 'resultados_usa', 'resultados_sp', 'resultados_embi',
+    'resultados_beta', 'resultados_apalancamiento', 'resultados_bonos',
+]
+
+FORMATO_SESION = "lcoe-sesion"
+VERSION_FORMATO = 1
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+# Espacios de trabajo con más datos que esto se exportan en un hilo aparte
+UMBRAL_EXPORTACION_SEGUNDO_PLANO = 5 * 1024 * 1024
+
+
+class ErrorSesion(ValueError):
+    """El archivo no es una sesión válida o su versión no es compatible."""
+
+
+# --- CODIFICACIÓN: objetos -> estructura JSON + arreglos ---
+
+class _Codificador:
+    """
+    Recorre un resultado y separa su estructura (JSON) de sus datos numéricos (arreglos).
+    Solo se admiten tipos conocidos; todo arreglo resultante puede leerse sin pickle.
+    """
+
+    def __init__(self):
+        self.arreglos: Dict[str, np.ndarray] = {}
+
+    def _arreglo(self, valores) -> dict:
+        arreglo = np.asarray(valores)
+        if arreglo.dtype == object:
+            # Etiquetas de texto (índices, nombres de columna): se guardan como unicode
+            if not all(isinstance(v, str) for v in arreglo.ravel()):
+                raise TypeError("Solo se pueden guardar arreglos numéricos, de fechas o de texto.")
+            arreglo = arreglo.astype(str)
+        ref = f"a{len(self.arreglos)}"
+        self.arreglos[ref] = arreglo
+        return {"tipo": "arreglo", "ref": ref}
+
+    def _indice(self, indice: pd.Index) -> dict:
+        if isinstance(indice, pd.RangeIndex):
+            return {"tipo": "indice_rango", "inicio": indice.start, "fin": indice.stop,
+                    "paso": indice.step, "nombre": self.codificar(indice.name)}
+        if isinstance(indice, pd.DatetimeIndex):
+            fechas = indice.tz_convert("UTC").tz_localize(None) if indice.tz else indice
+            return {"tipo": "indice_fechas", "valores": self._arreglo(fechas.to_numpy()),
+                    "freq": indice.freqstr, "tz": str(indice.tz) if indice.tz else None,
+                    "nombre": self.codificar(indice.name)}
+        return {"tipo": "indice", "valores": self._arreglo(indice.to_numpy()), "nombre": self.codificar(indice.name)}
+
+    def codificar(self, obj: Any) -> Any:
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        if isinstance(obj, (pd.Timestamp, np.datetime64)):
+            # Etiquetas de fecha (p. ej. el nombre de una serie de percentiles)
+            return {"tipo": "fecha", "valor": pd.Timestamp(obj).isoformat()}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return self._arreglo(obj)
+        if isinstance(obj, pd.Series):
+            return {"tipo": "serie", "valores": self._arreglo(obj.to_numpy()),
+                    "indice": self._indice(obj.index), "nombre": self.codificar(obj.name)}
+        if isinstance(obj, pd.DataFrame):
+            return {"tipo": "tabla", "columnas": [self.codificar(c) for c in obj.columns],
+                    "valores": [self._arreglo(obj.iloc[:, i].to_numpy()) for i in range(obj.shape[1])],
+                    "indice": self._indice(obj.index)}
+        if isinstance(obj, (list, tuple)):
+            return {"tipo": "lista", "valores": [self.codificar(v) for v in obj]}
+        if isinstance(obj, range):
+            return {"tipo": "rango", "inicio": obj.start, "fin": obj.stop, "paso": obj.step}
+        if isinstance(obj, dict):
+            return {"tipo": "dict", "items": [[self.codificar(k), self.codificar(v)] for k, v in obj.items()]}
+        raise TypeError(f"Tipo no soportado en sesiones guardadas: {type(obj).__name__}")
+
+
+def _decodificar(nodo: Any, arreglos) -> Any:
+    if not isinstance(nodo, dict):
+        return nodo
+
+    tipo = nodo["tipo"]
+    if tipo == "arreglo":
+        return arreglos[nodo["ref"]]
+    if tipo == "fecha":
+        return pd.Timestamp(nodo["valor"])
+    if tipo == "indice_rango":
+        return pd.RangeIndex(nodo["inicio"], nodo["fin"], nodo["paso"], name=_decodificar(nodo["nombre"], arreglos))
+    if tipo == "indice_fechas":
+        indice = pd.DatetimeIndex(_decodificar(nodo["valores"], arreglos), name=_decodificar(nodo["nombre"], arreglos))
+        if nodo["tz"]:
+            indice = indice.tz_localize("UTC").tz_convert(nodo["tz"])
+        if nodo["freq"]:
+            indice.freq = nodo["freq"]
+        return indice
+    if tipo == "indice":
+        return pd.Index(_decodificar(nodo["valores"], arreglos), name=_decodificar(nodo["nombre"], arreglos))
+    if tipo == "serie":
+        return pd.Series(_decodificar(nodo["valores"], arreglos),
+                         index=_decodificar(nodo["indice"], arreglos), name=_decodificar(nodo["nombre"], arreglos))
+    if tipo == "tabla":
+        columnas = [_decodificar(c, arreglos) for c in nodo["columnas"]]
+        datos = {i: _decodificar(v, arreglos) for i, v in enumerate(nodo["valores"])}
+        df = pd.DataFrame(datos, index=_decodificar(nodo["indice"], arreglos))
+        df.columns = columnas
+        return df
+    if tipo == "lista":
+        return [_decodificar(v, arreglos) for v in nodo["valores"]]
+    if tipo == "rango":
+        return range(nodo["inicio"], nodo["fin"], nodo["paso"])
+    if tipo == "dict":
+        return {_decodificar(k, arreglos): _decodificar(v, arreglos) for k, v in nodo["items"]}
+    raise ErrorSesion(f"Nodo desconocido en la sesión: '{tipo}'")
+
+
+# --- ESCRITURA Y LECTURA DE SESIONES ---
+
+def exportar_sesion(resultados: Dict[str, Any]) -> bytes:
+    """
+    Serializa los resultados de análisis a un archivo de sesión (zip) con:
+        manifiesto.json   formato, versión y estructura de cada análisis
+        <clave>.npz       arreglos comprimidos del análisis (sin pickle)
+
+    Los valores None se omiten. Los resultados econométricos guardan el texto del resumen
+    del modelo (no el modelo) y recalculan sus diagnósticos al consultarse, salvo que ya
+    no tengan residuos.
+    """
+    manifiesto = {"formato": FORMATO_SESION, "version": VERSION_FORMATO,
+                  "creado": datetime.now().isoformat(timespec='seconds'), "analisis": {}}
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archivo:
+        for clave, resultado in resultados.items():
+            if resultado is None:
+                continue
+
+            tipo = "dict"
+            # Si el módulo no se ha importado no puede existir ningún ResultadosEconometricos
+            modulo_econometrico = sys.modules.get(_MODULO_ECONOMETRICO)
+            if modulo_econometrico is not None and isinstance(resultado, modulo_econometrico.ResultadosEconometricos):
+                tipo = "econometrico"
+                resultado = {**resultado, "resumen_texto": resultado["resumen_texto"]}
+                # Sin residuos (datos crudos liberados) los diagnósticos ya no se pueden recalcular
+                if "residuos" in resultado:
+                    resultado.pop("diagnosticos", None)
+
+            codificador = _Codificador()
+            estructura = codificador.codificar(dict(resultado))
+
+            contenido = io.BytesIO()
+            np.savez_compressed(contenido, **codificador.arreglos)
+            nombre_arreglos = f"{clave}.npz"
+            archivo.writestr(nombre_arreglos, contenido.getvalue())
+
+            manifiesto["analisis"][clave] = {"tipo": tipo, "arreglos": nombre_arreglos, "estructura": estructura}
+
+        archivo.writestr(ARCHIVO_MANIFIESTO, json.dumps(manifiesto, ensure_ascii=False),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
+    return buffer.getvalue()
+
+
+class LectorSesion:
+    """
+    Lector de un archivo de sesión. Al abrirlo solo se lee el manifiesto; cada análisis se
+    decodifica por separado con cargar(), de modo que se puede restaurar uno solo.
+    """
+
+    def __init__(self, datos: bytes):
+        try:
+            self._zip = zipfile.ZipFile(io.BytesIO(datos))
+            manifiesto = json.loads(self._zip.read(ARCHIVO_MANIFIESTO))
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            raise ErrorSesion("El archivo no tiene el formato de sesión actual. Las sesiones "
+                              "guardadas con versiones anteriores de la herramienta ya no se pueden cargar.")
+
+        if manifiesto.get("formato") != FORMATO_SESION:
+            raise ErrorSesion("El archivo no es una sesión de esta herramienta.")
+        if manifiesto.get("version", 0) > VERSION_FORMATO:
+            raise ErrorSesion(f"La sesión usa la versión {manifiesto['version']} del formato; "
+                              f"esta herramienta solo lee hasta la versión {VERSION_FORMATO}.")
+        self.manifiesto = manifiesto
+
+    @property
+    def claves(self) -> List[str]:
+        return list(self.manifiesto["analisis"])
+
+    @property
+    def creado(self) -> Optional[str]:
+        return self.manifiesto.get("creado")
+
+    def cargar(self, clave: str) -> Any:
+        """Decodifica un análisis de la sesión."""
+        entrada = self.manifiesto["analisis"][clave]
+        with np.load(io.BytesIO(self._zip.read(entrada["arreglos"])), allow_pickle=False) as datos:
+            arreglos = {nombre: datos[nombre] for nombre in datos.files}
+
+        resultado = _decodificar(entrada["estructura"], arreglos)
+        if entrada["tipo"] == "econometrico":
+            from modulos.modelos_econometricos import ResultadosEconometricos
+            resultado = ResultadosEconometricos(resultado)
+        return resultado
+
+    def cargar_todo(self) -> Dict[str, Any]:
+        return {clave: self.cargar(clave) for clave in self.claves}
+
+
+# --- RESTAURACIÓN DIFERIDA ---
+
+# Clave de st.session_state con la sesión cargada cuyos análisis aún no se restauran
+CLAVE_SESION_DIFERIDA = 'sesion_diferida'
+
+
+class SesionDiferida:
+    """
+    Sesión cargada desde un archivo cuyos análisis se decodifican la primera vez que una
+    página los lee (restaurar_pendientes), no todos al cargarla.
+    """
+
+    def __init__(self, lector: LectorSesion):
+        self.lector = lector
+        self.pendientes: List[str] = list(lector.claves)
+
+
+def restaurar_pendientes(estado: MutableMapping, claves: Iterable[str]) -> List[str]:
+    """
+    Decodifica en 'estado' (st.session_state) los análisis de 'claves' que la sesión
+    cargada aún no ha restaurado y devuelve sus claves. Un análisis que no se puede
+    decodificar se descarta de la sesión y su error se propaga.
+    """
+    diferida = estado.get(CLAVE_SESION_DIFERIDA)
+    if diferida is None:
+        return []
+
+    restauradas = [clave for clave in claves if clave in diferida.pendientes]
+    try:
+        for clave in restauradas:
+            diferida.pendientes.remove(clave)
+            estado[clave] = diferida.lector.cargar(clave)
+    finally:
+        if not diferida.pendientes:
+            del estado[CLAVE_SESION_DIFERIDA]
+    return restauradas
+
+
+# --- EXPORTACIÓN BAJO DEMANDA ---
+
+_ejecutor_exportacion = ThreadPoolExecutor(max_workers=2, thread_name_prefix="exportar_sesion")
+
+
+def huella_sesion(resultados: Dict[str, Any]) -> tuple:
+    """
+    Huella O(1) de los resultados: la identidad de cada objeto. Las páginas reemplazan el
+    resultado completo al recalcular, así que un objeto nuevo implica contenido nuevo.
+    """
+    return tuple((clave, id(valor)) for clave, valor in resultados.items() if valor is not None)
+
+
+def tamano_estimado(obj: Any) -> int:
+    """Bytes aproximados de los datos de un resultado (sin recorrer los valores)."""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        return int(np.sum(obj.memory_usage(index=True, deep=False)))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(tamano_estimado(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(tamano_estimado(v) for v in obj)
+    return 0
+
+
+class ExportadorSesion:
+    """
+    Exportación de la sesión bajo demanda, memorizada por huella de los resultados.
+
+    El archivo solo se genera cuando el usuario lo pide y se reutiliza mientras los
+    resultados no cambien. Los espacios de trabajo grandes se exportan en segundo plano,
+    así que la página nunca espera a la serialización.
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._huella: Optional[tuple] = None
+        self._resultados: Dict[str, Any] = {}  # Mantiene vivos los objetos de la huella
+        self._tarea: Optional[Future] = None
+
+    def estado(self, resultados: Dict[str, Any]) -> str:
+        """'vacio', 'pendiente' (sin archivo para estos resultados), 'en_proceso', 'listo' o 'error'."""
+        huella = huella_sesion(resultados)
+        if not huella:
+            return "vacio"
+        with self._candado:
+            if huella != self._huella or self._tarea is None:
+                return "pendiente"
+            if not self._tarea.done():
+                return "en_proceso"
+            return "error" if self._tarea.exception() is not None else "listo"
+
+    def preparar(self, resultados: Dict[str, Any]):
+        """Genera el archivo para 'resultados' (en segundo plano si el espacio de trabajo es grande)."""
+        huella = huella_sesion(resultados)
+        with self._candado:
+            fallida = self._tarea is not None and self._tarea.done() and self._tarea.exception() is not None
+            if huella == self._huella and self._tarea is not None and not fallida:
+                return
+            self._huella, self._resultados = huella, dict(resultados)
+
+            if tamano_estimado(self._resultados) > UMBRAL_EXPORTACION_SEGUNDO_PLANO:
+                self._tarea = _ejecutor_exportacion.submit(exportar_sesion, self._resultados)
+            else:
+                self._tarea = Future()
+                try:
+                    self._tarea.set_result(exportar_sesion(self._resultados))
+                except Exception as e:
+                    self._tarea.set_exception(e)
+
+    @property
+    def datos(self) -> Optional[bytes]:
+        """Bytes del último archivo terminado (None si no hay uno listo)."""
+        with self._candado:
+            tarea = self._tarea
+        if tarea is None or not tarea.done() or tarea.exception() is not None:
+            return None
+        return tarea.result()
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        with self._candado:
+            tarea = self._tarea
+        return tarea.exception() if tarea is not None and tarea.done() else None
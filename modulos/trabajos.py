@@ -0,0 +1,283 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from modulos import instrumentacion
+from modulos.entorno import cache_resource
+
+# Límites del servidor (compartidos por todas las sesiones)
+MAX_TRABAJADORES_POR_DEFECTO = int(os.environ.get("LCOE_TRABAJOS_MAX", "2"))
+MEMORIA_MB_POR_DEFECTO = float(os.environ.get("LCOE_TRABAJOS_MEMORIA_MB", "2048"))
+MAX_COLA_POR_DEFECTO = int(os.environ.get("LCOE_TRABAJOS_MAX_COLA", "16"))
+
+# Costo supuesto para trabajos sin estimación propia (p. ej. modelos VAR/VECM)
+COSTO_POR_DEFECTO_MB = 50.0
+
+# Registros de instrumentación de trabajos terminados que conserva cada sesión
+MAX_REGISTROS_TRABAJOS = 10
+
+# Estados de un trabajo
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+CANCELADO = "cancelado"
+FALLIDO = "fallido"
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro del motor cuando el usuario cancela el trabajo en curso."""
+
+
+class TrabajoRechazado(Exception):
+    """El gestor no admite el trabajo (cola llena o costo imposible de acomodar)."""
+
+
+# Trabajo que ejecuta el hilo actual (None fuera de un trabajo)
+_contexto = threading.local()
+
+
+def reportar_progreso(fraccion: float, mensaje: Optional[str] = None):
+    """
+    Punto de control para los motores de 'modulos': publica el avance (0-1) del trabajo en
+    curso y lanza TrabajoCancelado si se pidió cancelarlo. Fuera de un trabajo no hace nada,
+    así que los motores se pueden seguir llamando directamente.
+    """
+    trabajo = getattr(_contexto, "trabajo", None)
+    if trabajo is None:
+        return
+    if trabajo.cancelacion_solicitada:
+        raise TrabajoCancelado()
+    trabajo.progreso = min(max(float(fraccion), 0.0), 1.0)
+    if mensaje is not None:
+        trabajo.mensaje = mensaje
+
+
+def trabajo_actual() -> Optional["Trabajo"]:
+    """Trabajo que ejecuta el hilo actual (None fuera de un trabajo)."""
+    return getattr(_contexto, "trabajo", None)
+
+
+class Trabajo:
+    """Cálculo enviado al gestor: estado, avance, resultado y cancelación cooperativa."""
+
+    def __init__(self, id_trabajo: int, etiqueta: str, funcion: Callable, args: tuple, kwargs: dict,
+                 costo_mb: float = COSTO_POR_DEFECTO_MB):
+        self.id = id_trabajo
+        self.etiqueta = etiqueta
+        self.costo_mb = costo_mb
+        self.aviso: Optional[str] = None
+        self.errores: List[str] = []  # Mensajes de reportar_error() durante el cálculo
+        self._funcion, self._args, self._kwargs = funcion, args, kwargs
+        self.estado = EN_COLA
+        self.progreso = 0.0
+        self.mensaje = "En cola"
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+        self.creado = time.time()
+        self.duracion: Optional[float] = None
+        self.registro: Optional[instrumentacion.Registro] = None
+        self._cancelar = threading.Event()
+
+    @property
+    def cancelacion_solicitada(self) -> bool:
+        return self._cancelar.is_set()
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in (COMPLETADO, CANCELADO, FALLIDO)
+
+    def cancelar(self):
+        """Pide la cancelación; el motor la atiende en su siguiente reportar_progreso()."""
+        self._cancelar.set()
+        if self.estado == EN_COLA:
+            self.estado = CANCELADO
+
+    def _ejecutar(self):
+        if self.cancelacion_solicitada:
+            self.estado = CANCELADO
+            self._funcion = self._args = self._kwargs = None
+            return
+
+        self.estado, self.mensaje = EJECUTANDO, "Iniciando"
+        _contexto.trabajo = self
+        instrumentacion.iniciar_registro(f"Trabajo: {self.etiqueta}")
+        inicio = time.perf_counter()
+        try:
+            self.resultado = self._funcion(*self._args, **self._kwargs)
+            self.progreso, self.estado = 1.0, COMPLETADO
+        except TrabajoCancelado:
+            self.estado = CANCELADO
+        except Exception as e:
+            self.error, self.estado = e, FALLIDO
+        finally:
+            _contexto.trabajo = None
+            self.registro = instrumentacion.terminar_registro()
+            self.duracion = time.perf_counter() - inicio
+            self._funcion = self._args = self._kwargs = None
+
+
+class GestorTrabajos:
+    """
+    Ejecuta los motores de proyección en hilos trabajadores, fuera del hilo del script de
+    Streamlit: las interacciones del usuario ya no reinician ni bloquean el cálculo.
+
+    Control de admisión para que la latencia sea predecible con varios analistas:
+    - A lo sumo 'max_trabajadores' cálculos simultáneos.
+    - La suma de los costos estimados en ejecución no supera 'memoria_mb'; el resto espera
+      en una cola FIFO (con posición visible) de hasta 'max_cola' trabajos.
+    - Un trabajo más costoso que todo el presupuesto se degrada (si declara un parámetro
+      que escala su costo, p. ej. num_simulaciones) o se rechaza.
+    """
+
+    def __init__(self, max_trabajadores: int = MAX_TRABAJADORES_POR_DEFECTO,
+                 memoria_mb: float = MEMORIA_MB_POR_DEFECTO, max_cola: int = MAX_COLA_POR_DEFECTO):
+        self.max_trabajadores = max_trabajadores
+        self.memoria_mb = memoria_mb
+        self.max_cola = max_cola
+        self._ids = itertools.count(1)
+        self._cola: "deque[Trabajo]" = deque()
+        self._memoria_en_uso = 0.0
+        self._en_ejecucion = 0
+        self._condicion = threading.Condition()
+
+        for i in range(max_trabajadores):
+            threading.Thread(target=self._bucle_trabajador, name=f"trabajo-{i}", daemon=True).start()
+
+    def _degradar(self, trabajo: Trabajo, parametro: Optional[str]):
+        """Escala el parámetro degradable para que el costo del trabajo quepa en el presupuesto."""
+        if parametro is None or parametro not in trabajo._kwargs:
+            raise TrabajoRechazado(
+                f"'{trabajo.etiqueta}' requiere ~{trabajo.costo_mb:,.0f} MB y el presupuesto del "
+                f"servidor es de {self.memoria_mb:,.0f} MB. Reduzca los parámetros del cálculo.")
+
+        original = trabajo._kwargs[parametro]
+        reducido = max(1, int(original * self.memoria_mb / trabajo.costo_mb))
+        trabajo._kwargs[parametro] = reducido
+        trabajo.costo_mb *= reducido / original
+        trabajo.aviso = (f"Para respetar el presupuesto de memoria del servidor se redujo "
+                         f"'{parametro}' de {original:,} a {reducido:,}.")
+
+    def enviar(self, etiqueta: str, funcion: Callable, *args, costo_mb: float = COSTO_POR_DEFECTO_MB,
+               parametro_degradable: Optional[str] = None, **kwargs) -> Trabajo:
+        """
+        Encola el cálculo. 'costo_mb' es su memoria estimada; 'parametro_degradable' nombra el
+        argumento (proporcional al costo) que se puede reducir si no cabe en el presupuesto.
+        Lanza TrabajoRechazado si la cola está llena o el costo no se puede acomodar.
+        """
+        trabajo = Trabajo(next(self._ids), etiqueta, funcion, args, kwargs, costo_mb)
+        if trabajo.costo_mb > self.memoria_mb:
+            self._degradar(trabajo, parametro_degradable)
+
+        with self._condicion:
+            self._purgar_cancelados()
+            if len(self._cola) >= self.max_cola:
+                raise TrabajoRechazado("El servidor tiene demasiados cálculos en espera. Intente de nuevo en unos minutos.")
+            self._cola.append(trabajo)
+            self._condicion.notify_all()
+        return trabajo
+
+    def _purgar_cancelados(self):
+        self._cola = deque(t for t in self._cola if not t.terminado)
+
+    def _bucle_trabajador(self):
+        while True:
+            with self._condicion:
+                while True:
+                    self._purgar_cancelados()
+                    # FIFO estricto: el primero de la cola espera hasta que su costo quepa
+                    if self._cola and self._memoria_en_uso + self._cola[0].costo_mb <= self.memoria_mb:
+                        break
+                    # Espera con tiempo límite para notar cancelaciones de trabajos en cola
+                    self._condicion.wait(timeout=0.5)
+                trabajo = self._cola.popleft()
+                self._memoria_en_uso += trabajo.costo_mb
+                self._en_ejecucion += 1
+
+            try:
+                trabajo._ejecutar()
+            finally:
+                with self._condicion:
+                    self._memoria_en_uso -= trabajo.costo_mb
+                    self._en_ejecucion -= 1
+                    self._condicion.notify_all()
+
+    def posicion(self, trabajo: Trabajo) -> Optional[int]:
+        """Posición (1 = siguiente) del trabajo en la cola, o None si ya no está en ella."""
+        with self._condicion:
+            pendientes = [t for t in self._cola if not t.terminado]
+        for i, t in enumerate(pendientes, start=1):
+            if t is trabajo:
+                return i
+        return None
+
+    def estado(self) -> Dict[str, float]:
+        """Ocupación actual del servidor."""
+        with self._condicion:
+            return {
+                "en_ejecucion": self._en_ejecucion,
+                "en_cola": sum(1 for t in self._cola if not t.terminado),
+                "memoria_en_uso_mb": self._memoria_en_uso,
+                "memoria_mb": self.memoria_mb,
+            }
+
+
+@cache_resource
+def obtener_gestor_trabajos() -> GestorTrabajos:
+    """Gestor compartido por todas las sesiones del servidor."""
+    return GestorTrabajos()
+
+
+# --- INTEGRACIÓN CON LA SESIÓN ---
+# Solo las usan las páginas: Streamlit se importa aquí para que los motores (y el
+# ejecutor por lotes) puedan usar reportar_progreso() sin cargarlo.
+
+def iniciar_trabajo(clave_resultado: str, etiqueta: str, funcion: Callable, *args, **kwargs) -> Optional[Trabajo]:
+    """
+    Envía el cálculo al gestor y lo asocia a 'clave_resultado' (p. ej. 'resultados_beta').
+    Si ya había un trabajo para esa clave se cancela, pero solo cuando el gestor acepta el
+    nuevo. La página recoge el resultado con recoger_trabajo() al terminar. Acepta
+    'costo_mb' y 'parametro_degradable' (ver GestorTrabajos.enviar); si el gestor rechaza
+    el trabajo se muestra el motivo, el anterior sigue su curso y devuelve None.
+    """
+    import streamlit as st
+    trabajos: Dict[str, Trabajo] = st.session_state.setdefault('trabajos', {})
+
+    try:
+        trabajo = obtener_gestor_trabajos().enviar(etiqueta, funcion, *args, **kwargs)
+    except TrabajoRechazado as e:
+        st.error(str(e))
+        return None
+
+    anterior = trabajos.get(clave_resultado)
+    if anterior is not None and not anterior.terminado:
+        anterior.cancelar()
+    trabajos[clave_resultado] = trabajo
+    return trabajo
+
+
+def obtener_trabajo(clave_resultado: str) -> Optional[Trabajo]:
+    import streamlit as st
+    return st.session_state.get('trabajos', {}).get(clave_resultado)
+
+
+def recoger_trabajo(clave_resultado: str) -> Optional[Trabajo]:
+    """
+    Si el trabajo de 'clave_resultado' terminó, lo retira de la sesión y, si se completó,
+    guarda su resultado en st.session_state[clave_resultado]. Devuelve el trabajo retirado.
+    """
+    import streamlit as st
+    trabajo = obtener_trabajo(clave_resultado)
+    if trabajo is None or not trabajo.terminado:
+        return None
+
+    del st.session_state['trabajos'][clave_resultado]
+    if trabajo.registro is not None:
+        registros = st.session_state.setdefault('registros_trabajos', [])
+        registros.append(trabajo.registro)
+        del registros[:-MAX_REGISTROS_TRABAJOS]
+    if trabajo.estado == COMPLETADO:
+        st.session_state[clave_resultado] = trabajo.resultado
+    return trabajo
@@ -5,10 +5,16 @@ import pandas as pd
 import plotly.graph_objects as go
 from theme import theme 
 import numpy as np
-from statsmodels.tsa.stattools import acf
-from scipy.stats import norm
 from streamlit_option_menu import option_menu
 from plotly.subplots import make_subplots
+from modulos.histogramas import calcular_histograma, es_histograma, BINS_POR_DEFECTO
+from modulos.series_tiempo import reducir_serie
+from modulos import trabajos
+from modulos.instrumentacion import instrumentado
+
+# Series de tiempo: puntos enviados por traza (≈ 2 por pixel de ancho) y umbral para usar WebGL
+PUNTOS_MAX_SERIE = 2000
+UMBRAL_WEBGL = 5000
 
 # --- COMPONENTE 1: TARJETA DE KPIs ---
 def display_kpi_card(title, kpis):
@@ -22,7 +28,32 @@ def display_kpi_card(title, kpis):
                 theme.render_metric(label, value)
 
 
+# --- CAPA COMÚN PARA SERIES DE TIEMPO ---
+def crear_traza_serie(serie, resolucion_completa=False, puntos_max=PUNTOS_MAX_SERIE, **kwargs):
+    """
+    Crea la traza de una serie de tiempo. Salvo que se pida la resolución completa, la
+    serie se reduce con LTTB a 'puntos_max' puntos (conserva picos y valles); si aun así
+    supera UMBRAL_WEBGL puntos se dibuja con Scattergl (WebGL) en lugar de SVG.
+    """
+    if not resolucion_completa:
+        serie = reducir_serie(serie, puntos_max)
+    clase_traza = go.Scattergl if len(serie) > UMBRAL_WEBGL else go.Scatter
+    return clase_traza(x=serie.index, y=serie, **kwargs)
+
+
+def render_selector_resolucion(key, *series):
+    """
+    Muestra el interruptor de resolución completa solo si alguna serie excede
+    PUNTOS_MAX_SERIE; devuelve True si se pidió la resolución completa.
+    """
+    if max(len(s) for s in series) <= PUNTOS_MAX_SERIE:
+        return False
+    return st.toggle("Resolución completa", value=False, key=key,
+                     help=f"Por defecto cada serie se reduce a {PUNTOS_MAX_SERIE:,} puntos conservando su forma. Actívalo para hacer zoom con todos los datos.")
+
+
 # --- COMPONENTE 2: GRÁFICA DE PROYECCIÓN ---
+@instrumentado("render")
 def display_projection_chart(title, x_axis_label, y_axis_label, historico_data, proy_base, proy_positivo, proy_negativo):
 
     with st.container(border=True):
@@ -33,11 +64,13 @@ def display_projection_chart(title, x_axis_label, y_axis_label, historico_data,
         positivo_para_graficar = pd.concat([historico_data.iloc[-1:], proy_positivo])
         negativo_para_graficar = pd.concat([historico_data.iloc[-1:], proy_negativo])
 
+        completa = render_selector_resolucion(f"resolucion_{title}", historico_data, base_para_graficar, positivo_para_graficar, negativo_para_graficar)
+
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=historico_data.index, y=historico_data, mode='lines', name='Histórico', line=dict(color=theme.get_color("historico"))))
-        fig.add_trace(go.Scatter(x=base_para_graficar.index, y=base_para_graficar, mode='lines', name='Escenario Base', line=dict(color=theme.get_color("primario"))))
-        fig.add_trace(go.Scatter(x=positivo_para_graficar.index, y=positivo_para_graficar, mode='lines', name='Escenario Positivo', line=dict(color=theme.get_color("exito"), dash='dash')))
-        fig.add_trace(go.Scatter(x=negativo_para_graficar.index, y=negativo_para_graficar, mode='lines', name='Escenario Negativo', line=dict(color=theme.get_color("peligro"), dash='dash')))
+        fig.add_trace(crear_traza_serie(historico_data, completa, mode='lines', name='Histórico', line=dict(color=theme.get_color("historico"))))
+        fig.add_trace(crear_traza_serie(base_para_graficar, completa, mode='lines', name='Escenario Base', line=dict(color=theme.get_color("primario"))))
+        fig.add_trace(crear_traza_serie(positivo_para_graficar, completa, mode='lines', name='Escenario Positivo', line=dict(color=theme.get_color("exito"), dash='dash')))
+        fig.add_trace(crear_traza_serie(negativo_para_graficar, completa, mode='lines', name='Escenario Negativo', line=dict(color=theme.get_color("peligro"), dash='dash')))
         
         fig.update_layout(template="plotly_white", xaxis_title=x_axis_label, yaxis_title=y_axis_label, height=500, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
         st.plotly_chart(fig, use_container_width=True)
@@ -90,12 +123,27 @@ def display_model_diagnostics_card(resultados):
 
 
 # --- COMPONENTE 5:
+@instrumentado("render")
 def display_residuals_analysis(resultados):
     """
     Crea una "tarjeta" que muestra las gráficas de análisis de residuos (ACF e Histograma).
+    Los diagnósticos vienen precalculados en resultados['diagnosticos']; aquí solo se dibujan.
     """
+    # Import diferido: solo las páginas econométricas cargan statsmodels (ver paginas/registro.py)
+    from modulos.modelos_econometricos import ResultadosEconometricos, calcular_diagnosticos_residuos
+
+    # Resultados en dict simple (p. ej. de una sesión guardada antes) se diagnostican aquí
+    if isinstance(resultados, ResultadosEconometricos):
+        diagnosticos = resultados['diagnosticos']
+    else:
+        diagnosticos = calcular_diagnosticos_residuos(resultados['residuos'])
+
     with st.container(border=True):
         theme.render_subheader("Análisis de Residuos")
+
+        if diagnosticos is None:
+            st.info("No hay residuos suficientes para el análisis.")
+            return
         
         col1, col2 = st.columns(2, gap="large")
 
@@ -103,38 +151,43 @@ def display_residuals_analysis(resultados):
             theme.render_label("Autocorrelación (ACF)")
             
             # Gráfica ACF
-            residuos = resultados['residuos']
-            acf_values, confint = acf(residuos, nlags=24, alpha=0.05)
-            x_axis = np.arange(1, 25)
+            diag_acf = diagnosticos['acf']
+            x_axis = diag_acf['rezagos']
             
             fig_acf = go.Figure()
             # Banda de confianza
-            conf_upper = confint[1:, 1] - acf_values[1:]
-            conf_lower = confint[1:, 0] - acf_values[1:]
+            conf_upper = diag_acf['banda_superior']
+            conf_lower = diag_acf['banda_inferior']
             fig_acf.add_trace(go.Scatter(x=np.concatenate([x_axis, x_axis[::-1]]), y=np.concatenate([conf_upper, conf_lower[::-1]]), fill='toself', fillcolor='rgba(173, 216, 230, 0.5)', line=dict(color='rgba(255,255,255,0)'), showlegend=False))
             # Barras finas
-            fig_acf.add_trace(go.Bar(x=x_axis, y=acf_values[1:], name='ACF', width=0.2))
+            fig_acf.add_trace(go.Bar(x=x_axis, y=diag_acf['valores'], name='ACF', width=0.2))
             fig_acf.update_layout(template="plotly_white", height=400)
             st.plotly_chart(fig_acf, use_container_width=True)
 
         with col2:
             theme.render_label("Histograma de Residuos")
             
-            mu, std = norm.fit(residuos)
-
-
+            diag_normal = diagnosticos['normal']
 
             # Gráfica Histograma
             fig_hist = go.Figure()
-            fig_hist.add_trace(go.Histogram(x=residuos, nbinsx=25, histnorm='probability density', name='Frecuencia de Residuos', marker=dict(color='#6699CC', line=dict(color='#003366', width=1))))
-            x_curve = np.linspace(residuos.min(), residuos.max(), 100)
-            y_curve = norm.pdf(x_curve, mu, std)
-            fig_hist.add_trace(go.Scatter(x=x_curve, y=y_curve, mode='lines', name='Distribución Normal Teórica',line=dict(color=theme.get_color("peligro"), width=2)))
+            traza_hist = _crear_traza_histograma(diag_normal['histograma'])
+            traza_hist.name = 'Frecuencia de Residuos'
+            fig_hist.add_trace(traza_hist)
+            fig_hist.add_trace(go.Scatter(x=diag_normal['x_curva'], y=diag_normal['y_curva'], mode='lines', name='Distribución Normal Teórica',line=dict(color=theme.get_color("peligro"), width=2)))
             fig_hist.update_layout(template="plotly_white", height=400, bargap=0.05, yaxis_title="Densidad",legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
             st.plotly_chart(fig_hist, use_container_width=True)
+
+        # Pruebas formales
+        lb, jb = diagnosticos['ljung_box'], diagnosticos['jarque_bera']
+        col3, col4 = st.columns(2, gap="large")
+        with col3:
+            theme.render_metric(f"Ljung-Box ({lb['rezagos']} rezagos), p-valor", f"{lb['p_valor']:.3f}")
+        with col4:
+            theme.render_metric("Jarque-Bera, p-valor", f"{jb['p_valor']:.3f}")
             
         # Interpretación
-        theme.render_caption("<b>Interpretación:<b> Para que el resultado sea valido, la mayoria de las barras mostradas del ACF deben estar dentro del área sombreada; mientras que en el histograma la distribución debe parecer una distribucion normal.")
+        theme.render_caption("<b>Interpretación:<b> Para que el resultado sea valido, la mayoria de las barras mostradas del ACF deben estar dentro del área sombreada; mientras que en el histograma la distribución debe parecer una distribucion normal. En las pruebas de Ljung-Box (autocorrelación) y Jarque-Bera (normalidad), un p-valor mayor a 0.05 indica que no se rechaza la hipótesis de residuos bien comportados.")
 
 # Subpestañas
 def render_tabs_menu(options, icons):
@@ -155,6 +208,7 @@ def render_tabs_menu(options, icons):
     return selected_tab
 
 # Grafica 1+3
+@instrumentado("render")
 def display_scenario_bar_chart(title, x_axis_label, y_axis_label, historico, base, positivo, negativo, y_axis_range=None, color_threshold=0, 
                                nombre_escenarios = ("Rendimiento Histórico", "Escenario Positivo", "Escenario Base", "Escenario Negativo") ):
     """
@@ -196,11 +250,31 @@ def display_scenario_bar_chart(title, x_axis_label, y_axis_label, historico, bas
         st.plotly_chart(fig, use_container_width=True)
 
 
+# Histogramas precalculados
+
+def _crear_traza_histograma(datos, bins=BINS_POR_DEFECTO):
+    """
+    Crea la traza de barras de un histograma. 'datos' puede ser un histograma ya agrupado
+    (calcular_histograma) o una muestra cruda, que se agrupa aquí en el servidor; en ambos
+    casos solo se envían O(bins) puntos al navegador.
+    """
+    histograma = datos if es_histograma(datos) else calcular_histograma(datos, bins=bins)
+    bordes = np.asarray(histograma["bordes"])
+    return go.Bar(
+        x=(bordes[:-1] + bordes[1:]) / 2,
+        y=histograma["conteos"],
+        width=np.diff(bordes),
+        marker=dict(color='#6699CC', line=dict(color='#003366', width=1))
+    )
+
+
 # Histograma SP500
 
-def display_diagnostic_histograms(anos_proyeccion, data_distribucion_final, titulo_distribucion_final, eje_x_distribucion_final, caption_distribucion_final, data_rendimientos_historicos, titulo_rendimientos_historicos, eje_x_rendimientos_historicos, caption_rendimientos_historicos):
+@instrumentado("render")
+def display_diagnostic_histograms(anos_proyeccion, data_distribucion_final, titulo_distribucion_final, eje_x_distribucion_final, caption_distribucion_final, data_rendimientos_historicos, titulo_rendimientos_historicos, eje_x_rendimientos_historicos, caption_rendimientos_historicos, bins=BINS_POR_DEFECTO):
     """
     Crea una tarjeta genérica con dos histogramas para análisis de distribución y diagnóstico.
+    Los datos pueden ser histogramas precalculados o muestras crudas (agrupadas en 'bins').
     """
     with st.container(border=True):
         theme.render_subheader("Análisis de distribución y diagnósticos")
@@ -210,11 +284,7 @@ def display_diagnostic_histograms(anos_proyeccion, data_distribucion_final, titu
         with col1:
             # Histograma de Distribución de Valores Finales (Genérico)
             fig_dist = go.Figure()
-            fig_dist.add_trace(go.Histogram(
-                x=data_distribucion_final, 
-                nbinsx=100, 
-                marker=dict(color='#6699CC', line=dict(color='#003366', width=1))
-            ))
+            fig_dist.add_trace(_crear_traza_histograma(data_distribucion_final, bins))
             fig_dist.update_layout(
                 template="plotly_white", height=400,
                 title_text=theme.render_label(f"{titulo_distribucion_final} a {anos_proyeccion} años"),
@@ -228,11 +298,7 @@ def display_diagnostic_histograms(anos_proyeccion, data_distribucion_final, titu
         with col2:
             # Histograma de Rendimientos Diarios (Genérico)
             fig_hist_log = go.Figure()
-            fig_hist_log.add_trace(go.Histogram(
-                x=data_rendimientos_historicos, 
-                nbinsx=100, 
-                marker=dict(color='#6699CC', line=dict(color='#003366', width=1))
-            ))
+            fig_hist_log.add_trace(_crear_traza_histograma(data_rendimientos_historicos, bins))
             fig_hist_log.update_layout(
                 template="plotly_white", height=400,
                 title_text=theme.render_label(titulo_rendimientos_historicos),
@@ -293,19 +359,17 @@ def display_download_button(df_descarga, nombre_archivo, titulo="Descargar Datos
             )
 
 # Revisar colores
-def display_distribution_histogram(title, data, anos_proyeccion, x_axis_title, y_axis_title, caption):
+@instrumentado("render")
+def display_distribution_histogram(title, data, anos_proyeccion, x_axis_title, y_axis_title, caption, bins=BINS_POR_DEFECTO):
     """
     Crea una "tarjeta" que muestra un histograma de distribución de resultados finales.
+    'data' puede ser un histograma precalculado o la muestra cruda (agrupada en 'bins').
     """
     with st.container(border=True):
         theme.render_subheader(title)
         
         fig = go.Figure()
-        fig.add_trace(go.Histogram(
-            x=data, 
-            nbinsx=100, 
-            marker=dict(color='#6699CC', line=dict(color='#003366', width=1))
-        ))
+        fig.add_trace(_crear_traza_histograma(data, bins))
         
         fig.update_layout(
             template="plotly_white", 
@@ -320,6 +384,7 @@ def display_distribution_histogram(title, data, anos_proyeccion, x_axis_title, y
         st.caption(caption)
 
 
+@instrumentado("render")
 def display_deviation_chart(title, y_axis_label, base_scenario, positive_scenario, negative_scenario):
 
     with st.container(border=True):
@@ -345,13 +410,13 @@ def display_deviation_chart(title, y_axis_label, base_scenario, positive_scenari
         ))
         
         # Líneas de desviación
-        fig.add_trace(go.Scatter(
-            x=desviacion_positiva.index, y=desviacion_positiva,
+        fig.add_trace(crear_traza_serie(
+            desviacion_positiva,
             mode='lines+markers', name='Desviación Positiva',
             line=dict(color=theme.get_color("exito"))
         ))
-        fig.add_trace(go.Scatter(
-            x=desviacion_negativa.index, y=desviacion_negativa,
+        fig.add_trace(crear_traza_serie(
+            desviacion_negativa,
             mode='lines+markers', name='Desviación Negativa',
             line=dict(color=theme.get_color("peligro"))
         ))
@@ -366,6 +431,7 @@ def display_deviation_chart(title, y_axis_label, base_scenario, positive_scenari
         st.plotly_chart(fig, use_container_width=True)
 
 
+@instrumentado("render")
 def display_rating_chart(title, dataframe_con_calificacion):
     """
     Crea una "tarjeta" con una gráfica escalonada que muestra la evolución
@@ -471,6 +537,52 @@ def display_session_status1(analisis_a_revisar, expander_title):
                     st.markdown(f"<span style='color: {theme.get_color('texto_secundario')};'>⭕ Pendiente</span>", unsafe_allow_html=True)
 
 
+# Progreso de un cálculo en segundo plano
+@st.fragment(run_every=1)
+def _seguir_trabajo(clave_resultado):
+    """Se refresca cada segundo sin rerun de la página; al terminar el trabajo la refresca completa."""
+    trabajo = trabajos.obtener_trabajo(clave_resultado)
+    if trabajo is None or trabajo.terminado:
+        st.rerun()
+
+    if trabajo.estado == trabajos.EN_COLA:
+        posicion = trabajos.obtener_gestor_trabajos().posicion(trabajo)
+        texto = f"{trabajo.etiqueta}: en cola" + (f" (posición {posicion})" if posicion else "")
+    else:
+        texto = f"{trabajo.etiqueta}: {trabajo.mensaje}"
+    st.progress(trabajo.progreso, text=texto)
+    if st.button("Cancelar", key=f"cancelar_{clave_resultado}"):
+        trabajo.cancelar()
+
+
+def display_job_progress(clave_resultado):
+    """
+    Muestra el avance del trabajo asociado a 'clave_resultado' con opción de cancelarlo.
+    Cuando termina, deja su resultado en st.session_state[clave_resultado] (vía
+    trabajos.recoger_trabajo), así que debe llamarse antes de mostrar los resultados.
+    """
+    trabajo = trabajos.obtener_trabajo(clave_resultado)
+    if trabajo is None:
+        return
+
+    if trabajo.aviso:
+        st.warning(trabajo.aviso)
+
+    if not trabajo.terminado:
+        _seguir_trabajo(clave_resultado)
+        return
+
+    trabajos.recoger_trabajo(clave_resultado)
+    if trabajo.estado == trabajos.FALLIDO:
+        st.error(f"Error durante el cálculo: {trabajo.error}")
+    elif trabajo.estado == trabajos.CANCELADO:
+        st.info("Cálculo cancelado.")
+    elif trabajo.resultado is None:
+        for mensaje in trabajo.errores:
+            st.error(mensaje)
+        st.error("No se pudo completar el cálculo. Revise los datos y parámetros de entrada.")
+
+
 # Mostrar datos utilizados con un componente desplegable
 def display_data_table(expander_title, dataframe, column_rename_map, format_str="{:.2f}"):
     
@@ -1,6 +1,8 @@
 
 import streamlit as st
 import pandas as pd
+import copy
+from functools import lru_cache
 from typing import Callable, Dict, Any, Optional, Tuple, List
 from theme import theme 
 import plotly.express as px
@@ -11,6 +13,10 @@ THEME_COLORS = theme._colors
 from modulos import logica_cbs
 import numpy as np
 from modulos.logica_cbs import load_and_prepare_data, get_processed_data
+from modulos.sensibilidad_cbs import calcular_sensibilidad
+from modulos.control_presupuestal import calcular_control_presupuestal
+from modulos.almacen_cbs import obtener_almacen, separar_clave_sesion
+from modulos.cache_figuras import obtener_cache_figuras, huella_dataframe, COLUMNAS_HUELLA
 
 # Se utiliza para la tarjeta KPI
 def create_kpi_cards(title: str, df_procesado: pd.DataFrame) -> None:
@@ -94,17 +100,18 @@ def create_enhanced_file_uploader_panel(load_function: Callable) -> Optional[pd.
 
 
 
-# Se define el estilo de la tabla, muy importante
-def create_optimized_grid_options(df: pd.DataFrame) -> Dict[str, Any]:
+@lru_cache(maxsize=32)
+def _construir_opciones_grid(esquema: Tuple[Tuple[str, str], ...], colores: Tuple[Tuple[str, str], ...], progresivo: bool) -> Dict[str, Any]:
     """
-    Configura las opciones optimizadas de AG-Grid con mejor rendimiento.
-    
-    Args:
-        df: DataFrame con datos CBS
-        
-    Returns:
-        Diccionario con configuración de grid
+    Fábrica memoizada de la configuración de AG-Grid. Depende solo del esquema de
+    columnas, los colores del tema y las opciones, no de las filas, por lo que mover un
+    filtro reutiliza la configuración ya construida y solo cambian los datos.
+
+    Con progresivo=True la tabla solo recibe las filas visibles (sin 'Resumen'), se
+    muestra el número de partidas de cada nodo y un clic en la fila la expande.
     """
+    colores = dict(colores)
+    df_esquema = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in esquema})
 
     # Estilo para la columna de Jerarquía (Nivel Jerárquico)
     group_cell_style_js = JsCode(f"""
@@ -115,12 +122,12 @@ def create_optimized_grid_options(df: pd.DataFrame) -> Dict[str, Any]:
 
         // Estilos base para fuente y color según el nivel
         const baseStyles = {{
-            1: {{'fontSize': '20px', 'fontWeight': '600', 'color': '{THEME_COLORS["primario"]}'}},
-            2: {{'fontSize': '18px', 'fontWeight': '500', 'color': '{THEME_COLORS["texto_principal"]}'}},
-            3: {{'fontSize': '16px', 'fontWeight': '400', 'color': '{THEME_COLORS["texto_principal"]}'}},
-            4: {{'fontSize': '15px', 'fontWeight': '400', 'color': '{THEME_COLORS["texto_secundario"]}'}},
-            5: {{'fontSize': '14px', 'fontWeight': '400', 'color': '{THEME_COLORS["texto_secundario"]}'}},
-            6: {{'fontSize': '13px', 'fontWeight': '400', 'color': '{THEME_COLORS["texto_secundario"]}'}}
+            1: {{'fontSize': '20px', 'fontWeight': '600', 'color': '{colores["primario"]}'}},
+            2: {{'fontSize': '18px', 'fontWeight': '500', 'color': '{colores["texto_principal"]}'}},
+            3: {{'fontSize': '16px', 'fontWeight': '400', 'color': '{colores["texto_principal"]}'}},
+            4: {{'fontSize': '15px', 'fontWeight': '400', 'color': '{colores["texto_secundario"]}'}},
+            5: {{'fontSize': '14px', 'fontWeight': '400', 'color': '{colores["texto_secundario"]}'}},
+            6: {{'fontSize': '13px', 'fontWeight': '400', 'color': '{colores["texto_secundario"]}'}}
         }};
         
         // Estilo de sangría para la jerarquía
@@ -147,21 +154,21 @@ def create_optimized_grid_options(df: pd.DataFrame) -> Dict[str, Any]:
         if (isLeafNode) {{ // Aplicar solo a los hijos de nivel más bajo
             if (importance > 20) {{
                 importanceStyle = {{
-                    'borderLeft': '4px solid {THEME_COLORS["primario"]}', 
+                    'borderLeft': '4px solid {colores["primario"]}', 
                     'paddingLeft': '16px',
                     'borderTopLeftRadius': '8px',
                     'borderBottomLeftRadius': '8px'
                 }};
             }} else if (importance > 10) {{
                 importanceStyle = {{
-                    'borderLeft': '4px solid {THEME_COLORS["historico"]}', 
+                    'borderLeft': '4px solid {colores["historico"]}', 
                     'paddingLeft': '16px',
                     'borderTopLeftRadius': '8px',
                     'borderBottomLeftRadius': '8px'
                 }};
             }} else if (importance > 5) {{
                 importanceStyle = {{
-                    'borderLeft': '4px solid {THEME_COLORS["exito"]}', 
+                    'borderLeft': '4px solid {colores["exito"]}', 
                     'paddingLeft': '16px',
                     'borderTopLeftRadius': '8px',
                     'borderBottomLeftRadius': '8px'
@@ -181,7 +188,7 @@ def create_optimized_grid_options(df: pd.DataFrame) -> Dict[str, Any]:
     }}
     """)
 
-    gb = GridOptionsBuilder.from_dataframe(df)
+    gb = GridOptionsBuilder.from_dataframe(df_esquema)
      
     # Formateador de costo optimizado
     cost_formatter = JsCode("""
@@ -266,19 +273,124 @@ def create_optimized_grid_options(df: pd.DataFrame) -> Dict[str, Any]:
         enableRangeSelection=True
     )
 
+    if progresivo:
+        desglose_formatter = JsCode("""
+        function(params) {
+            if (!params.value) return '';
+            return '▸ ' + params.value + (params.value === 1 ? ' partida' : ' partidas');
+        }
+        """)
+        gb.configure_column("Resumen", hide=True)
+        gb.configure_column(
+            "Num_Hijos",
+            headerName="Desglose",
+            valueFormatter=desglose_formatter,
+            minWidth=130,
+            maxWidth=160,
+            cellStyle={'color': colores["texto_secundario"]},
+        )
+        for col in ["ID_Padre", "Es_Raiz", "Orden"]:
+            gb.configure_column(col, hide=True)
+        gb.configure_selection(selection_mode='single')
+        gb.configure_grid_options(groupDefaultExpanded=-1)
+
     return gb.build()
 
 
+# Se define el estilo de la tabla, muy importante
+def create_optimized_grid_options(df: pd.DataFrame, progresivo: bool = False,
+                                  colores: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Configura las opciones optimizadas de AG-Grid con mejor rendimiento.
+    
+    Args:
+        df: DataFrame con datos CBS
+        progresivo: Si la tabla se muestra en modo de carga progresiva
+        colores: Paleta del tema (por defecto THEME_COLORS)
+        
+    Returns:
+        Diccionario con configuración de grid. Es una copia de la configuración
+        memoizada, porque AgGrid modifica el diccionario que recibe.
+    """
+    esquema = tuple((col, str(dtype)) for col, dtype in df.dtypes.items())
+    colores = tuple(sorted((colores or THEME_COLORS).items()))
+    return copy.deepcopy(_construir_opciones_grid(esquema, colores, progresivo))
 
 
+def debug_cost_aggregation(df_aggregated: pd.DataFrame, num_checks: int = 5):
+    """
+    Función de depuración para verificar que los costos de los nodos padre
+    corresponden a la suma de sus hijos directos.
+    """
+    with st.expander("🔬 Verificación de la Suma de Costos Jerárquicos"):
+        st.info(f"Se seleccionarán hasta {num_checks} nodos 'padre' al azar para verificar que su costo sea igual a la suma de sus hijos directos.")
 
+        # Identificar todos los IDs que son padres
+        parent_ids = set(
+            id_str.rpartition('.')[0] for id_str in df_aggregated['ID_Jerarquico'] if '.' in id_str
+        )
+        
+        # Filtrar el DataFrame para obtener solo los nodos que son padres
+        parent_nodes = df_aggregated[df_aggregated['ID_Jerarquico'].isin(parent_ids)]
 
+        if parent_nodes.empty:
+            st.warning("No se encontraron nodos padre en los datos para verificar.")
+            return
+
+        # Seleccionar una muestra aleatoria de padres para no saturar la pantalla
+        num_to_sample = min(num_checks, len(parent_nodes))
+        parents_to_check = parent_nodes.sample(num_to_sample, random_state=1)
+
+        # Iterar sobre los padres seleccionados para verificarlos
+        for _, parent_row in parents_to_check.iterrows():
+            parent_id = parent_row['ID_Jerarquico']
+            parent_cost_calculated = parent_row['Costo']
+            
+            st.markdown(f"--- \n#### Verificando Padre: `{parent_id}`")
+            
+            # Encontrar los hijos directos de este padre
+            parent_level = parent_row['Nivel']
+            direct_children = df_aggregated[
+                df_aggregated['ID_Jerarquico'].str.startswith(parent_id + '.') &
+                (df_aggregated['Nivel'] == parent_level + 1)
+            ]
+
+            if direct_children.empty:
+                st.write("Este nodo no tiene hijos directos en el DataFrame.")
+                continue
+
+            # Sumar los costos de los hijos directos
+            children_cost_sum = direct_children['Costo'].sum()
+
+            # Mostrar los resultados de la verificación
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric(
+                    label=f"Costo Calculado para '{parent_id}'",
+                    value=f"${parent_cost_calculated:,.2f}"
+                )
+            with col2:
+                st.metric(
+                    label="Suma de Costos de Hijos Directos",
+                    value=f"${children_cost_sum:,.2f}"
+                )
+            
+            # Comparar y mostrar un mensaje de éxito o error
+            if np.isclose(parent_cost_calculated, children_cost_sum):
+                st.success(f"✅ ¡Correcto! El costo del padre coincide con la suma de sus hijos.")
+            else:
+                st.error(f"❌ ¡Error! El costo del padre NO coincide con la suma de sus hijos.")
+                st.write("Hijos directos encontrados:")
+                st.dataframe(direct_children[['ID_Jerarquico', 'Costo']])
 
 
 class CbsDataManager:
     """
     Gestiona la visualización de la tabla de datos del CBS, KPIs y controles.
     """
+    # Número de partidas a partir del cual la tabla inicia en modo de carga progresiva
+    UMBRAL_CARGA_PROGRESIVA = 500
+
     def __init__(self, df_procesado: pd.DataFrame, session_key: str):
         self.df_procesado = df_procesado
         self.session_key = session_key
@@ -298,176 +410,14 @@ class CbsDataManager:
             
             self.render_grid(df_filtrado, key=key)  
 
-    def _build_grid_options(self, df_for_grid: pd.DataFrame) -> Dict[str, Any]:
+        CbsVersionHistory(self.session_key).render()
+
+    def _build_grid_options(self, df_for_grid: pd.DataFrame, progresivo: bool = False) -> Dict[str, Any]:
         """
-        Método privado que encapsula la compleja configuración de AG-Grid.
-        Reemplaza a create_optimized_grid_options.
+        Método privado que obtiene la configuración de AG-Grid para el esquema de
+        'df_for_grid' desde la fábrica memoizada (create_optimized_grid_options).
         """
-
-        
-        gb = GridOptionsBuilder.from_dataframe(df_for_grid)
-
-        group_cell_style_js = JsCode(f"""
-        function(params) {{
-            const level = params.node.level + 1;
-            const importance = params.data ? params.data['Importancia (%)'] || 0 : 0;
-            const isParentNode = params.node.childrenAfterFilter.length > 0;
-
-            // Estilos base para fuente y color según el nivel
-            const baseStyles = {{
-                1: {{'fontSize': '20px', 'fontWeight': '600', 'color': '{self.THEME_COLORS["primario"]}'}},
-                2: {{'fontSize': '18px', 'fontWeight': '500', 'color': '{self.THEME_COLORS["texto_principal"]}'}},
-                3: {{'fontSize': '16px', 'fontWeight': '400', 'color': '{self.THEME_COLORS["texto_principal"]}'}},
-                4: {{'fontSize': '15px', 'fontWeight': '400', 'color': '{self.THEME_COLORS["texto_secundario"]}'}},
-                5: {{'fontSize': '14px', 'fontWeight': '400', 'color': '{self.THEME_COLORS["texto_secundario"]}'}},
-                6: {{'fontSize': '13px', 'fontWeight': '400', 'color': '{self.THEME_COLORS["texto_secundario"]}'}}
-            }};
-            
-            // Estilo de sangría para la jerarquía
-            const indentation = {{ paddingLeft: (level > 1 ? (level - 1) * 20 : 0) + 'px' }};
-            
-            let importanceStyle = {{}};
-            if (isParentNode && importance > 20 && level > 2) {{
-                // Resalta padres importantes (Nivel 3+) con un fondo sutil
-                importanceStyle = {{ 'backgroundColor': 'rgba(0, 109, 119, 0.1)' }};
-            }}
-
-            // Combinar todos los estilos
-            return Object.assign(indentation, baseStyles[level] || {{}}, importanceStyle);
-        }}
-        """)
-        
-        # Estilo para la columna de Descripción, ahora con el borde de importancia
-        description_cell_style_js = JsCode(f"""
-        function(params) {{
-            const importance = params.data ? params.data['Importancia (%)'] || 0 : 0;
-            const isLeafNode = params.node.childrenAfterFilter.length === 0;
-
-            let importanceStyle = {{}};
-            if (isLeafNode) {{ // Aplicar solo a los hijos de nivel más bajo
-                if (importance > 20) {{
-                    importanceStyle = {{
-                        'borderLeft': '4px solid {self.THEME_COLORS["primario"]}', 
-                        'paddingLeft': '16px',
-                        'borderTopLeftRadius': '8px',
-                        'borderBottomLeftRadius': '8px'
-                    }};
-                }} else if (importance > 10) {{
-                    importanceStyle = {{
-                        'borderLeft': '4px solid {self.THEME_COLORS["historico"]}', 
-                        'paddingLeft': '16px',
-                        'borderTopLeftRadius': '8px',
-                        'borderBottomLeftRadius': '8px'
-                    }};
-                }} else if (importance > 5) {{
-                    importanceStyle = {{
-                        'borderLeft': '4px solid {self.THEME_COLORS["exito"]}', 
-                        'paddingLeft': '16px',
-                        'borderTopLeftRadius': '8px',
-                        'borderBottomLeftRadius': '8px'
-                    }};
-                }}
-            }}
-
-            // Se retorna el estilo de importancia para que se aplique a la celda
-            return importanceStyle;
-        }}
-        """)
-
-        value_getter_js = JsCode(f"""
-        function(params) {{
-            if (!params.node.data) return '';
-            return params.node.data.ID_Jerarquico || '';
-        }}
-        """)
-
-        
-        gb = GridOptionsBuilder.from_dataframe(self.df_procesado)
-        
-        # Formateador de costo optimizado
-        cost_formatter = JsCode("""
-        function(params) {
-            if (params.value != null) {
-                return '$' + params.value.toLocaleString('en-US', {
-                    minimumFractionDigits: 2, 
-                    maximumFractionDigits: 2 
-                });
-            }
-            return '$0.00';
-        }
-        """)
-        
-        # Configuración de columnas
-        gb.configure_column(
-            "Costo_Total", 
-            headerName="Costo", 
-            type=["numericColumn"], 
-            valueFormatter=cost_formatter, 
-            aggFunc='sum', 
-            minWidth=150,
-            maxWidth=200,
-            flex=1,
-            cellStyle={
-                'textAlign': 'right', 
-                'fontWeight': '600', 
-            },
-            
-        )
-        
-        gb.configure_column(
-            "Descripcion", 
-            headerName="Descripción", 
-            flex=1,
-            minWidth=250, 
-            maxWidth=350, 
-            wrapText=True, 
-            autoHeight=True,
-            cellStyle=description_cell_style_js,
-            
-        )
-        
-        gb.configure_column(
-            "Resumen", 
-            headerName="Resumen", 
-            flex=2, 
-            minWidth=500, 
-            maxWidth=850, 
-            wrapText=True, 
-            autoHeight=True, 
-            cellStyle={ 
-                'fontSize': '14px',
-                'lineHeight': '2.0'
-            },
-        )
-
-        
-        # Ocultar columnas auxiliares
-        for col in ["ruta_jerarquica", "Nivel", "ID_Jerarquico", "Importancia (%)","Costo"]:
-            gb.configure_column(col, hide=True)
-        
-        # Configuración principal del grid
-        gb.configure_grid_options(
-            suppressAggFuncInHeader=True, 
-            treeData=True, 
-            getDataPath=JsCode("data => data.ruta_jerarquica.split('/')"),
-            autoGroupColumnDef={
-                "headerName": "Nivel Jerárquico", 
-                "minWidth": 300,
-                "maxWidth": 350, 
-                "flex": 1,
-                "cellRendererParams": {"suppressCount": True},
-                "valueGetter": value_getter_js,
-                "cellStyle": group_cell_style_js, # Se reutiliza el JS consolidado
-                
-            },
-            groupDefaultExpanded=2,
-            rowBuffer=50,
-            animateRows=False, # Mejora el rendimiento
-            #rowSelection='multiple',
-            enableRangeSelection=True
-        )
-
-        return gb.build()
+        return create_optimized_grid_options(df_for_grid, progresivo=progresivo, colores=self.THEME_COLORS)
     
     def render_kpis(self):
         """Renderiza las tarjetas KPI. Reemplaza a create_kpi_cards."""
@@ -512,6 +462,17 @@ class CbsDataManager:
 
             if df_filtrado.empty:
                 st.warning("No hay datos que coincidan con los filtros aplicados.")
+                return
+
+            modo_progresivo = st.toggle(
+                "Carga progresiva del árbol",
+                value=len(self.df_procesado) > self.UMBRAL_CARGA_PROGRESIVA,
+                key=f"progresivo_{key}",
+                help="Envía solo los niveles visibles; haz clic en una partida para expandirla y ver su resumen."
+            )
+
+            if modo_progresivo:
+                self._render_grid_progresivo(df_filtrado, key)
             else:
 
                 with st.spinner("Generando tabla interactiva..."):
@@ -531,6 +492,78 @@ class CbsDataManager:
                     except Exception as e:
                         st.error(f"Error al generar la tabla: {str(e)}")
 
+    def _render_grid_progresivo(self, df_filtrado: pd.DataFrame, key: str):
+        """
+        Renderiza la tabla en modo progresivo: solo se envían las raíces y los hijos de los
+        nodos expandidos, y el 'Resumen' se consulta solo para la partida seleccionada.
+        """
+        expandidos_key = f"expandidos_{self.session_key}"
+        seleccion_key = f"seleccion_{self.session_key}"
+        detalle_key = f"detalle_{self.session_key}"
+        if expandidos_key not in st.session_state:
+            st.session_state[expandidos_key] = frozenset()
+            st.session_state[seleccion_key] = None
+            st.session_state[detalle_key] = None
+        expandidos = st.session_state[expandidos_key]
+
+        df_arbol = logica_cbs.preparar_arbol_progresivo(df_filtrado.drop(columns=['Resumen'], errors='ignore'))
+        df_visible = logica_cbs.obtener_filas_visibles(df_arbol, expandidos)
+
+        col_info, col_boton = st.columns([4, 1])
+        with col_info:
+            st.caption(f"Mostrando {len(df_visible):,} de {len(df_arbol):,} partidas.")
+        with col_boton:
+            if expandidos and st.button("Contraer todo", key=f"contraer_{key}"):
+                st.session_state[expandidos_key] = frozenset()
+                st.rerun()
+
+        try:
+            grid_options = self._build_grid_options(df_visible, progresivo=True)
+            respuesta = AgGrid(
+                df_visible,
+                gridOptions=grid_options,
+                theme='material',
+                allow_unsafe_jscode=True,
+                enable_enterprise_modules=True,
+                height=800,
+                update_mode='SELECTION_CHANGED',
+                # La llave cambia con los nodos expandidos para que la tabla reciba las nuevas filas
+                key=f"{key}_progresivo_{hash(expandidos)}",
+                fit_columns_on_grid_load=True
+            )
+        except Exception as e:
+            st.error(f"Error al generar la tabla: {str(e)}")
+            return
+
+        seleccion = respuesta.selected_rows
+        if seleccion is None or len(seleccion) == 0:
+            # La tabla se recrea al expandir; una selección vacía permite volver a hacer clic en la misma fila
+            st.session_state[seleccion_key] = None
+        else:
+            id_seleccionado = str(pd.DataFrame(seleccion)['ID_Jerarquico'].iloc[0])
+            if id_seleccionado != st.session_state[seleccion_key]:
+                st.session_state[seleccion_key] = id_seleccionado
+                st.session_state[detalle_key] = id_seleccionado
+                fila = df_visible[df_visible['ID_Jerarquico'] == id_seleccionado]
+                if not fila.empty and fila['Num_Hijos'].iloc[0] > 0:
+                    if id_seleccionado in expandidos:
+                        # Al contraer un nodo se contraen también sus descendientes
+                        st.session_state[expandidos_key] = frozenset(
+                            i for i in expandidos if i != id_seleccionado and not i.startswith(id_seleccionado + '.')
+                        )
+                    else:
+                        st.session_state[expandidos_key] = expandidos | {id_seleccionado}
+                    st.rerun()
+
+        # 'Resumen' bajo demanda: solo se consulta el de la última partida seleccionada
+        id_detalle = st.session_state[detalle_key]
+        detalle = df_filtrado[df_filtrado['ID_Jerarquico'] == id_detalle]
+        if not detalle.empty:
+            with st.container(border=True):
+                theme.render_subheader(f"{id_detalle} - {detalle['Descripcion'].iloc[0]}")
+                resumen = detalle['Resumen'].iloc[0] if 'Resumen' in detalle.columns else None
+                st.markdown(resumen if isinstance(resumen, str) and resumen.strip() else "_Sin resumen._")
+
 
     @staticmethod
     def render_file_uploader(load_function: Callable) -> Optional[pd.DataFrame]:
@@ -590,7 +623,7 @@ class CbsDataManager:
                     submitted = st.form_submit_button("Subir archivo")
                     
                     if submitted and new_df is not None:
-                        st.session_state[self.session_key] = new_df
+                        CbsVersionHistory.registrar_carga(self.session_key, new_df)
                         st.session_state.control_panel_expanded = True
                         st.success("Archivo cargado. Actualizando vista...")
                         st.rerun()
@@ -746,12 +779,18 @@ class CbsVisualizer:
     """
     Una clase para encapsular toda la lógica de visualización del CBS.
     """
-    def __init__(self, df: pd.DataFrame, key_prefix: str):
+    def __init__(self, df: pd.DataFrame, key_prefix: str, huella: Optional[str] = None):
         """
-        El constructor recibe el DataFrame ya procesado.
+        El constructor recibe el DataFrame ya procesado y, si se conoce, la huella del CBS
+        del que proviene (huella_cbs_sesion); sin ella se calcula al pedir la primera figura.
         """
         self.df = df
         self.key_prefix = key_prefix
+        self.cache_figuras = obtener_cache_figuras()
+        self._huella = huella
+        self._rollups = None
+        # Nivel de detalle del sunburst: acota el número de nodos enviados al navegador
+        self.LOD_SUNBURST = {"profundidad_max": 4, "umbral_pct": 0.5, "max_nodos": 2000}
         self.COLOR_PALETTE_CATEGORICAL = ["#006D77", "#83C5BE", "#264653", "#E29578", "#FFDD99", "#4E6B73"]
         self.COLOR_SCALE_SEQUENTIAL = [
             "#FFFAE5",  # Arena muy clara (mínimos)
@@ -790,45 +829,72 @@ class CbsVisualizer:
         return leaf_nodes
     
 
-    def _create_path_hierarchy(self, df_chart: pd.DataFrame) -> pd.DataFrame:
-        df_copy = df_chart.copy()
-        def safe_split_path(row):
-            ruta = row['ruta_jerarquica']
-            if isinstance(ruta, str) and ruta.strip():
-                path_list = [part.strip() for part in ruta.split('/') if part.strip()]
-                return path_list if path_list else [row['ID_Jerarquico']]
-            return [row['ID_Jerarquico']]
-        df_copy['path_hierarchy'] = df_copy.apply(safe_split_path, axis=1)
-        return df_copy
-    
-    def _expand_path_columns(self, df_with_paths: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    def _expand_path_columns(self, df_chart: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
         """
-        Expande la columna 'path_hierarchy' en múltiples columnas 'level_n'.
+        Expande 'ruta_jerarquica' en columnas 'level_n' (rellenas con None a la derecha)
+        con un solo split vectorizado. Las rutas vacías usan el 'ID_Jerarquico' como único nivel.
         """
-        df_filtered =  df_with_paths[ df_with_paths['path_hierarchy'].apply(lambda x: isinstance(x, list) and len(x) > 0)].copy()
-        if df_filtered.empty:
+        if df_chart.empty:
             return pd.DataFrame(), []
-        # Usamos int() para asegurar que max_depth no sea un float si hay NaNs
-        max_depth = int(df_filtered['path_hierarchy'].str.len().max())
-        path_columns = [f'level_{i}' for i in range(max_depth)]
-        for i, col_name in enumerate(path_columns):
-            df_filtered[col_name] = df_filtered['path_hierarchy'].str[i]
-        return df_filtered, path_columns
+
+        rutas = df_chart['ruta_jerarquica'].where(df_chart['ruta_jerarquica'].map(type) == str, '')
+
+        # Se limpian espacios y segmentos vacíos ('a/ /b' -> 'a/b') solo si alguna ruta lo requiere
+        if rutas.str.contains(r'\s|//|^/|/$', regex=True).any():
+            rutas = (
+                rutas.str.replace(r'\s*/\s*', '/', regex=True)
+                .str.replace(r'/{2,}', '/', regex=True)
+                .str.strip('/ ')
+            )
+        rutas = rutas.mask(rutas == '', df_chart['ID_Jerarquico'].astype(str))
+
+        niveles = rutas.str.split('/', expand=True)
+        path_columns = [f'level_{i}' for i in range(niveles.shape[1])]
+        niveles.columns = path_columns
+
+        df_expanded = pd.concat([df_chart, niveles.astype(object).where(niveles.notna(), None)], axis=1)
+        return df_expanded, path_columns
+
+    @staticmethod
+    def _wrap_labels(etiquetas: pd.Series, max_words_per_line: int = 2) -> pd.Series:
+        """Inserta '<br>' cada 'max_words_per_line' palabras con reemplazos de regex vectorizados."""
+        texto = etiquetas.astype('string').str.replace(r'\s+', ' ', regex=True).str.strip()
+        patron = r'((?:\S+ ){%d}\S+) ' % (max_words_per_line - 1) if max_words_per_line > 1 else r'(\S+) '
+        return texto.str.replace(patron, r'\1<br>', regex=True).astype(object).where(etiquetas.notna(), etiquetas)
+
+
+    @property
+    def rollups(self) -> Dict[int, pd.DataFrame]:
+        """Tablas de costos por categoría de cada nivel (calculadas una vez por CBS)."""
+        if self._rollups is None:
+            self._rollups = logica_cbs.calcular_rollups_por_nivel(self.df)
+        return self._rollups
+
+    def _obtener_figura(self, tipo: str, constructor: Callable[[], Optional[go.Figure]], **parametros) -> Optional[go.Figure]:
+        """
+        Devuelve la figura desde la caché LRU, indexada por (huella del CBS, tipo, parámetros).
+        La huella se calcula una sola vez por instancia.
+        """
+        if self._huella is None:
+            self._huella = huella_dataframe(self.df, COLUMNAS_HUELLA)
+        clave = (self._huella, tipo, tuple(sorted(parametros.items())))
+        return self.cache_figuras.obtener(clave, constructor)
 
 
     # --- MÉTODOS PÚBLICOS PARA RENDERIZAR GRÁFICOS ---
 
     def render_category_pie_chart(self, level: int, top_n: int = 5):
-        """Prepara datos y renderiza el gráfico de dona por categoría."""
-        # Preparación de datos (antes 'prepare_category_data')
-        df_copy = self.df.copy()
-        description_map = df_copy.drop_duplicates(subset=['ID_Jerarquico']).set_index('ID_Jerarquico')['Descripcion']
-        df_copy['Categoria'] = df_copy['ID_Jerarquico'].str.split('.').str[:level].str.join('.')
-        df_copy['Nivel_Fila'] = df_copy['ID_Jerarquico'].str.count('\\.') + 1
-        df_filtered_level = df_copy[df_copy['Nivel_Fila'] >= level]
-        df_chart = df_filtered_level.groupby('Categoria').agg(Costo=('Costo', 'sum')).reset_index()
-        df_chart['Descripcion'] = df_chart['Categoria'].map(description_map).fillna('N/A')
-        df_chart = df_chart.sort_values('Costo', ascending=False)
+        """Renderiza el gráfico de dona por categoría (desde la caché de figuras)."""
+        fig = self._obtener_figura('dona', lambda: self._build_category_pie_figure(level, top_n), level=level, top_n=top_n)
+        if fig is None:
+            st.info(f"No hay datos suficientes para mostrar en el Nivel {level}.")
+            return
+        st.plotly_chart(fig, use_container_width=True)
+
+    def _build_category_pie_figure(self, level: int, top_n: int) -> Optional[go.Figure]:
+        """Prepara datos y construye el gráfico de dona por categoría."""
+        # Preparación de datos: solo se toma la tabla precalculada del nivel
+        df_chart = self.rollups.get(level, pd.DataFrame(columns=['Categoria', 'Costo', 'Descripcion']))
         
         if len(df_chart) > top_n:
             df_top = df_chart.head(top_n)
@@ -840,8 +906,7 @@ class CbsVisualizer:
 
         # Creación del gráfico (antes 'create_category_pie_chart')
         if df_chart.empty:
-            st.info(f"No hay datos suficientes para mostrar en el Nivel {level}.")
-            return
+            return None
         
         fig = go.Figure(data=[go.Pie(
             labels=df_chart['Categoria'],
@@ -865,10 +930,21 @@ class CbsVisualizer:
             uniformtext_minsize=6, 
             uniformtext_mode='hide'
         )
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
     def render_treemap(self, top_n: int, category_prefix: Optional[str] = None):
-        """Prepara datos y renderiza el gráfico treemap."""
+        """Renderiza el gráfico treemap (desde la caché de figuras)."""
+        fig = self._obtener_figura(
+            'treemap', lambda: self._build_treemap_figure(top_n, category_prefix),
+            top_n=top_n, category_prefix=category_prefix
+        )
+        if fig is None:
+            st.info("No hay datos para mostrar en el Treemap con la selección actual.")
+            return
+        st.plotly_chart(fig, use_container_width=True)
+
+    def _build_treemap_figure(self, top_n: int, category_prefix: Optional[str] = None) -> Optional[go.Figure]:
+        """Prepara datos y construye el gráfico treemap."""
         # Preparación de datos (antes 'prepare_treemap_data')
         df_to_filter = self.df
         if category_prefix:
@@ -881,15 +957,12 @@ class CbsVisualizer:
         
         # Creación del gráfico (antes 'create_top_n_treemap')
         if df_chart.empty:
-            st.info("No hay datos para mostrar en el Treemap con la selección actual.")
-            return
+            return None
 
-        df_with_paths = self._create_path_hierarchy(df_chart)
-        df_plot, path_columns = self._expand_path_columns(df_with_paths)
+        df_plot, path_columns = self._expand_path_columns(df_chart)
 
         if df_plot.empty:
-            st.info("No se pudo construir la jerarquía para el Treemap.")
-            return
+            return None
         
         # 1. Crear columnas explícitas para el texto y el hover.
         df_plot['text_label'] = np.where(
@@ -903,17 +976,8 @@ class CbsVisualizer:
             "" # Los padres no muestran costo en el recuadro
         )
 
-        # Función para envolver el texto e insertar saltos de línea.
-        def wrap_text(text, max_words_per_line=2):
-            if not isinstance(text, str):
-                return text
-            words = text.split()
-            wrapped_lines = []
-            for i in range(0, len(words), max_words_per_line):
-                wrapped_lines.append(" ".join(words[i:i+max_words_per_line]))
-            return "<br>".join(wrapped_lines)
-        
-        df_plot['text_label'] = df_plot['text_label'].apply(wrap_text)
+        # Envolver el texto e insertar saltos de línea.
+        df_plot['text_label'] = self._wrap_labels(df_plot['text_label'])
 
         fig = px.treemap(
             df_plot, 
@@ -945,14 +1009,47 @@ class CbsVisualizer:
             coloraxis_colorbar_title_text='Importancia (%)'
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
 
-    def render_sunburst_chart(self):
-        """Prepara datos y renderiza el gráfico sunburst."""
+    def render_sunburst_chart(self, id_raiz: Optional[str] = None):
+        """Renderiza el gráfico sunburst (desde la caché de figuras) a partir de 'id_raiz'."""
+        fig = self._obtener_figura('sunburst', lambda: self._build_sunburst_figure(id_raiz), id_raiz=id_raiz)
+        st.plotly_chart(fig, use_container_width=True)
+
+    def _raices_sunburst(self, id_raiz: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        Raíces a las que se puede navegar desde el sunburst centrado en 'id_raiz': los
+        ancestros de la raíz actual (para volver) y los padres de cada nodo "Otros" del
+        árbol podado (para ver sus partidas). Los nodos se leen de la figura en caché, así
+        que las opciones no crecen con el tamaño del CBS. Devuelve {etiqueta: ID}.
+        """
+        raices = {"Todo el proyecto": None}
+        if id_raiz is not None:
+            partes = id_raiz.split('.')
+            ancestros = ['.'.join(partes[:i]) for i in range(1, len(partes) + 1)]
+            df_ancestros = self.df[self.df['ID_Jerarquico'].isin(ancestros)]
+            descripciones = dict(zip(df_ancestros['ID_Jerarquico'], df_ancestros['Descripcion'].astype(str)))
+            if id_raiz not in descripciones:
+                # La raíz guardada ya no existe (p. ej. se cargó otro CBS)
+                return raices
+            raices.update({f"{a} - {descripciones[a]}": a for a in ancestros if a in descripciones})
+
+        fig = self._obtener_figura('sunburst', lambda: self._build_sunburst_figure(id_raiz), id_raiz=id_raiz)
+        etiquetas = dict(zip(fig.data[0].ids, fig.data[0].labels))
+        for id_nodo in etiquetas:
+            if id_nodo.endswith('.otros'):
+                padre = id_nodo.removesuffix('.otros')
+                raices.setdefault(f"{padre} - {etiquetas[padre]}", padre)
+        return raices
+
+    def _build_sunburst_figure(self, id_raiz: Optional[str] = None) -> go.Figure:
+        """
+        Prepara datos y construye el gráfico sunburst. Solo se envía el árbol podado por
+        nivel de detalle (podar_arbol_lod): las partidas menores se agrupan en "Otros".
+        """
 
-        df_plot = self.df.copy()
-        df_plot['parent_id'] = df_plot['ID_Jerarquico'].str.rpartition('.')[0]
+        df_plot = logica_cbs.podar_arbol_lod(self.df, id_raiz=id_raiz, **self.LOD_SUNBURST)
 
         df_plot['Importancia_Color'] = df_plot['Importancia (%)'].replace(0, 0.01)
 
@@ -1006,7 +1103,7 @@ class CbsVisualizer:
             }
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
 
 
     # --- MÉTODO PRINCIPAL PARA EL DASHBOARD ---
@@ -1022,8 +1119,7 @@ class CbsVisualizer:
             with st.container(border=True):
                 theme.render_header("Costos por nivel jerarquico")
 
-                max_level = int(self.df['ID_Jerarquico'].str.count('\\.').max()) + 1
-                level_options = [f"Nivel {i}" for i in range(2, max_level + 1)]
+                level_options = [f"Nivel {i}" for i in self.rollups if i >= 2]
 
                 if level_options:
                     pills_nivel_key = f"pills_nivel_{self.key_prefix}"
@@ -1100,5 +1196,407 @@ class CbsVisualizer:
 
         with st.container(border=True):
             theme.render_header("Jerarquía de costos")
-            self.render_sunburst_chart()
 
+            # Drill-down: las partidas agrupadas en "Otros" se exploran centrando el gráfico en su padre
+            # La etiqueta seleccionada empieza con el ID de la raíz actual ("1.2.3 - Descripción")
+            clave_raiz = f"raiz_sunburst_{self.key_prefix}"
+            etiqueta_actual = st.session_state.get(clave_raiz, "Todo el proyecto")
+            raices = self._raices_sunburst(None if etiqueta_actual == "Todo el proyecto" else etiqueta_actual.split(" - ", 1)[0])
+            if etiqueta_actual not in raices:
+                st.session_state[clave_raiz] = "Todo el proyecto"
+            seleccion_raiz = st.selectbox(
+                "Explorar desde:",
+                options=list(raices.keys()),
+                key=clave_raiz,
+                help="Las partidas con menos del 0.5% del total mostrado se agrupan en 'Otros'. Selecciona su categoría para verlas, o un nivel superior para volver."
+            )
+            self.render_sunburst_chart(id_raiz=raices[seleccion_raiz])
+
+
+
+class CbsSensitivityAnalyzer:
+    """
+    Encapsula los controles y gráficas (tornado y araña) del análisis de sensibilidad del CBS.
+    """
+    def __init__(self, df: pd.DataFrame, key_prefix: str):
+        self.df = df
+        self.key_prefix = key_prefix
+        self.COLOR_PALETTE_CATEGORICAL = ["#006D77", "#83C5BE", "#264653", "#E29578", "#FFDD99", "#4E6B73"]
+
+    def _render_controls(self) -> Dict[str, Any]:
+        """Renderiza los controles del análisis y devuelve los parámetros seleccionados."""
+        with st.container(border=True):
+            theme.render_subheader("Parámetros del análisis")
+            col1, col2, col3, col4 = st.columns(4)
+
+            with col1:
+                max_level = int(self.df['Nivel'].max())
+                opciones_conductor = ["Hojas"] + [f"Nivel {i}" for i in range(2, max_level + 1)]
+                conductor = st.selectbox(
+                    "Elementos a perturbar",
+                    options=opciones_conductor,
+                    key=f"sens_conductor_{self.key_prefix}",
+                    help="Las hojas son las partidas sin desglose. Un nivel perturba todas las partidas de cada categoría."
+                )
+
+            with col2:
+                nodos_objetivo = self.df[self.df['Nivel'] <= 2]
+                mapa_objetivo = {"Total del proyecto": None}
+                mapa_objetivo.update(dict(zip(
+                    nodos_objetivo['ID_Jerarquico'] + " - " + nodos_objetivo['Descripcion'].astype(str),
+                    nodos_objetivo['ID_Jerarquico']
+                )))
+                objetivo = st.selectbox(
+                    "Total a analizar",
+                    options=list(mapa_objetivo.keys()),
+                    key=f"sens_objetivo_{self.key_prefix}"
+                )
+
+            with col3:
+                variacion = st.slider(
+                    "Variación (±%)", min_value=1, max_value=50, value=10, step=1,
+                    format="%d%%", key=f"sens_variacion_{self.key_prefix}"
+                )
+
+            with col4:
+                top_n = st.pills(
+                    "Conductores a mostrar", options=[5, 10, 15, 20], default=10,
+                    key=f"sens_top_n_{self.key_prefix}"
+                )
+
+        nivel = None if conductor == "Hojas" else int(conductor.split(" ")[1])
+        return {
+            "nivel_conductor": nivel,
+            "id_objetivo": mapa_objetivo[objetivo],
+            "variacion_pct": float(variacion),
+            "top_n": top_n or 10,
+        }
+
+    def render_tornado_chart(self, resultados: Dict[str, Any]):
+        """Renderiza el gráfico tornado: rango del total objetivo al perturbar cada conductor."""
+        df_tornado = resultados["tornado"]
+        total_base = resultados["total_base"]
+        variacion = resultados["variacion_pct"]
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            y=df_tornado['Etiqueta'], x=df_tornado['Total_Bajo'] - total_base, base=total_base,
+            orientation='h', name=f"-{variacion:.0f}%", marker_color=THEME_COLORS["exito"],
+            hovertemplate="%{y}<br>Total: $%{x:,.2f}<extra></extra>"
+        ))
+        fig.add_trace(go.Bar(
+            y=df_tornado['Etiqueta'], x=df_tornado['Total_Alto'] - total_base, base=total_base,
+            orientation='h', name=f"+{variacion:.0f}%", marker_color=THEME_COLORS["peligro"],
+            hovertemplate="%{y}<br>Total: $%{x:,.2f}<extra></extra>"
+        ))
+        fig.add_vline(x=total_base, line_dash="dash", line_color=THEME_COLORS["texto_principal"])
+        fig.update_layout(
+            template="plotly_white", barmode='overlay', height=600,
+            xaxis_title="Costo total [$]",
+            yaxis=dict(autorange='reversed'),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+            margin=dict(t=50, l=25, r=25, b=25)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    def render_spider_chart(self, resultados: Dict[str, Any]):
+        """Renderiza la gráfica de araña: total objetivo frente al porcentaje de variación."""
+        df_arana = resultados["arana"]
+
+        fig = go.Figure()
+        for i, columna in enumerate(df_arana.columns):
+            fig.add_trace(go.Scatter(
+                x=df_arana.index, y=df_arana[columna], mode='lines+markers', name=columna,
+                line=dict(color=self.COLOR_PALETTE_CATEGORICAL[i % len(self.COLOR_PALETTE_CATEGORICAL)])
+            ))
+        fig.update_layout(
+            template="plotly_white", height=600,
+            xaxis_title="Variación del conductor [%]",
+            yaxis_title="Costo total [$]",
+            legend=dict(orientation="h", yanchor="top", y=-0.15, xanchor="left", x=0),
+            margin=dict(t=50, l=25, r=25, b=25)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    def render(self):
+        """Renderiza el análisis de sensibilidad completo."""
+        parametros = self._render_controls()
+        resultados = calcular_sensibilidad(self.df, **parametros)
+
+        if not resultados or resultados["tornado"].empty:
+            st.info("No hay conductores con costo para el total seleccionado.")
+            return
+
+        col1, col2 = st.columns(2)
+        with col1:
+            with st.container(border=True):
+                theme.render_header("Diagrama de tornado")
+                self.render_tornado_chart(resultados)
+        with col2:
+            with st.container(border=True):
+                theme.render_header("Diagrama de araña")
+                self.render_spider_chart(resultados)
+
+        with st.expander("Ver totales afectados por cada conductor"):
+            df_totales = resultados["totales_afectados"]
+            df_totales = df_totales[(df_totales != 0).any(axis=1)]
+            st.dataframe(df_totales.style.format("{:,.2f}"), use_container_width=True)
+
+
+class CbsBudgetControl:
+    """
+    Gestiona la carga de versiones (reales o pronósticos) y el desglose del control
+    presupuestal de un CBS frente a su presupuesto base.
+    """
+    def __init__(self, df_base: pd.DataFrame, session_key: str):
+        self.df_base = df_base
+        self.session_key = session_key
+        self.versiones_key = f"versiones_{session_key}"
+        self.nodo_key = f"nodo_control_{session_key}"
+
+        if self.versiones_key not in st.session_state:
+            st.session_state[self.versiones_key] = {}
+
+    def _render_version_loader(self):
+        """Renderiza el panel para cargar o limpiar versiones de costos reales/pronóstico."""
+        with st.expander("**Panel de versiones**", expanded=not st.session_state[self.versiones_key]):
+            col_carga, col_lista = st.columns([2, 1])
+
+            with col_carga:
+                with st.form(f"form_versiones_{self.session_key}", clear_on_submit=True):
+                    archivos = st.file_uploader(
+                        "Selecciona uno o más archivos de costos reales o pronóstico",
+                        type=['xlsx', 'xls'],
+                        accept_multiple_files=True,
+                        help="Mismas columnas que el CBS base. La columna opcional 'Avance' (%) habilita el valor ganado."
+                    )
+                    submitted = st.form_submit_button("Agregar versiones")
+
+                    if submitted and archivos:
+                        for archivo in archivos:
+                            df_version = load_and_prepare_data(archivo)
+                            if not df_version.empty:
+                                nombre = archivo.name.rsplit('.', 1)[0]
+                                st.session_state[self.versiones_key][nombre] = df_version
+                        st.rerun()
+
+            with col_lista:
+                theme.render_subheader("Versiones cargadas", align="center")
+                for nombre in st.session_state[self.versiones_key]:
+                    st.text(f"• {nombre}")
+                if st.session_state[self.versiones_key] and st.button("Limpiar versiones", key=f"limpiar_{self.session_key}"):
+                    st.session_state[self.versiones_key] = {}
+                    st.rerun()
+
+    @staticmethod
+    def _opciones_nodo(df_version: pd.DataFrame, id_nodo: str) -> Dict[str, str]:
+        """
+        Nodos a los que se puede navegar desde 'id_nodo': sus ancestros (para volver) y sus
+        hijos directos con desglose. Devuelve {etiqueta: ID}; solo "Total" si el nodo no
+        existe en la versión. Las búsquedas son binarias sobre el índice ordenado por
+        ID_Padre, así que las opciones no crecen con el tamaño del CBS.
+        """
+        opciones = {"Total": ""}
+        if id_nodo:
+            partes = id_nodo.split('.')
+            for i in range(1, len(partes) + 1):
+                ancestro = '.'.join(partes[:i])
+                hermanos = df_version.loc[ancestro.rpartition('.')[0]:ancestro.rpartition('.')[0]]
+                fila = hermanos[hermanos['ID_Jerarquico'] == ancestro]
+                if fila.empty:
+                    return {"Total": ""}
+                opciones[f"{ancestro} - {fila['Descripcion'].iloc[0]}"] = ancestro
+
+        hijos = df_version.loc[id_nodo:id_nodo]
+        ids_hijos = hijos['ID_Jerarquico'].to_numpy()
+        posiciones = np.minimum(df_version.index.searchsorted(ids_hijos), len(df_version) - 1)
+        con_desglose = df_version.index.to_numpy()[posiciones] == ids_hijos
+        opciones.update(dict(zip(
+            hijos['ID_Jerarquico'][con_desglose] + " - " + hijos['Descripcion'][con_desglose].astype(str),
+            hijos['ID_Jerarquico'][con_desglose]
+        )))
+        return opciones
+
+    def _render_kpis(self, fila: pd.Series):
+        """Renderiza las tarjetas KPI del nodo seleccionado."""
+        with st.container(border=True):
+            theme.render_subheader("Indicadores del nodo seleccionado")
+            cols = st.columns(5)
+            with cols[0]:
+                theme.render_metric("Presupuesto", fila['Presupuesto'], formato='$')
+            with cols[1]:
+                theme.render_metric("Costo real / pronóstico", fila['Costo_Real'], formato='$')
+            with cols[2]:
+                theme.render_metric("Variación", fila['Variacion'], formato='$')
+            with cols[3]:
+                theme.render_metric("CPI", f"{fila['CPI']:.2f}" if pd.notna(fila['CPI']) else "N/A")
+            with cols[4]:
+                theme.render_metric("Estimado al término (EAC)", fila['EAC'], formato='$')
+
+    def _render_variance_chart(self, df_hijos: pd.DataFrame):
+        """Renderiza la variación de cada hijo del nodo seleccionado."""
+        colores = np.where(df_hijos['Variacion'] > 0, THEME_COLORS["peligro"], THEME_COLORS["exito"])
+        fig = go.Figure(go.Bar(
+            x=df_hijos['ID_Jerarquico'], y=df_hijos['Variacion'], marker_color=colores,
+            customdata=np.stack([df_hijos['Descripcion'].astype(str), df_hijos['Variacion (%)']], axis=-1),
+            hovertemplate="<b>%{x}</b> %{customdata[0]}<br>Variación: $%{y:,.2f} (%{customdata[1]:.2f}%)<extra></extra>"
+        ))
+        fig.update_layout(template="plotly_white", height=450, xaxis_title="Partida", yaxis_title="Variación [$]")
+        st.plotly_chart(fig, use_container_width=True)
+
+    def _render_trend_chart(self, df_tendencia: pd.DataFrame):
+        """Renderiza la evolución del costo real y del EAC a lo largo de las versiones."""
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=df_tendencia.index.astype(str), y=df_tendencia['Presupuesto'], mode='lines', name='Presupuesto', line=dict(color=theme.get_color("historico"), dash='dash')))
+        fig.add_trace(go.Scatter(x=df_tendencia.index.astype(str), y=df_tendencia['Costo_Real'], mode='lines+markers', name='Costo real / pronóstico', line=dict(color=theme.get_color("primario"))))
+        fig.add_trace(go.Scatter(x=df_tendencia.index.astype(str), y=df_tendencia['EAC'], mode='lines+markers', name='EAC', line=dict(color=theme.get_color("peligro"))))
+        fig.update_layout(template="plotly_white", height=450, xaxis_title="Versión", yaxis_title="Costo [$]", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+        st.plotly_chart(fig, use_container_width=True)
+
+    def render(self):
+        """Renderiza el control presupuestal completo."""
+        self._render_version_loader()
+
+        versiones = st.session_state[self.versiones_key]
+        if not versiones:
+            st.info("Carga al menos una versión de costos reales o pronóstico para comparar contra el presupuesto.")
+            return
+
+        df_control = calcular_control_presupuestal(self.df_base, versiones)
+        if df_control.empty:
+            st.warning("No fue posible alinear las versiones con el presupuesto base.")
+            return
+
+        nombres_versiones = list(versiones.keys())
+        col_version, col_nodo = st.columns(2)
+        with col_version:
+            if len(nombres_versiones) > 1:
+                version = st.select_slider("Versión", options=nombres_versiones, value=nombres_versiones[-1], key=f"version_{self.session_key}")
+            else:
+                version = nombres_versiones[0]
+
+        # Navegación por niveles desde el nodo desglosado (guardado en la sesión por el selectbox);
+        # la etiqueta empieza con su ID ("1.2.3 - Descripción")
+        df_version = df_control.loc[version]
+        etiqueta_actual = st.session_state.get(self.nodo_key, "Total")
+        mapa_nodos = self._opciones_nodo(df_version, "" if etiqueta_actual == "Total" else etiqueta_actual.split(" - ", 1)[0])
+        if etiqueta_actual not in mapa_nodos:
+            # El nodo no existe (o no tiene desglose) en esta versión
+            st.session_state[self.nodo_key] = "Total"
+            mapa_nodos = self._opciones_nodo(df_version, "")
+
+        with col_nodo:
+            seleccion = st.selectbox("Nodo a desglosar", options=list(mapa_nodos.keys()), key=self.nodo_key)
+        id_nodo = mapa_nodos[seleccion]
+
+        df_hijos = df_version.loc[[id_nodo]].reset_index(drop=True)
+
+        # Fila agregada del nodo (para 'Total' se suman los nodos de Nivel 1)
+        columnas_suma = ['Presupuesto', 'Valor_Ganado', 'Costo_Real', 'Variacion', 'EAC']
+        if id_nodo == "":
+            fila = df_hijos[columnas_suma].sum()
+            fila['CPI'] = fila['Valor_Ganado'] / fila['Costo_Real'] if fila['Costo_Real'] else np.nan
+            df_tendencia = df_control.xs("", level='ID_Padre').groupby(level='Version', observed=True)[columnas_suma].sum()
+        else:
+            padre = id_nodo.rpartition('.')[0]
+            df_hermanos = df_version.loc[[padre]]
+            fila = df_hermanos[df_hermanos['ID_Jerarquico'] == id_nodo].iloc[0]
+            df_tendencia = df_control.xs(padre, level='ID_Padre')
+            df_tendencia = df_tendencia[df_tendencia['ID_Jerarquico'] == id_nodo]
+
+        self._render_kpis(fila)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            with st.container(border=True):
+                theme.render_header("Variación por partida")
+                self._render_variance_chart(df_hijos)
+        with col2:
+            with st.container(border=True):
+                theme.render_header("Evolución entre versiones")
+                self._render_trend_chart(df_tendencia)
+
+        with st.expander("Ver tabla de control presupuestal"):
+            columnas = ['ID_Jerarquico', 'Descripcion', 'Presupuesto', 'Valor_Ganado', 'Costo_Real', 'Variacion', 'Variacion (%)', 'CPI', 'EAC', 'VAC']
+            st.dataframe(
+                df_hijos[columnas].style.format({c: "{:,.2f}" for c in columnas[2:]}),
+                use_container_width=True, hide_index=True
+            )
+
+
+
+class CbsVersionHistory:
+    """
+    Gestiona el historial de versiones de un CBS en el almacén direccionado por contenido:
+    registra cada carga, y permite listar, restaurar y comparar versiones.
+    """
+    def __init__(self, session_key: str):
+        self.session_key = session_key
+        self.segmento, self.pestana = separar_clave_sesion(session_key)
+        self.almacen = obtener_almacen()
+
+    @staticmethod
+    def registrar_carga(session_key: str, df: pd.DataFrame) -> str:
+        """Guarda el CBS recién cargado como nueva versión y lo asigna a la sesión."""
+        segmento, pestana = separar_clave_sesion(session_key)
+        version_id = obtener_almacen().guardar(df, segmento, pestana)
+        st.session_state[session_key] = df
+        return version_id
+
+    def render(self):
+        """Renderiza el panel con la lista de versiones, la restauración y la comparación."""
+        df_versiones = self.almacen.listar(self.segmento, self.pestana)
+
+        with st.expander("**Historial de versiones**", expanded=False):
+            if df_versiones.empty:
+                st.info("Aún no hay versiones guardadas para esta pestaña.")
+                return
+
+            etiquetas = dict(zip(
+                df_versiones['creado'].str.replace('T', ' ') + " · " + df_versiones['version'],
+                df_versiones['version']
+            ))
+            opciones = list(etiquetas.keys())
+
+            st.dataframe(
+                df_versiones[['creado', 'version', 'filas', 'costo_hojas', 'fragmentos_nuevos', 'num_fragmentos']]
+                .style.format({'costo_hojas': "${:,.2f}"}),
+                use_container_width=True, hide_index=True
+            )
+
+            col_restaurar, col_comparar = st.columns([1, 2])
+            with col_restaurar:
+                theme.render_subheader("Restaurar", align="center")
+                seleccion = st.selectbox("Versión", options=opciones, key=f"restaurar_{self.session_key}")
+                if st.button("Cargar versión", key=f"boton_restaurar_{self.session_key}"):
+                    st.session_state[self.session_key] = self.almacen.cargar(etiquetas[seleccion], self.segmento, self.pestana)
+                    st.rerun()
+
+            with col_comparar:
+                theme.render_subheader("Comparar", align="center")
+                if len(opciones) < 2:
+                    st.info("Se necesitan al menos dos versiones para comparar.")
+                    return
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    version_a = st.selectbox("Versión anterior", options=opciones, index=1, key=f"diff_a_{self.session_key}")
+                with col_b:
+                    version_b = st.selectbox("Versión nueva", options=opciones, index=0, key=f"diff_b_{self.session_key}")
+
+                # La comparación lee fragmentos del disco: solo se calcula al pedirla, y se sigue
+                # mostrando mientras no cambie el par seleccionado
+                clave_comparacion = f"comparacion_{self.session_key}"
+                par = (etiquetas[version_a], etiquetas[version_b])
+                if st.button("Comparar", key=f"boton_comparar_{self.session_key}"):
+                    st.session_state[clave_comparacion] = par
+                if st.session_state.get(clave_comparacion) != par:
+                    return
+
+                df_diff = self.almacen.diferencias(*par, self.segmento, self.pestana)
+                if df_diff.empty:
+                    st.success("Las versiones son idénticas.")
+                else:
+                    st.dataframe(
+                        df_diff.style.format({c: "{:,.2f}" for c in ['Costo_A', 'Costo_B', 'Diferencia']}, na_rep="-"),
+                        use_container_width=True, hide_index=True
+                    )
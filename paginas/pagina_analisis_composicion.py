@@ -3,6 +3,7 @@ from modulos.logica_cbs import get_processed_data
 from theme import theme
 from paginas import components
 from paginas.components_cbs import CbsVisualizer 
+from modulos.cache_figuras import huella_cbs_sesion
 
 
 def render_tab_CAPEX(segment_key: str) -> None:
@@ -19,7 +20,7 @@ def render_tab_CAPEX(segment_key: str) -> None:
     
     df_procesado = get_processed_data(st.session_state[SESSION_KEY])
 
-    visualizer = CbsVisualizer(df_procesado, key_prefix=f'{segment_key}_capex')
+    visualizer = CbsVisualizer(df_procesado, key_prefix=f'{segment_key}_capex', huella=huella_cbs_sesion(SESSION_KEY))
 
     visualizer.render_interactive_dashboard()
 
@@ -38,7 +39,7 @@ def render_tab_OPEX(segment_key: str) -> None:
     
     df_procesado = get_processed_data(st.session_state[SESSION_KEY])
 
-    visualizer = CbsVisualizer(df_procesado, key_prefix=f'{segment_key}_opex')
+    visualizer = CbsVisualizer(df_procesado, key_prefix=f'{segment_key}_opex', huella=huella_cbs_sesion(SESSION_KEY))
 
     visualizer.render_interactive_dashboard()
 
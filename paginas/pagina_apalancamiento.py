@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from modulos.Montecarlo import ejecutar_simulacion_beta_mejorada, ejecutar_simulacion_reversion_media_compatible
+from modulos.Montecarlo import ejecutar_simulacion_beta_mejorada, ejecutar_simulacion_reversion_media_compatible, estimar_memoria_mb
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -93,32 +94,32 @@ def render_tab_proyeccion():
             # 3. Usar los datos de la tabla editada para la simulación
             df_historico_final = df_historico_editado.set_index('Año')
             
-            with st.spinner("Ejecutando simulación..."):
-
-                params_convergencia = {'velocidad_base': 0.08, 'velocidad_positiva': 0.06, 'velocidad_negativa': 0.10, 
-                                       'meta_base': meta_base, 'meta_positiva': meta_pos, 'meta_negativa': meta_neg}
+            params_convergencia = {'velocidad_base': 0.08, 'velocidad_positiva': 0.06, 'velocidad_negativa': 0.10, 
+                                   'meta_base': meta_base, 'meta_positiva': meta_pos, 'meta_negativa': meta_neg}
                 
-                config_avanzada = {
-                    'peso_sectorial': 0.7,
-                    'sensibilidad_distancia': 0.3,
-                    'volatilidad_mercado': 0.30,
-                    'incluir_ciclo_economico': True,
-                    'usar_bayesiano': True
-                }
-
-                resultados = ejecutar_simulacion_reversion_media_compatible(
-                    df_historico=df_historico_final,
-                    col_name='Apalancamiento',
-                    anos_proyeccion=anos_proyeccion_apalancamiento,
-                    num_simulaciones=num_sims_apalancamiento,
-                    params_convergencia=params_convergencia,
-                    #beta_sectorial=None,  # Beta sectorial de Damodaran
-                    #configuracion_avanzada=config_avanzada
-                )
+            config_avanzada = {
+                'peso_sectorial': 0.7,
+                'sensibilidad_distancia': 0.3,
+                'volatilidad_mercado': 0.30,
+                'incluir_ciclo_economico': True,
+                'usar_bayesiano': True
+            }
 
-                st.session_state['resultados_apalancamiento'] = resultados
-                st.rerun()
+            # Se ejecuta en segundo plano; el resultado llega a 'resultados_apalancamiento' al terminar
+            iniciar_trabajo(
+                'resultados_apalancamiento', "Simulación de apalancamiento", ejecutar_simulacion_reversion_media_compatible,
+                costo_mb=estimar_memoria_mb(num_sims_apalancamiento, anos_proyeccion_apalancamiento),
+                parametro_degradable='num_simulaciones',
+                df_historico=df_historico_final,
+                col_name='Apalancamiento',
+                anos_proyeccion=anos_proyeccion_apalancamiento,
+                num_simulaciones=num_sims_apalancamiento,
+                params_convergencia=params_convergencia,
+                #beta_sectorial=None,  # Beta sectorial de Damodaran
+                #configuracion_avanzada=config_avanzada
+            )
 
+        components.display_job_progress('resultados_apalancamiento')
 
         if 'resultados_apalancamiento' in st.session_state and st.session_state['resultados_apalancamiento'] is not None:
             resultados = st.session_state['resultados_apalancamiento']
@@ -201,7 +202,7 @@ def render_tab_diagnosticos():
 
         components.display_distribution_histogram(
             title="Distribución de valores",
-            data=resultados['valores_finales'],
+            data=resultados['histograma_valores_finales'],
             anos_proyeccion=resultados["anos_proyectados"],
             x_axis_title="Valor de D/(D+E) [%]",
             y_axis_title="Frecuencia [Nº de simulaciones]",
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from modulos.Montecarlo import ejecutar_simulacion_beta_mejorada
+from modulos.Montecarlo import ejecutar_simulacion_beta_mejorada, estimar_memoria_mb
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -92,40 +93,40 @@ def render_tab_proyeccion():
             # 3. Usar los datos de la tabla editada para la simulación
             df_historico_final = df_historico_editado.set_index('Año')
             
-            with st.spinner("Ejecutando simulación..."):
-
-                params_convergencia = {'velocidad_base': 0.08, 'velocidad_positivo': 0.06, 'velocidad_negativo': 0.10, 
-                                        'meta_base': meta_base, 'meta_positivo': meta_pos, 'meta_negativo': meta_neg
-                                        }
+            params_convergencia = {'velocidad_base': 0.08, 'velocidad_positivo': 0.06, 'velocidad_negativo': 0.10, 
+                                    'meta_base': meta_base, 'meta_positivo': meta_pos, 'meta_negativo': meta_neg
+                                    }
                 
-                config_avanzada = {
-                    'peso_sectorial': 0.3,  # Peso de beta sectorial vs reversión a 1.0
-                    'sensibilidad_distancia': 0.3,  # Factor de velocidad por distancia
-                    'aceleracion_temporal': 0.1,  # Factor de aceleración temporal
-                    'volatilidad_mercado': 0.25,  # Volatilidad actual del mercado
-                    'threshold_volatilidad': 0.25,  # Umbral para régimen de crisis
-                    'factor_crisis': 1.5,  # Factor de velocidad en crisis
-                    'confianza_sectorial': 0.3,  # Peso del prior sectorial en Bayesiano
-                    'confianza_modelo': 0.7,  # Peso del modelo en Bayesiano
-                    'incluir_ciclo_economico': True,  # Incluir efectos cíclicos
-                    'periodo_ciclo_anos': 6,  # Duración del ciclo económico
-                    'amplitud_ciclo': 0.5,  # Amplitud del ciclo (±15%)
-                    'usar_bayesiano': True  # Aplicar ajuste Bayesiano
-                }
-
-                resultados = ejecutar_simulacion_beta_mejorada(
-                    df_historico=df_historico_editado.set_index('Año'),
-                    col_name='Beta',
-                    anos_proyeccion=anos_proyeccion_beta,
-                    num_simulaciones=num_sims_beta,
-                    params_convergencia=params_convergencia,
-                    beta_sectorial=None,  
-                    configuracion_avanzada=config_avanzada
-                )
+            config_avanzada = {
+                'peso_sectorial': 0.3,  # Peso de beta sectorial vs reversión a 1.0
+                'sensibilidad_distancia': 0.3,  # Factor de velocidad por distancia
+                'aceleracion_temporal': 0.1,  # Factor de aceleración temporal
+                'volatilidad_mercado': 0.25,  # Volatilidad actual del mercado
+                'threshold_volatilidad': 0.25,  # Umbral para régimen de crisis
+                'factor_crisis': 1.5,  # Factor de velocidad en crisis
+                'confianza_sectorial': 0.3,  # Peso del prior sectorial en Bayesiano
+                'confianza_modelo': 0.7,  # Peso del modelo en Bayesiano
+                'incluir_ciclo_economico': True,  # Incluir efectos cíclicos
+                'periodo_ciclo_anos': 6,  # Duración del ciclo económico
+                'amplitud_ciclo': 0.5,  # Amplitud del ciclo (±15%)
+                'usar_bayesiano': True  # Aplicar ajuste Bayesiano
+            }
 
-                st.session_state['resultados_beta'] = resultados
-                st.rerun()
+            # Se ejecuta en segundo plano; el resultado llega a 'resultados_beta' al terminar
+            iniciar_trabajo(
+                'resultados_beta', "Simulación de beta", ejecutar_simulacion_beta_mejorada,
+                costo_mb=estimar_memoria_mb(num_sims_beta, anos_proyeccion_beta),
+                parametro_degradable='num_simulaciones',
+                df_historico=df_historico_editado.set_index('Año'),
+                col_name='Beta',
+                anos_proyeccion=anos_proyeccion_beta,
+                num_simulaciones=num_sims_beta,
+                params_convergencia=params_convergencia,
+                beta_sectorial=None,  
+                configuracion_avanzada=config_avanzada
+            )
 
+        components.display_job_progress('resultados_beta')
 
         if 'resultados_beta' in st.session_state and st.session_state['resultados_beta'] is not None:
             resultados = st.session_state['resultados_beta']
@@ -207,7 +208,7 @@ def render_tab_diagnosticos():
 
         components.display_distribution_histogram(
             title="Distribución de valores",
-            data=resultados['valores_finales'],
+            data=resultados['histograma_valores_finales'],
             anos_proyeccion=resultados["anos_proyectados"],
             x_axis_title="Valor de beta desapalancada [1]",
             y_axis_title="Frecuencia [Nº de simulaciones]",
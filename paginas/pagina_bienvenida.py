@@ -1,5 +1,6 @@
 import streamlit as st
-import dill
+from modulos.sesiones import (ExportadorSesion, LectorSesion, ErrorSesion, SesionDiferida, CLAVES_SESION,
+                              CLAVE_SESION_DIFERIDA, restaurar_pendientes)
 from theme import theme
 
 
@@ -55,14 +56,17 @@ def render():
                     for key in claves_a_borrar:
                         del st.session_state[key]
                     
-                    # Cargar y restaurar
-                    datos_sesion_cargada = dill.load(archivo_cargado)
-                    st.session_state.update(datos_sesion_cargada)
+                    # Cargar (formato columnar: no ejecuta código al leer). Solo se valida el
+                    # manifiesto; cada análisis se decodifica al abrir su página
+                    lector = LectorSesion(archivo_cargado.getvalue())
+                    st.session_state[CLAVE_SESION_DIFERIDA] = SesionDiferida(lector)
                     
                     # Guardar mensaje de éxito y refrescar
                     st.session_state['mensaje_global'] = "✅ ¡Sesión cargada exitosamente!"
                     st.rerun()
 
+                except ErrorSesion as e:
+                    st.error(str(e))
                 except Exception as e:
                     st.error(f"Error al cargar el archivo: {e}")
 
@@ -75,22 +79,58 @@ def render():
             if not nombre_archivo_sesion.endswith('.session'):
                 nombre_archivo_sesion += '.session'
                 
-            sesion_para_guardar = {
-                'resultados_mex': st.session_state.get('resultados_mex'),
-                'resultados_usa': st.session_state.get('resultados_usa'),
-                'resultados_sp': st.session_state.get('resultados_sp'),
-                'resultados_embi': st.session_state.get('resultados_embi'),
-                'resultados_beta': st.session_state.get('resultados_beta'),
-                'resultados_apalancamiento': st.session_state.get('resultados_apalancamiento'),
-                'resultados_bonos': st.session_state.get('resultados_bonos'), 
-            }
-            datos_binarios = dill.dumps(sesion_para_guardar)
-            
-            st.download_button(
-                label="Guardar sesión",
-                data=datos_binarios,
-                file_name=nombre_archivo_sesion,
-                mime="application/octet-stream",
-                use_container_width=True
-
-            )
+            _render_guardar_sesion(nombre_archivo_sesion)
+
+
+@st.fragment(run_every=1)
+def _esperar_exportacion():
+    """Revisa cada segundo la exportación en segundo plano y refresca la página al terminar."""
+    exportador = st.session_state['exportador_sesion']
+    sesion_para_guardar = {clave: st.session_state.get(clave) for clave in CLAVES_SESION}
+    if exportador.estado(sesion_para_guardar) != "en_proceso":
+        st.rerun()
+    st.caption("Preparando el archivo de sesión...")
+
+
+def _render_guardar_sesion(nombre_archivo_sesion):
+    """
+    Botones de guardado. El archivo se genera solo cuando se pide y se reutiliza mientras
+    los resultados no cambien, así que esta página no serializa nada en cada rerun.
+    """
+    if 'exportador_sesion' not in st.session_state:
+        st.session_state['exportador_sesion'] = ExportadorSesion()
+    exportador = st.session_state['exportador_sesion']
+
+    sesion_para_guardar = {clave: st.session_state.get(clave) for clave in CLAVES_SESION}
+    try:
+        estado = exportador.estado(sesion_para_guardar)
+    except Exception as e:
+        st.error(f"No se pudo revisar la sesión actual: {e}")
+        return
+    # Análisis de una sesión cargada que ninguna página ha abierto: se restauran al preparar
+    pendientes = CLAVE_SESION_DIFERIDA in st.session_state
+
+    if estado == "vacio" and not pendientes:
+        st.caption("Aún no hay análisis para guardar.")
+    elif estado == "listo" and not pendientes:
+        st.download_button(
+            label="Guardar sesión",
+            data=exportador.datos,
+            file_name=nombre_archivo_sesion,
+            mime="application/octet-stream",
+            use_container_width=True
+        )
+    elif estado == "en_proceso":
+        _esperar_exportacion()
+    else:
+        if estado == "error":
+            st.error(f"No se pudo preparar la sesión: {exportador.error}")
+        if st.button("Preparar sesión", use_container_width=True):
+            try:
+                if restaurar_pendientes(st.session_state, CLAVES_SESION):
+                    sesion_para_guardar = {clave: st.session_state.get(clave) for clave in CLAVES_SESION}
+                exportador.preparar(sesion_para_guardar)
+            except Exception as e:
+                st.error(f"No se pudo preparar la sesión: {e}")
+                return
+            st.rerun()
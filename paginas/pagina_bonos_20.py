@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from modulos.modelos_econometricos import generar_proyeccion_econometrica
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -74,45 +75,43 @@ def render_tab_proyeccion():
             if not fred_api_key:
                 st.warning("Por favor, ingresa un Token de FRED válido.")
             else:
-                with st.spinner("Ejecutando modelo econométrico..."):
-                    
-                    config_procesamiento_bonos = {
-                        "bonos_20": {"type": "level", "source_col": "bonos_20"},
-                        "cpi_index": {"type": "yoy_pct_change_calculated", "source_col": "cpi_index"},
-                        "pol_monetaria": {"type": "level", "source_col": "pol_monetaria"},
-                        "term_spread": {"type": "spread", "source_cols": ["bonos_10", "bonos_3"]}
-                    }
-
-                    variables_modelo_bonos = ['bonos_20', 'cpi_index', 'pol_monetaria', 'term_spread']
-
-                    variable_objetivo_bonos = 'bonos_20'
-
-                    params_escenarios = {
-                        'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
-                        'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
-                    }
-                    series_ids = {
-                        "bonos_20": "GS20", 
-                        "cpi_index": "CPIAUCSL", 
-                        "pol_monetaria": "EFFR", 
-                        "bonos_10": "GS10", 
-                        "bonos_3": "DTB3"
-                    }
+                config_procesamiento_bonos = {
+                    "bonos_20": {"type": "level", "source_col": "bonos_20"},
+                    "cpi_index": {"type": "yoy_pct_change_calculated", "source_col": "cpi_index"},
+                    "pol_monetaria": {"type": "level", "source_col": "pol_monetaria"},
+                    "term_spread": {"type": "spread", "source_cols": ["bonos_10", "bonos_3"]}
+                }
+
+                variables_modelo_bonos = ['bonos_20', 'cpi_index', 'pol_monetaria', 'term_spread']
+
+                variable_objetivo_bonos = 'bonos_20'
+
+                params_escenarios = {
+                    'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
+                    'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
+                }
+                series_ids = {
+                    "bonos_20": "GS20", 
+                    "cpi_index": "CPIAUCSL", 
+                    "pol_monetaria": "EFFR", 
+                    "bonos_10": "GS10", 
+                    "bonos_3": "DTB3"
+                }
                         
-                    # Llamamos a la función del módulo
-                    resultados_bonos = generar_proyeccion_econometrica(
-                        api_key={"fred": fred_api_key},
-                        series_ids=series_ids,
-                        processing_config=config_procesamiento_bonos,
-                        start_date=fecha_descarga.strftime("%Y-%m-%d"),
-                        anos_proyeccion=anos_proyeccion_bonos,
-                        variables_modelo=variables_modelo_bonos,
-                        variable_objetivo=variable_objetivo_bonos,
-                        params_escenarios=params_escenarios,
-                    )
-
-                    st.session_state['resultados_bonos'] = resultados_bonos
-                    st.rerun()
+                # Llamamos a la función del módulo en segundo plano; el resultado llega a 'resultados_bonos' al terminar
+                iniciar_trabajo(
+                    'resultados_bonos', "Modelo econométrico (bonos)", generar_proyeccion_econometrica,
+                    api_key={"fred": fred_api_key},
+                    series_ids=series_ids,
+                    processing_config=config_procesamiento_bonos,
+                    start_date=fecha_descarga.strftime("%Y-%m-%d"),
+                    anos_proyeccion=anos_proyeccion_bonos,
+                    variables_modelo=variables_modelo_bonos,
+                    variable_objetivo=variable_objetivo_bonos,
+                    params_escenarios=params_escenarios,
+                )
+
+        components.display_job_progress('resultados_bonos')
 
         if 'resultados_bonos' in  st.session_state and  st.session_state['resultados_bonos'] is not None:
             resultados_bonos = st.session_state['resultados_bonos'] # Guarda los resultados obtenidos en la pestaña proyeccion para visualizar diagnostico
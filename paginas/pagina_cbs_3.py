@@ -4,7 +4,7 @@ from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
 from typing import Callable, Dict, Any, Optional, Tuple, List
 import logging
 from pathlib import Path
-from modulos.logica_cbs import load_and_prepare_data, get_processed_data, debug_cost_aggregation
+from modulos.logica_cbs import load_and_prepare_data, get_processed_data
 from theme import theme
 from paginas import components
 from paginas import components_cbs
@@ -12,7 +12,7 @@ import plotly.express as px
 import io
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from paginas.components_cbs import CbsDataManager
+from paginas.components_cbs import CbsDataManager, CbsVersionHistory, debug_cost_aggregation
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -239,7 +239,7 @@ def render_tab_CAPEX(segment_key: str) -> None:
                 new_df = CbsDataManager.render_file_uploader(load_and_prepare_data)
                 submitted = st.form_submit_button("Subir archivo")
                 if submitted and new_df is not None:
-                    st.session_state[SESSION_KEY] = new_df
+                    CbsVersionHistory.registrar_carga(SESSION_KEY, new_df)
                     st.success("Archivo cargado. Actualizando vista...")
                     st.rerun()
         return 
@@ -277,7 +277,7 @@ def render_tab_OPEX(segment_key: str) -> None:
                 new_df = CbsDataManager.render_file_uploader(load_and_prepare_data)
                 submitted = st.form_submit_button("Subir archivo")
                 if submitted and new_df is not None:
-                    st.session_state[SESSION_KEY] = new_df
+                    CbsVersionHistory.registrar_carga(SESSION_KEY, new_df)
                     st.success("Archivo cargado. Actualizando vista...")
                     st.rerun()
         return 
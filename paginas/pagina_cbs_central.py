@@ -3,7 +3,7 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 from theme import theme
-from paginas import pagina_cbs_3, pagina_analisis_composicion
+from paginas import pagina_cbs_3, pagina_analisis_composicion, pagina_control_presupuestal, pagina_sensibilidad_cbs
 
 def render_cbs_segment(segment_key: str):
     """
@@ -32,6 +32,14 @@ def render_cbs_segment(segment_key: str):
     elif analisis_seleccionado == "Análisis de composición":
         # Le pasamos el identificador único a la página de los gráficos
         pagina_analisis_composicion.render(segment_key=segment_key)
+
+    elif analisis_seleccionado == "Control presupuestal":
+        # Le pasamos el identificador único a la página de control presupuestal
+        pagina_control_presupuestal.render(segment_key=segment_key)
+
+    elif analisis_seleccionado == "Análisis de sensibilidad":
+        # Le pasamos el identificador único a la página de sensibilidad
+        pagina_sensibilidad_cbs.render(segment_key=segment_key)
         
     # Aquí podrías añadir los elif para las otras opciones del menú
     # elif analisis_seleccionado == "Metodología":
@@ -0,0 +1,60 @@
+import streamlit as st
+from theme import theme
+from paginas import components
+from paginas.components_cbs import CbsBudgetControl
+
+
+def render_tab_CAPEX(segment_key: str) -> None:
+    """
+    Renderiza el control presupuestal del CAPEX del segmento frente a sus versiones reales o pronosticadas.
+    """
+
+    SESSION_KEY = f'df_{segment_key}_capex'
+
+    if SESSION_KEY not in st.session_state or st.session_state[SESSION_KEY] is None:
+        st.warning(f"⚠️ Primero debes cargar datos en la pestaña 'Estructura de costos'.")
+        return
+
+    df_base = st.session_state[SESSION_KEY]
+
+    budget_control = CbsBudgetControl(df_base, session_key=SESSION_KEY)
+
+    budget_control.render()
+
+
+def render_tab_OPEX(segment_key: str) -> None:
+    """
+    Renderiza el control presupuestal del OPEX del segmento frente a sus versiones reales o pronosticadas.
+    """
+
+    SESSION_KEY = f'df_{segment_key}_opex'
+
+    if SESSION_KEY not in st.session_state or st.session_state[SESSION_KEY] is None:
+        st.warning(f"⚠️ Primero debes cargar datos en la pestaña 'Estructura de costos'.")
+        return
+
+    df_base = st.session_state[SESSION_KEY]
+
+    budget_control = CbsBudgetControl(df_base, session_key=SESSION_KEY)
+
+    budget_control.render()
+
+
+def render(segment_key: str) -> None:
+
+    tabs_config = {
+
+        "CapEx": {
+            "icon": "bi-gear-wide-connected",
+            "render_func": lambda: render_tab_CAPEX(segment_key)
+        },
+        "OpEx": {
+            "icon": " bi-wrench-adjustable-circle",
+            "render_func": lambda: render_tab_OPEX(segment_key)
+        },
+    }
+
+    components.render_analysis_page(
+        page_title=f"Control presupuestal",
+        tabs_config=tabs_config
+    )
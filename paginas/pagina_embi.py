@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from modulos.modelos_econometricos import generar_proyeccion_econometrica
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -94,44 +95,42 @@ def render_tab_proyeccion():
             if not fred_api_key:
                 st.warning("Por favor, ingresa un Token de FRED válido.")
             else:
-                with st.spinner("Ejecutando modelo econométrico..."):
-                    
-                    config_procesamiento_embi = {
-                        "embi": {"type": "level", "source_col": "embi"},
-                        "aversion_global": {"type": "level", "source_col": "aversion_global"},
-                        "bonos_10": {"type": "level", "source_col": "bonos_10"},
-                        "fortaleza_dolar": {"type": "level", "source_col": "fortaleza_dolar"}
-                    }
-
-                    variables_modelo_embi = ['embi', 'aversion_global', 'bonos_10', 'fortaleza_dolar']
-
-                    variable_objetivo_embi = 'embi'
-
-                    params_escenarios = {
-                        'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
-                        'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
-                    }
-                    series_ids = {
-                        "embi": "BAMLEM2BRRBBBCRPIEY", 
-                        "aversion_global": "VIXCLS", 
-                        "bonos_10": "GS10", 
-                        "fortaleza_dolar": "DTWEXBGS"
-                    }
+                config_procesamiento_embi = {
+                    "embi": {"type": "level", "source_col": "embi"},
+                    "aversion_global": {"type": "level", "source_col": "aversion_global"},
+                    "bonos_10": {"type": "level", "source_col": "bonos_10"},
+                    "fortaleza_dolar": {"type": "level", "source_col": "fortaleza_dolar"}
+                }
+
+                variables_modelo_embi = ['embi', 'aversion_global', 'bonos_10', 'fortaleza_dolar']
+
+                variable_objetivo_embi = 'embi'
+
+                params_escenarios = {
+                    'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
+                    'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
+                }
+                series_ids = {
+                    "embi": "BAMLEM2BRRBBBCRPIEY", 
+                    "aversion_global": "VIXCLS", 
+                    "bonos_10": "GS10", 
+                    "fortaleza_dolar": "DTWEXBGS"
+                }
                         
-                    # Llamamos a la función del módulo
-                    resultados_embi = generar_proyeccion_econometrica(
-                        api_key={"fred": fred_api_key},
-                        series_ids=series_ids,
-                        processing_config=config_procesamiento_embi,
-                        start_date=fecha_descarga.strftime("%Y-%m-%d"),
-                        anos_proyeccion=anos_proyeccion_embi,
-                        variables_modelo=variables_modelo_embi,
-                        variable_objetivo=variable_objetivo_embi,
-                        params_escenarios=params_escenarios,
-                    )
-
-                    st.session_state['resultados_embi'] = resultados_embi
-                    st.rerun()
+                # Llamamos a la función del módulo en segundo plano; el resultado llega a 'resultados_embi' al terminar
+                iniciar_trabajo(
+                    'resultados_embi', "Modelo econométrico (EMBI)", generar_proyeccion_econometrica,
+                    api_key={"fred": fred_api_key},
+                    series_ids=series_ids,
+                    processing_config=config_procesamiento_embi,
+                    start_date=fecha_descarga.strftime("%Y-%m-%d"),
+                    anos_proyeccion=anos_proyeccion_embi,
+                    variables_modelo=variables_modelo_embi,
+                    variable_objetivo=variable_objetivo_embi,
+                    params_escenarios=params_escenarios,
+                )
+
+        components.display_job_progress('resultados_embi')
 
         if 'resultados_embi' in  st.session_state and  st.session_state['resultados_embi'] is not None:
             resultados_embi = st.session_state['resultados_embi'] # Guarda los resultados obtenidos en la pestaña proyeccion para visualizar diagnostico
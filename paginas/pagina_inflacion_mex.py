@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from modulos.modelos_econometricos import generar_proyeccion_econometrica
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -83,42 +84,41 @@ def render_tab_proyeccion():
             if not token_banxico:
                 st.warning("Por favor, ingresa un Token de Banxico válido.")
             else:
-                with st.spinner("Ejecutando modelo econométrico..."):
-
-                    config_procesamiento_mex = {
-                        "inflacion": {"type": "level", "source_col": "cpi_banxico"},
-                        "tasa_interes": {"type": "level", "source_col": "tiie_28"},
-                        "tipo_cambio": {"type": "log", "source_col": "usd_mxn_fix"}
-                    }
+                config_procesamiento_mex = {
+                    "inflacion": {"type": "level", "source_col": "cpi_banxico"},
+                    "tasa_interes": {"type": "level", "source_col": "tiie_28"},
+                    "tipo_cambio": {"type": "log", "source_col": "usd_mxn_fix"}
+                }
 
-                    variables_modelo_mex = ['tasa_interes', 'tipo_cambio']
+                variables_modelo_mex = ['tasa_interes', 'tipo_cambio']
 
 
-                    variable_objetivo_mex = 'inflacion'
+                variable_objetivo_mex = 'inflacion'
 
-                    params_escenarios = {
-                        'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
-                        'theta_central': 0.030, 'theta_baja': 0.015, 'theta_alta': 0.050
-                    }
-                    series_ids = {
-                        "cpi_banxico": "SP30578", 
-                        "tiie_28": "SF43783", 
-                        "usd_mxn_fix": "SF43718"
-                    }
+                params_escenarios = {
+                    'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
+                    'theta_central': 0.030, 'theta_baja': 0.015, 'theta_alta': 0.050
+                }
+                series_ids = {
+                    "cpi_banxico": "SP30578", 
+                    "tiie_28": "SF43783", 
+                    "usd_mxn_fix": "SF43718"
+                }
                     
-                    resultados_mex = generar_proyeccion_econometrica(
-                        api_key={"banxico": token_banxico},
-                        series_ids=series_ids,
-                        processing_config=config_procesamiento_mex,
-                        start_date=start_date_mex.strftime("%Y-%m-%d"),
-                        anos_proyeccion=anos_proyeccion_mex,
-                        variables_modelo=variables_modelo_mex,
-                        variable_objetivo=variable_objetivo_mex,
-                        params_escenarios=params_escenarios,
-                    )
-
-                    st.session_state['resultados_mex'] = resultados_mex
-                    st.rerun()
+                # Se ejecuta en segundo plano; el resultado llega a 'resultados_mex' al terminar
+                iniciar_trabajo(
+                    'resultados_mex', "Modelo econométrico (México)", generar_proyeccion_econometrica,
+                    api_key={"banxico": token_banxico},
+                    series_ids=series_ids,
+                    processing_config=config_procesamiento_mex,
+                    start_date=start_date_mex.strftime("%Y-%m-%d"),
+                    anos_proyeccion=anos_proyeccion_mex,
+                    variables_modelo=variables_modelo_mex,
+                    variable_objetivo=variable_objetivo_mex,
+                    params_escenarios=params_escenarios,
+                )
+
+        components.display_job_progress('resultados_mex')
 
         if 'resultados_mex' in st.session_state and st.session_state['resultados_mex'] is not None:
             resultados_mex = st.session_state['resultados_mex']
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from modulos.modelos_econometricos import generar_proyeccion_econometrica
+from modulos.trabajos import iniciar_trabajo
 from theme import theme
 from paginas import components
 
@@ -88,42 +89,40 @@ def render_tab_proyeccion():
             if not fred_api_key:
                 st.warning("Por favor, ingresa un Token de FRED válido.")
             else:
-                with st.spinner("Ejecutando modelo econométrico..."):
-                    
-                    config_procesamiento_usa = {
-                        "inflacion": {"type": "yoy_pct_change_calculated", "source_col": "cpi_fred"},
-                        "tasa_interes": {"type": "level", "source_col": "tiie_28"},
-                        "tipo_cambio": {"type": "log", "source_col": "usd_mxn_fix"}
-                    }
-
-                    variables_modelo_usa = ['tasa_interes', 'tipo_cambio']
-
-                    variable_objetivo_usa = 'inflacion'
-
-                    params_escenarios = {
-                        'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
-                        'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
-                    }
-                    series_ids = {
-                        "cpi_fred": "CPIAUCSL", 
-                        "tiie_28": "EFFR", 
-                        "usd_mxn_fix": "DTWEXAFEGS"
-                    }
+                config_procesamiento_usa = {
+                    "inflacion": {"type": "yoy_pct_change_calculated", "source_col": "cpi_fred"},
+                    "tasa_interes": {"type": "level", "source_col": "tiie_28"},
+                    "tipo_cambio": {"type": "log", "source_col": "usd_mxn_fix"}
+                }
+
+                variables_modelo_usa = ['tasa_interes', 'tipo_cambio']
+
+                variable_objetivo_usa = 'inflacion'
+
+                params_escenarios = {
+                    'anos_modelo': 5, 'meta_central': meta_central, 'meta_baja': meta_baja, 'meta_alta': meta_alta,
+                    'theta_central': 0.030, 'theta_baja': 0.050, 'theta_alta': 0.015
+                }
+                series_ids = {
+                    "cpi_fred": "CPIAUCSL", 
+                    "tiie_28": "EFFR", 
+                    "usd_mxn_fix": "DTWEXAFEGS"
+                }
                         
-                    # Llamamos a la función del módulo
-                    resultados_usa = generar_proyeccion_econometrica(
-                        api_key={"fred": fred_api_key},
-                        series_ids=series_ids,
-                        processing_config=config_procesamiento_usa,
-                        start_date=fecha_descarga.strftime("%Y-%m-%d"),
-                        anos_proyeccion=anos_proyeccion_usa,
-                        variables_modelo=variables_modelo_usa,
-                        variable_objetivo=variable_objetivo_usa,
-                        params_escenarios=params_escenarios,
-                    )
-
-                    st.session_state['resultados_usa'] = resultados_usa
-                    st.rerun()
+                # Llamamos a la función del módulo en segundo plano; el resultado llega a 'resultados_usa' al terminar
+                iniciar_trabajo(
+                    'resultados_usa', "Modelo econométrico (EE. UU.)", generar_proyeccion_econometrica,
+                    api_key={"fred": fred_api_key},
+                    series_ids=series_ids,
+                    processing_config=config_procesamiento_usa,
+                    start_date=fecha_descarga.strftime("%Y-%m-%d"),
+                    anos_proyeccion=anos_proyeccion_usa,
+                    variables_modelo=variables_modelo_usa,
+                    variable_objetivo=variable_objetivo_usa,
+                    params_escenarios=params_escenarios,
+                )
+
+        components.display_job_progress('resultados_usa')
 
         if 'resultados_usa' in  st.session_state and  st.session_state['resultados_usa'] is not None:
             resultados_usa = st.session_state['resultados_usa'] # Guarda los resultados obtenidos en la pestaña proyeccion para visualizar diagnostico
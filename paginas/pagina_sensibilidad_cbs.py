@@ -0,0 +1,61 @@
+import streamlit as st
+from modulos.logica_cbs import get_processed_data
+from theme import theme
+from paginas import components
+from paginas.components_cbs import CbsSensitivityAnalyzer
+
+
+def render_tab_CAPEX(segment_key: str) -> None:
+    """
+    Renderiza el análisis de sensibilidad del CAPEX del segmento.
+    """
+
+    SESSION_KEY = f'df_{segment_key}_capex'
+
+    if SESSION_KEY not in st.session_state or st.session_state[SESSION_KEY] is None:
+        st.warning(f"⚠️ Primero debes cargar datos en la pestaña 'Estructura de costos'.")
+        return
+
+    df_procesado = get_processed_data(st.session_state[SESSION_KEY])
+
+    analyzer = CbsSensitivityAnalyzer(df_procesado, key_prefix=f'{segment_key}_capex')
+
+    analyzer.render()
+
+
+def render_tab_OPEX(segment_key: str) -> None:
+    """
+    Renderiza el análisis de sensibilidad del OPEX del segmento.
+    """
+
+    SESSION_KEY = f'df_{segment_key}_opex'
+
+    if SESSION_KEY not in st.session_state or st.session_state[SESSION_KEY] is None:
+        st.warning(f"⚠️ Primero debes cargar datos en la pestaña 'Estructura de costos'.")
+        return
+
+    df_procesado = get_processed_data(st.session_state[SESSION_KEY])
+
+    analyzer = CbsSensitivityAnalyzer(df_procesado, key_prefix=f'{segment_key}_opex')
+
+    analyzer.render()
+
+
+def render(segment_key: str) -> None:
+
+    tabs_config = {
+
+        "CapEx": {
+            "icon": "bi-gear-wide-connected",
+            "render_func": lambda: render_tab_CAPEX(segment_key)
+        },
+        "OpEx": {
+            "icon": " bi-wrench-adjustable-circle",
+            "render_func": lambda: render_tab_OPEX(segment_key)
+        },
+    }
+
+    components.render_analysis_page(
+        page_title=f"Análisis de sensibilidad",
+        tabs_config=tabs_config
+    )
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from modulos.MODULO_SP500 import generar_proyeccion_sp500
+from modulos.MODULO_SP500 import generar_proyeccion_sp500, estimar_memoria_mb
+from modulos.trabajos import iniciar_trabajo
 from plotly.subplots import make_subplots
 from theme import theme
 from paginas import components
@@ -68,19 +69,18 @@ def render():
         with col_analisis:
             # --- Lógica de Ejecución y Visualización ---
             if submit_button_sp500:
-                with st.spinner("Ejecutando simulación..."):
-                    
-                    # Llamar a la función del módulo con los parámetros del usuario
-                    resultados_sp = generar_proyeccion_sp500(
-                        ticker='^SP500TR',
-                        start_date=start_date_sp,
-                        anos_proyeccion=anos_proy_sp,
-                        num_simulaciones=num_sims_sp
-                    )
-
-                    st.session_state['resultados_sp'] = resultados_sp
+                # Llamar a la función del módulo en segundo plano; el resultado llega a 'resultados_sp' al terminar
+                iniciar_trabajo(
+                    'resultados_sp', "Simulación del S&P 500", generar_proyeccion_sp500,
+                    costo_mb=estimar_memoria_mb(num_sims_sp, anos_proy_sp),
+                    parametro_degradable='num_simulaciones',
+                    ticker='^SP500TR',
+                    start_date=start_date_sp,
+                    anos_proyeccion=anos_proy_sp,
+                    num_simulaciones=num_sims_sp
+                )
 
-                    st.rerun()
+            components.display_job_progress('resultados_sp')
 
             if 'resultados_sp' in st.session_state and st.session_state['resultados_sp'] is not None:
                 resultados_sp = st.session_state['resultados_sp']
@@ -155,11 +155,11 @@ def render():
 
             components.display_diagnostic_histograms(
                 anos_proyeccion=resultados_sp['anos_proyectados'],
-                data_distribucion_final=resultados_sp['precios_finales'],
+                data_distribucion_final=resultados_sp['histograma_precios_finales'],
                 titulo_distribucion_final="Valores del índice proyectados",
                 eje_x_distribucion_final="Valor del S&P 500 puntos]",
                 caption_distribucion_final="Muestra el rango de resultados posibles de la simulación.",
-                data_rendimientos_historicos=resultados_sp['rendimientos_log_diarios'] * 100,
+                data_rendimientos_historicos=resultados_sp['histograma_rendimientos_diarios'],
                 titulo_rendimientos_historicos="Distribución de rendimientos diarios históricos",
                 eje_x_rendimientos_historicos="Cambio diario [%]",
                 caption_rendimientos_historicos="Valida el supuesto de normalidad del modelo (forma de campana)."
@@ -0,0 +1,82 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from theme import theme
+from modulos.instrumentacion import ETAPAS, Registro
+
+# Color de cada etapa en la cascada
+COLORES_ETAPA = {
+    "fetch": theme.get_color("historico"),
+    "transform": theme.get_color("texto_secundario"),
+    "fit": theme.get_color("peligro"),
+    "simulate": theme.get_color("primario"),
+    "reduce": theme.get_color("exito"),
+    "render": "#A3B8BF",
+}
+
+# Tramos máximos a dibujar (los demás siguen en el JSON exportado)
+MAX_TRAMOS_GRAFICA = 150
+
+
+def _crear_cascada(registro: Registro) -> go.Figure:
+    """Cascada de tramos: una barra por tramo desde su inicio, sangrada por profundidad."""
+    tramos = registro.a_dict()["tramos"][:MAX_TRAMOS_GRAFICA]
+    fig = go.Figure()
+    for etapa in ETAPAS:
+        del_etapa = [(i, t) for i, t in enumerate(tramos) if t["etapa"] == etapa]
+        if not del_etapa:
+            continue
+        fig.add_trace(go.Bar(
+            orientation="h",
+            y=[i for i, _ in del_etapa],
+            base=[t["inicio_ms"] for _, t in del_etapa],
+            x=[t["duracion_ms"] for _, t in del_etapa],
+            name=etapa,
+            marker_color=COLORES_ETAPA[etapa],
+            customdata=[[t["nombre"], t["hilo"]] for _, t in del_etapa],
+            hovertemplate="%{customdata[0]}<br>%{base:,.1f} ms + %{x:,.1f} ms<br>%{customdata[1]}<extra>%{fullData.name}</extra>",
+        ))
+
+    etiquetas = ["  " * t["profundidad"] + t["nombre"] for t in tramos]
+    fig.update_layout(
+        template="plotly_white", barmode="overlay", height=max(250, 22 * len(tramos) + 80),
+        margin=dict(l=0, r=0, t=10, b=0), xaxis_title="ms",
+        yaxis=dict(tickmode="array", tickvals=list(range(len(tramos))), ticktext=etiquetas, autorange="reversed"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="left", x=0),
+    )
+    return fig
+
+
+def render_panel(registro_rerun: Registro):
+    """
+    Panel de desarrollo en la barra lateral: cascada de tramos del rerun actual o de los
+    trabajos recientes de la sesión, tiempo propio por etapa, contadores y exportación JSON.
+    """
+    registros = {"Este rerun": registro_rerun}
+    for registro in reversed(st.session_state.get('registros_trabajos', [])):
+        registros[f"{registro.nombre} ({pd.Timestamp(registro.creado, unit='s'):%H:%M:%S})"] = registro
+
+    with st.expander("Perfil de ejecución (desarrollo)"):
+        opcion = st.selectbox("Registro", list(registros), key="perfil_registro")
+        registro = registros[opcion]
+        datos = registro.a_dict()
+
+        theme.render_metric("Duración total", f"{datos['duracion_ms']:,.0f} ms")
+        por_etapa = registro.tiempo_por_etapa()
+        if por_etapa:
+            st.dataframe(
+                pd.DataFrame({"ms": por_etapa}).reindex([e for e in ETAPAS if e in por_etapa]).style.format("{:,.1f}"),
+                use_container_width=True)
+
+        if datos["tramos"]:
+            st.plotly_chart(_crear_cascada(registro), use_container_width=True, key="perfil_cascada")
+            if len(datos["tramos"]) > MAX_TRAMOS_GRAFICA:
+                st.caption(f"Se muestran los primeros {MAX_TRAMOS_GRAFICA} de {len(datos['tramos'])} tramos.")
+        else:
+            st.caption("Sin tramos registrados.")
+
+        if datos["contadores"]:
+            st.dataframe(pd.Series(datos["contadores"], name="valor").to_frame(), use_container_width=True)
+
+        st.download_button("Exportar JSON", registro.a_json(), file_name="perfil.json", mime="application/json",
+                           key="perfil_exportar")
@@ -0,0 +1,76 @@
+import streamlit as st
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from theme import theme
+from modulos import memoria
+from modulos.cache_memoria import cache_compartida
+
+# Claves que se listan en la tabla (las demás se suman en "Otras")
+MAX_CLAVES_TABLA = 15
+
+
+def _mb(num_bytes) -> str:
+    return f"{num_bytes / 1024 ** 2:,.2f} MB" if num_bytes is not None else "No disponible"
+
+
+def contabilizar_sesion() -> dict:
+    """
+    Contabiliza la memoria de la sesión actual al final del rerun (así cuenta los resúmenes
+    calculados en él) y, con LCOE_LIBERAR_CRUDOS=1, descarta antes los datos crudos de los
+    resultados ya resumidos. Devuelve los bytes por clave de st.session_state.
+    """
+    if memoria.LIBERAR_CRUDOS:
+        memoria.liberar_crudos(st.session_state)
+    contexto = get_script_run_ctx()
+    id_sesion = contexto.session_id if contexto is not None else "local"
+    return memoria.contabilidad.contabilizar(id_sesion, st.session_state)
+
+
+def _liberar_crudos():
+    # Como callback, corre antes del rerun: la tabla ya refleja lo liberado
+    liberados = memoria.liberar_crudos(st.session_state, forzar=True)
+    st.session_state['memoria_mensaje'] = (
+        f"Liberados {_mb(sum(liberados.values()))} ({', '.join(liberados)})." if liberados
+        else "No hay datos crudos que liberar.")
+
+
+def _render_cache():
+    """Ocupación y contadores de la caché de resultados compartida por las sesiones."""
+    estadisticas = cache_compartida.estadisticas()
+    theme.render_caption(
+        f"Caché de resultados: {estadisticas['entradas']} entradas, {_mb(estadisticas['bytes'])} de "
+        f"{_mb(estadisticas['max_bytes'])}; {estadisticas['aciertos']} aciertos, {estadisticas['fallos']} fallos, "
+        f"{estadisticas['desalojos']} desalojos.")
+    if estadisticas["por_funcion"]:
+        tabla = pd.DataFrame.from_dict(estadisticas["por_funcion"], orient="index")
+        tabla.index = tabla.index.str.rsplit(".", n=1).str[-1]
+        tabla["bytes"] = tabla["bytes"] / 1024 ** 2
+        st.dataframe(tabla.rename(columns={"bytes": "MB"}).sort_values("MB", ascending=False)
+                     .style.format({"MB": "{:,.2f}"}), use_container_width=True)
+
+
+def render_panel(tamanos: dict):
+    """
+    Panel de la barra lateral: memoria por clave de la sesión, totales del proceso y
+    estado de la caché de resultados.
+    """
+    with st.expander("Memoria (desarrollo)"):
+        theme.render_metric("Esta sesión", _mb(sum(tamanos.values())))
+
+        tabla = pd.Series(tamanos, name="MB", dtype=float) / 1024 ** 2
+        if len(tabla) > MAX_CLAVES_TABLA:
+            tabla = pd.concat([tabla.iloc[:MAX_CLAVES_TABLA],
+                               pd.Series({"Otras": tabla.iloc[MAX_CLAVES_TABLA:].sum()}, name="MB")])
+        st.dataframe(tabla.to_frame().style.format("{:,.2f}"), use_container_width=True)
+
+        totales = memoria.contabilidad.totales()
+        theme.render_caption(
+            f"Proceso: {totales['sesiones']} sesiones con {_mb(totales['bytes_sesiones'])} "
+            f"(la mayor, {_mb(totales['bytes_sesion_maxima'])}); memoria residente {_mb(totales['bytes_proceso'])}.")
+
+        _render_cache()
+
+        st.button("Liberar datos crudos", key="memoria_liberar", on_click=_liberar_crudos,
+                  help="Descarta residuos y modelos ajustados tras calcular sus resúmenes")
+        if 'memoria_mensaje' in st.session_state:
+            theme.render_caption(st.session_state.pop('memoria_mensaje'))
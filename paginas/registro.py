@@ -0,0 +1,99 @@
+import importlib
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Opción del menú -> módulo de la página. El módulo (y sus dependencias pesadas:
+# statsmodels, scipy, yfinance, fredapi, st_aggrid...) se importa solo al seleccionar la opción.
+PAGINAS = {
+    "Pagina principal": "paginas.pagina_bienvenida",
+    "Inflación México": "paginas.pagina_inflacion_mex",
+    "Inflación Estados Unidos": "paginas.pagina_inflacion_usa",
+    "S&P 500": "paginas.pagina_sp500",
+    "EMBI": "paginas.pagina_embi",
+    "Beta Desapalancada": "paginas.pagina_beta",
+    "Deuda Largo Plazo": "paginas.pagina_apalancamiento",
+    "Bonos 20 años": "paginas.pagina_bonos_20",
+    "Resumen": "paginas.pagina_resumen_ve",
+    "CBS": "paginas.pagina_cbs_central",
+}
+
+# Resultados de la sesión que lee cada página: al abrirla se decodifican los que una
+# sesión cargada aún no ha restaurado (modulos.sesiones.restaurar_pendientes)
+RESULTADOS_POR_PAGINA = {
+    "Inflación México": ["resultados_mex"],
+    "Inflación Estados Unidos": ["resultados_usa"],
+    "S&P 500": ["resultados_sp"],
+    "EMBI": ["resultados_embi"],
+    "Beta Desapalancada": ["resultados_beta"],
+    "Deuda Largo Plazo": ["resultados_apalancamiento"],
+    "Bonos 20 años": ["resultados_bonos"],
+    "Resumen": ["resultados_mex", "resultados_usa", "resultados_sp", "resultados_embi",
+                "resultados_beta", "resultados_apalancamiento", "resultados_bonos"],
+}
+
+# Presupuesto de importación (segundos, en frío) para las páginas que deben pintar rápido
+PRESUPUESTOS_IMPORTACION = {
+    "Pagina principal": 1.0,
+}
+
+# Duración de la primera importación de cada página en este proceso
+tiempos_importacion: Dict[str, float] = {}
+
+
+def obtener_pagina(nombre: str) -> ModuleType:
+    """
+    Devuelve el módulo de la página 'nombre', importándolo la primera vez que se pide.
+    Si la importación excede su presupuesto se reporta en el log.
+    """
+    ruta = PAGINAS[nombre]
+    if ruta in sys.modules:
+        return sys.modules[ruta]
+
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(ruta)
+    duracion = time.perf_counter() - inicio
+    tiempos_importacion[nombre] = duracion
+
+    presupuesto = PRESUPUESTOS_IMPORTACION.get(nombre)
+    if presupuesto is not None and duracion > presupuesto:
+        logger.warning(f"importar la página '{nombre}' tomó {duracion:.2f} s (presupuesto: {presupuesto:.2f} s)")
+    return modulo
+
+
+def medir_importacion_en_frio(nombre: str) -> float:
+    """
+    Mide en un intérprete nuevo cuánto tarda en importarse la página 'nombre' (sin contar
+    streamlit, que el servidor ya tiene cargado antes de ejecutar el dashboard).
+    """
+    codigo = (
+        "import time, streamlit\n"
+        "inicio = time.perf_counter()\n"
+        f"import {PAGINAS[nombre]}\n"
+        "print(time.perf_counter() - inicio)\n"
+    )
+    raiz = Path(__file__).resolve().parent.parent
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def verificar_presupuestos() -> Dict[str, float]:
+    """Mide en frío las páginas con presupuesto y devuelve las que lo exceden (nombre -> segundos)."""
+    excedidas = {}
+    for nombre, presupuesto in PRESUPUESTOS_IMPORTACION.items():
+        duracion = medir_importacion_en_frio(nombre)
+        print(f"{nombre}: {duracion:.2f} s (presupuesto: {presupuesto:.2f} s)")
+        if duracion > presupuesto:
+            excedidas[nombre] = duracion
+    return excedidas
+
+
+if __name__ == "__main__":
+    # python -m paginas.registro  -> código de salida 1 si alguna página excede su presupuesto
+    sys.exit(1 if verificar_presupuestos() else 0)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modulos.control_presupuestal import calcular_control_presupuestal
+
+
+def _cbs(filas):
+    return pd.DataFrame(filas, columns=['ID_Jerarquico', 'Descripcion', 'Costo'])
+
+
+BASE = _cbs([
+    ("1", "Proyecto", 0),
+    ("1.1", "Boya", 100.0),
+    ("1.2", "Anclaje", 50.0),
+    ("1.3", "Cable", 30.0),
+])
+
+
+def _fila(df_control, version, id_nodo):
+    df_version = df_control.loc[version]
+    return df_version[df_version['ID_Jerarquico'] == id_nodo].iloc[0]
+
+
+def test_eac_sin_costo_real_ni_avance_es_el_presupuesto():
+    # 1.1 con costo real y avance; 1.2 reportada sin iniciar (Avance = 0); 1.3 ausente
+    version = _cbs([("1", "Proyecto", 0), ("1.1", "Boya", 60.0), ("1.2", "Anclaje", 0.0)])
+    version['Avance'] = [0, 50, 0]
+
+    df_control = calcular_control_presupuestal(BASE, {"Mes 1": version})
+
+    boya = _fila(df_control, "Mes 1", "1.1")
+    assert boya['Valor_Ganado'] == pytest.approx(50.0)
+    assert boya['CPI'] == pytest.approx(50.0 / 60.0)
+    assert boya['EAC'] == pytest.approx(120.0)
+
+    for id_nodo, presupuesto in [("1.2", 50.0), ("1.3", 30.0)]:
+        fila = _fila(df_control, "Mes 1", id_nodo)
+        assert fila['Costo_Real'] == 0
+        assert np.isnan(fila['CPI'])
+        assert fila['EAC'] == pytest.approx(presupuesto)
+        assert fila['VAC'] == pytest.approx(0.0)
+
+
+def test_eac_con_costo_real_sin_valor_ganado():
+    # Costo real sin avance: EAC = AC + (BAC - EV), no solo AC
+    version = _cbs([("1", "Proyecto", 0), ("1.1", "Boya", 40.0), ("1.2", "Anclaje", 50.0), ("1.3", "Cable", 30.0)])
+    version['Avance'] = [0, 0, 100, 100]
+
+    fila = _fila(calcular_control_presupuestal(BASE, {"Mes 1": version}), "Mes 1", "1.1")
+    assert fila['Valor_Ganado'] == 0
+    assert fila['EAC'] == pytest.approx(140.0)
+    assert fila['VAC'] == pytest.approx(-40.0)